@@ -0,0 +1,9 @@
+"""
+Benchmarks of the service layer and the JSON API.
+
+Run offline through the Flask test client against generated SQLite
+databases (see `my_web.db.synthetic`):
+
+    uv run python -m benchmarks run --scales 1000,100000 --output new.json
+    uv run python -m benchmarks compare baseline.json new.json
+"""
@@ -0,0 +1,255 @@
+import argparse
+import fnmatch
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.cases import all_cases
+from benchmarks.harness import Context, dataset, logged_in_client, measure, metadata
+from benchmarks.load import (
+    APIS,
+    HASHING_PROFILES,
+    PROFILES,
+    run_api,
+    run_load,
+    run_logins,
+)
+
+DEFAULT_SCALES = "1000,100000,1000000"
+# Relative p50 slowdown reported as a regression by `compare`
+DEFAULT_THRESHOLD = 0.10
+
+
+def run(args: argparse.Namespace) -> int:
+    cases = [
+        case
+        for case in all_cases()
+        if any(fnmatch.fnmatch(case.name, pattern) for pattern in args.cases)
+    ]
+    results = {}
+    for scale in (int(s) for s in args.scales.split(",")):
+        print(f"# {scale} books", file=sys.stderr)
+        app = dataset(scale)
+        ctx = Context(app, logged_in_client(app), scale)
+        results[str(scale)] = {}
+        for case in cases:
+            ctx.state = {}
+            result = measure(ctx, case, args.runs, args.warmup, args.max_seconds)
+            results[str(scale)][case.name] = result
+            print(
+                f"{case.name:45} p50 {result['p50_ms']:9.2f} ms"
+                f"  p99 {result['p99_ms']:9.2f} ms"
+                f"  {result['queries']:3} q  {result['peak_kib']:9.1f} KiB",
+                file=sys.stderr,
+            )
+
+    report = {"meta": metadata(), "results": results}
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        return _compare(json.loads(Path(args.baseline).read_text()), report, args)
+    return 0
+
+
+def load(args: argparse.Namespace) -> int:
+    results = {}
+    for scale in (int(s) for s in args.scales.split(",")):
+        results[str(scale)] = {}
+        for name in args.profiles:
+            result = run_load(
+                scale, PROFILES[name], args.readers, args.writers, args.seconds
+            )
+            results[str(scale)][name] = result
+            print(
+                f"{scale:>9} {name:20} {result['reads_per_s']:9.1f} reads/s"
+                f"  {result['writes_per_s']:9.1f} writes/s"
+                f"  {result['failed']} failed",
+                file=sys.stderr,
+            )
+
+    report = {
+        "meta": {
+            **metadata(),
+            "readers": args.readers,
+            "writers": args.writers,
+            "seconds": args.seconds,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+def logins(args: argparse.Namespace) -> int:
+    results = {}
+    for scale in (int(s) for s in args.scales.split(",")):
+        results[str(scale)] = {}
+        for name in args.profiles:
+            result = run_logins(scale, name, args.readers, args.logins, args.seconds)
+            results[str(scale)][name] = result
+            print(
+                f"{scale:>9} {name:8} read p50 {result['p50_ms']:8.2f} ms"
+                f"  p95 {result['p95_ms']:8.2f} ms  p99 {result['p99_ms']:8.2f} ms"
+                f"  {result['logins_per_s']:6.1f} logins/s"
+                f"  {result['refused']} refused",
+                file=sys.stderr,
+            )
+
+    report = {
+        "meta": {
+            **metadata(),
+            "readers": args.readers,
+            "logins": args.logins,
+            "seconds": args.seconds,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+def async_api(args: argparse.Namespace) -> int:
+    results = {}
+    for scale in (int(s) for s in args.scales.split(",")):
+        results[str(scale)] = {}
+        for threads in (int(t) for t in args.threads.split(",")):
+            for api in args.apis:
+                result = run_api(scale, api, threads, args.seconds)
+                results[str(scale)][f"{api}/{threads}"] = result
+                print(
+                    f"{scale:>9} {api:6} {threads:3} threads"
+                    f"  {result['reads_per_s']:8.1f} reads/s"
+                    f"  p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms",
+                    file=sys.stderr,
+                )
+
+    report = {
+        "meta": {**metadata(), "seconds": args.seconds},
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    return _compare(baseline, current, args)
+
+
+def _compare(baseline: dict, current: dict, args: argparse.Namespace) -> int:
+    """Prints p50 and query count changes, returns 1 if anything regressed."""
+    regressions = 0
+    print(f"{'case':55} {'base p50':>10} {'p50':>10} {'change':>8}  queries")
+    for scale, cases in current["results"].items():
+        base_cases = baseline["results"].get(scale, {})
+        for name, result in cases.items():
+            base = base_cases.get(name)
+            if base is None:
+                continue
+            change = result["p50_ms"] / base["p50_ms"] - 1 if base["p50_ms"] else 0.0
+            regressed = change > args.threshold or result["queries"] > base["queries"]
+            regressions += regressed
+            print(
+                f"{scale + ' ' + name:55} {base['p50_ms']:10.2f} {result['p50_ms']:10.2f}"
+                f" {change:+8.1%}  {base['queries']} -> {result['queries']}"
+                f"{'  REGRESSION' if regressed else ''}"
+            )
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run benchmarks")
+    run_parser.add_argument(
+        "--scales", default=DEFAULT_SCALES, help="comma separated numbers of books"
+    )
+    run_parser.add_argument(
+        "--cases", nargs="+", default=["*"], help="case name patterns (fnmatch)"
+    )
+    run_parser.add_argument("--runs", type=int, default=30, help="timed runs per case")
+    run_parser.add_argument("--warmup", type=int, default=2)
+    run_parser.add_argument(
+        "--max-seconds", type=float, default=10, help="time budget per case"
+    )
+    run_parser.add_argument("--output", help="JSON report file (default: stdout)")
+    run_parser.add_argument("--baseline", help="JSON report to compare with")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    run_parser.set_defaults(handler=run)
+
+    load_parser = commands.add_parser(
+        "load", help="concurrent reads and writes per engine profile"
+    )
+    load_parser.add_argument("--scales", default="100000")
+    load_parser.add_argument(
+        "--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES)
+    )
+    load_parser.add_argument("--readers", type=int, default=4)
+    load_parser.add_argument("--writers", type=int, default=1)
+    load_parser.add_argument("--seconds", type=float, default=10)
+    load_parser.add_argument("--output", help="JSON report file (default: stdout)")
+    load_parser.set_defaults(handler=load)
+
+    logins_parser = commands.add_parser(
+        "logins", help="read latency during a login storm per hashing profile"
+    )
+    logins_parser.add_argument("--scales", default="1000")
+    logins_parser.add_argument(
+        "--profiles",
+        nargs="+",
+        default=list(HASHING_PROFILES),
+        choices=list(HASHING_PROFILES),
+    )
+    logins_parser.add_argument("--readers", type=int, default=2)
+    logins_parser.add_argument(
+        "--logins", type=int, default=8, help="threads posting the login form"
+    )
+    logins_parser.add_argument("--seconds", type=float, default=10)
+    logins_parser.add_argument("--output", help="JSON report file (default: stdout)")
+    logins_parser.set_defaults(handler=logins)
+
+    async_parser = commands.add_parser(
+        "async", help="concurrent reads of the sync and the async book API"
+    )
+    async_parser.add_argument("--scales", default="100000")
+    async_parser.add_argument(
+        "--apis", nargs="+", default=list(APIS), choices=list(APIS)
+    )
+    async_parser.add_argument(
+        "--threads", default="1,4,16", help="comma separated concurrency levels"
+    )
+    async_parser.add_argument("--seconds", type=float, default=10)
+    async_parser.add_argument("--output", help="JSON report file (default: stdout)")
+    async_parser.set_defaults(handler=async_api)
+
+    compare_parser = commands.add_parser("compare", help="compare two reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
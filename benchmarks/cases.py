@@ -0,0 +1,172 @@
+"""
+Benchmark cases. Every case is named `<area>/<variant>`, so that runs can
+be narrowed with `--cases 'api_list/*'`.
+"""
+
+import json
+from urllib.parse import urlencode
+
+from sqlalchemy import func
+
+from benchmarks.harness import Case, Context
+from my_web.db.models import Author, Book
+from my_web.extensions import db
+from my_web.schemas.book import BookSchema
+from my_web.services.book import book_service
+from my_web.services.pagination import encode_cursor
+
+PER_PAGE = 20
+
+SORTS = {
+    "default": None,
+    "title": [{"field": "title", "dir": "asc"}],
+    "title_desc": [{"field": "title", "dir": "desc"}],
+    "authors": [{"field": "authors", "dir": "asc"}],
+    "isbn": [{"field": "isbn", "dir": "asc"}],
+}
+FILTERS = {
+    "none": None,
+    "title": [{"field": "title", "value": "king"}],
+    "authors": [{"field": "authors", "value": "adams"}],
+}
+
+
+def _list_url(**args) -> str:
+    args = {k: json.dumps(v) if isinstance(v, list) else v for k, v in args.items()}
+    args = {k: v for k, v in args.items() if v is not None}
+    return f"/api/v1/book/list?{urlencode(args)}"
+
+
+def _get(url: str):
+    return lambda ctx: ctx.get(url)
+
+
+def _middle_page(ctx: Context) -> int:
+    return ctx.scale // PER_PAGE // 2 + 1
+
+
+def _keyset_setup(ctx: Context) -> None:
+    """Cursor pointing at the same depth as the middle OFFSET page."""
+    depth = (_middle_page(ctx) - 1) * PER_PAGE - 1
+    title, book_id = db.session.execute(
+        db.select(Book.title, Book.id).order_by(Book.title, Book.id).offset(depth)
+    ).first()
+    ctx.state["cursor"] = encode_cursor([title, book_id])
+
+
+def _sample_book(ctx: Context) -> int:
+    if "book_id" not in ctx.state:
+        # The newest book: a generated one, not one of the seed fixtures
+        ctx.state["book_id"] = db.session.execute(db.select(func.max(Book.id))).scalar()
+    return ctx.state["book_id"]
+
+
+# --- Response pages: ORM objects + schemas vs projected rows ---
+
+LARGE_PAGE = 100
+
+
+def _orm_page(ctx: Context) -> None:
+    result = book_service.get_books(page=1, per_page=LARGE_PAGE)
+    [BookSchema.model_validate(book).model_dump() for book in result["data"]]
+
+
+def _projected_page(ctx: Context) -> None:
+    book_service.get_books(page=1, per_page=LARGE_PAGE, projection=True)
+
+
+# --- Write paths ---
+
+
+def _create_setup(ctx: Context) -> None:
+    ctx.state["created"] = []
+
+
+def _create(ctx: Context) -> None:
+    response = ctx.client.post("/api/v1/book/", json={"title": "Benchmark book"})
+    ctx.state["created"].append(response.get_json()["id"])
+
+
+def _bulk_create(ctx: Context) -> None:
+    rows = [{"title": f"Benchmark bulk {i}"} for i in range(100)]
+    ctx.state["created"].extend(book_service.bulk_create(rows).created.values())
+
+
+def _delete_created(ctx: Context) -> None:
+    db.session.execute(db.delete(Book).where(Book.id.in_(ctx.state["created"])))
+    db.session.commit()
+
+
+def _update(ctx: Context) -> None:
+    book_id = _sample_book(ctx)
+    ctx.state["flip"] = not ctx.state.get("flip")
+    title = "Benchmark A" if ctx.state["flip"] else "Benchmark B"
+    response = ctx.client.patch(f"/api/v1/book/{book_id}", json={"title": title})
+    assert response.status_code == 200
+
+
+def _author_setup(ctx: Context) -> None:
+    ctx.state["author_id"] = db.session.execute(db.select(func.max(Author.id))).scalar()
+
+
+def _add_remove_author(ctx: Context) -> None:
+    url = f"/api/v1/book/{_sample_book(ctx)}/authors/{ctx.state['author_id']}"
+    assert ctx.client.put(url).status_code == 200
+    assert ctx.client.delete(url).status_code == 200
+
+
+def all_cases() -> list[Case]:
+    cases = []
+    for sort_name, sort in SORTS.items():
+        for filter_name, filter_ in FILTERS.items():
+            url = _list_url(size=PER_PAGE, sort=sort, filter=filter_)
+            cases.append(
+                Case(f"api_list/sort={sort_name},filter={filter_name}", _get(url))
+            )
+
+    cases += [
+        Case("api_list/count=none", _get(_list_url(size=PER_PAGE, count="none"))),
+        Case("api_list/search", _get(_list_url(size=PER_PAGE, q="silent king"))),
+        Case("api_list/cursor_first", _get(_list_url(size=PER_PAGE, cursor=""))),
+        Case(
+            "api_list/deep_offset",
+            lambda ctx: ctx.get(_list_url(size=PER_PAGE, page=_middle_page(ctx))),
+        ),
+        Case(
+            "api_list/deep_cursor",
+            lambda ctx: ctx.get(_list_url(size=PER_PAGE, cursor=ctx.state["cursor"])),
+            setup=_keyset_setup,
+        ),
+        Case(
+            "api_detail/book", lambda ctx: ctx.get(f"/api/v1/book/{_sample_book(ctx)}")
+        ),
+        Case("html/book_list", _get(f"/book/list?size={PER_PAGE}")),
+        Case(
+            "service/get_books",
+            lambda ctx: book_service.get_books(page=1, per_page=PER_PAGE),
+        ),
+        Case(
+            "service/get_books_deep",
+            lambda ctx: book_service.get_books(
+                page=_middle_page(ctx), per_page=PER_PAGE
+            ),
+        ),
+        Case(
+            "service/get_paginated",
+            lambda ctx: book_service.get_paginated(
+                per_page=PER_PAGE, sort_field="title", filter_value="king"
+            ),
+        ),
+        Case(f"page/orm_{LARGE_PAGE}", _orm_page),
+        Case(f"page/projection_{LARGE_PAGE}", _projected_page),
+        Case("write/create", _create, setup=_create_setup, teardown=_delete_created),
+        Case(
+            "write/bulk_create_100",
+            _bulk_create,
+            setup=_create_setup,
+            teardown=_delete_created,
+        ),
+        Case("write/update", _update),
+        Case("write/add_remove_author", _add_remove_author, setup=_author_setup),
+    ]
+    return cases
@@ -0,0 +1,159 @@
+"""Measurement primitives: datasets, timing, query counting and memory."""
+
+import platform
+import sqlite3
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import sqlalchemy
+from flask import Flask
+from flask.testing import FlaskClient
+
+from my_web.app import create_app
+from my_web.db.fixtures import initial_library_data
+from my_web.db.synthetic import generate_library
+from my_web.extensions import db
+from my_web.instrumentation import record
+
+DATA_DIR = Path(__file__).parent / ".data"
+SEED = 1
+
+
+@dataclass
+class Context:
+    """What cases get: the app, a logged-in client and dataset facts."""
+
+    app: Flask
+    client: FlaskClient
+    scale: int
+    # Scratch space of a case (e.g. ids to clean up in teardown)
+    state: dict[str, Any] = field(default_factory=dict)
+
+    def get(self, url: str) -> None:
+        response = self.client.get(url)
+        if response.status_code != 200:
+            raise AssertionError(f"GET {url} returned {response.status_code}")
+
+
+@dataclass
+class Case:
+    name: str
+    run: Callable[[Context], None]
+    setup: Callable[[Context], None] | None = None
+    teardown: Callable[[Context], None] | None = None
+
+
+def dataset(scale: int, **config) -> Flask:
+    """App bound to a SQLite database of `scale` generated books (cached)."""
+    DATA_DIR.mkdir(exist_ok=True)
+    path = DATA_DIR / f"books-{scale}-seed{SEED}.db"
+    app = create_app(
+        test_config={
+            "TESTING": True,
+            "WTF_CSRF_ENABLED": False,
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "RESPONSE_CACHE_BACKEND": "none",
+            "REQUEST_LOG": False,
+            **config,
+        }
+    )
+    if not path.exists():
+        with app.app_context():
+            db.create_all()
+            initial_library_data(app)
+            with db.engine.begin() as connection:
+                generate_library(connection, scale, seed=SEED)
+    return app
+
+
+def logged_in_client(app: Flask) -> FlaskClient:
+    client = app.test_client()
+    client.post(
+        "/auth/login", data={"email": "admin@example.com", "password": "password"}
+    )
+    return client
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    if len(samples) == 1:
+        return {"p50": samples[0], "p95": samples[0], "p99": samples[0]}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+def _call(ctx: Context, fn: Callable[[Context], None]) -> None:
+    # Every call gets a fresh app context (and so a fresh session), like a request
+    with ctx.app.app_context():
+        fn(ctx)
+
+
+def measure(
+    ctx: Context, case: Case, runs: int, warmup: int, max_seconds: float
+) -> dict[str, Any]:
+    """
+    Times `runs` calls of the case (fewer if they exceed `max_seconds`,
+    at least 3), then counts queries and peak memory of one extra call.
+    """
+    if case.setup:
+        _call(ctx, case.setup)
+    try:
+        for _ in range(warmup):
+            _call(ctx, case.run)
+
+        samples = []
+        deadline = time.perf_counter() + max_seconds
+        while len(samples) < runs:
+            start = time.perf_counter()
+            _call(ctx, case.run)
+            samples.append((time.perf_counter() - start) * 1000)
+            if len(samples) >= 3 and time.perf_counter() > deadline:
+                break
+
+        tracemalloc.start()
+        try:
+            with record() as stats:
+                _call(ctx, case.run)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        if case.teardown:
+            _call(ctx, case.teardown)
+
+    return {
+        **{
+            f"{name}_ms": round(value, 3)
+            for name, value in _percentiles(samples).items()
+        },
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "runs": len(samples),
+        "queries": stats.queries,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def metadata() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+    }
@@ -0,0 +1,229 @@
+"""
+Concurrent read/write load: reader threads page through the JSON API while
+writer threads update books, on a copy of a generated dataset per engine
+profile. Reports completed reads and writes per second and failed requests.
+
+Login storm: reader threads time the JSON API while login threads post the
+login form back to back, per password hashing profile. Reports the read
+latency and the completed and refused logins.
+
+Async API: client threads page through the sync or the async book API at
+several concurrency levels. Reports reads per second and their latency.
+"""
+
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from benchmarks.harness import DATA_DIR, SEED, dataset, logged_in_client
+from my_web.db.aio import adb
+from my_web.extensions import db
+
+# Engine profiles compared by `python -m benchmarks load`
+PROFILES: dict[str, dict[str, Any]] = {
+    # SQLite defaults (the 5 s busy timeout is the one of Python's sqlite3)
+    "sqlite_defaults": {
+        "SQLITE_JOURNAL_MODE": "delete",
+        "SQLITE_SYNCHRONOUS": "full",
+        "SQLITE_BUSY_TIMEOUT": 5000,
+        "SQLITE_MMAP_SIZE": 0,
+        "SQLITE_CACHE_SIZE": -2000,
+    },
+    # The defaults of Settings
+    "tuned": {},
+}
+# Password hashing profiles compared by `python -m benchmarks logins`
+HASHING_PROFILES: dict[str, dict[str, Any]] = {
+    # No logins at all: the read latency to hold
+    "idle": {},
+    # bcrypt on the request threads
+    "inline": {"PASSWORD_HASH_WORKERS": 0},
+    # The defaults of Settings
+    "pool": {},
+}
+# Book APIs compared by `python -m benchmarks async`
+APIS = {"sync": "/api/v1/book", "async": "/api/v1/async/book"}
+PER_PAGE = 20
+
+
+def _worker(
+    app, scale: int, write: bool, deadline: float, seed: int, counts: dict
+) -> None:
+    rng = random.Random(seed)
+    client = logged_in_client(app)
+    pages = max(scale // PER_PAGE, 1)
+    done = failed = 0
+    while time.perf_counter() < deadline:
+        if write:
+            book_id = rng.randint(1, scale)
+            response = client.patch(
+                f"/api/v1/book/{book_id}", json={"title": f"Load {rng.random()}"}
+            )
+        else:
+            page = rng.randint(1, min(pages, 50))
+            response = client.get(f"/api/v1/book/list?size={PER_PAGE}&page={page}")
+        if response.status_code == 200:
+            done += 1
+        else:
+            failed += 1
+    key = "writes" if write else "reads"
+    with counts["lock"]:
+        counts[key] += done
+        counts["failed"] += failed
+
+
+def run_load(
+    scale: int, profile: dict[str, Any], readers: int, writers: int, seconds: float
+) -> dict[str, Any]:
+    """Runs the load on a fresh copy of the `scale` dataset."""
+    # Generates the dataset when missing, closing checkpoints a WAL journal
+    with dataset(scale).app_context():
+        db.engine.dispose()
+    source = DATA_DIR / f"books-{scale}-seed{SEED}.db"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / source.name
+        shutil.copyfile(source, path)
+        app = dataset(
+            scale,
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{path}",
+            # Threads are the workers here, the pool must not be the bottleneck
+            DB_POOL_SIZE=readers + writers,
+            **profile,
+        )
+        counts = {"reads": 0, "writes": 0, "failed": 0, "lock": threading.Lock()}
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(
+                target=_worker,
+                args=(app, scale, i < writers, deadline, SEED + i, counts),
+            )
+            for i in range(readers + writers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        with app.app_context():
+            db.engine.dispose()
+
+    return {
+        "reads_per_s": round(counts["reads"] / seconds, 1),
+        "writes_per_s": round(counts["writes"] / seconds, 1),
+        "failed": counts["failed"],
+    }
+
+
+def _timed_reader(app, deadline: float, seed: int, latencies: list[float]) -> None:
+    rng = random.Random(seed)
+    client = logged_in_client(app)
+    while time.perf_counter() < deadline:
+        page = rng.randint(1, 50)
+        start = time.perf_counter()
+        response = client.get(f"/api/v1/book/list?size={PER_PAGE}&page={page}")
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+
+def _login_storm(app, deadline: float, counts: dict) -> None:
+    client = app.test_client()
+    done = refused = 0
+    while time.perf_counter() < deadline:
+        response = client.post(
+            "/auth/login",
+            data={"email": "admin@example.com", "password": "password"},
+        )
+        if response.status_code == 302:
+            done += 1
+        else:
+            refused += 1
+        client.get("/auth/logout")
+    with counts["lock"]:
+        counts["logins"] += done
+        counts["refused"] += refused
+
+
+def run_logins(
+    scale: int, name: str, readers: int, logins: int, seconds: float
+) -> dict[str, Any]:
+    """Runs readers next to `logins` login threads (none for "idle")."""
+    app = dataset(scale, **HASHING_PROFILES[name])
+    latencies: list[float] = []
+    counts = {"logins": 0, "refused": 0, "lock": threading.Lock()}
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(
+            target=_timed_reader, args=(app, deadline, SEED + i, latencies)
+        )
+        for i in range(readers)
+    ]
+    if name != "idle":
+        threads += [
+            threading.Thread(target=_login_storm, args=(app, deadline, counts))
+            for _ in range(logins)
+        ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with app.app_context():
+        db.engine.dispose()
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "reads": len(latencies),
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+        "p99_ms": round(cuts[98], 2),
+        "logins_per_s": round(counts["logins"] / seconds, 1),
+        "refused": counts["refused"],
+    }
+
+
+def _api_reader(
+    app, prefix: str, deadline: float, seed: int, latencies: list[float]
+) -> None:
+    rng = random.Random(seed)
+    client = app.test_client()
+    failed = 0
+    while time.perf_counter() < deadline:
+        page = rng.randint(1, 50)
+        start = time.perf_counter()
+        response = client.get(f"{prefix}/list?size={PER_PAGE}&page={page}")
+        if response.status_code == 200:
+            latencies.append((time.perf_counter() - start) * 1000)
+        else:
+            failed += 1
+    if failed:
+        raise AssertionError(f"{failed} requests to {prefix} failed")
+
+
+def run_api(scale: int, api: str, threads: int, seconds: float) -> dict[str, Any]:
+    """Runs `threads` readers of the `api` ("sync" or "async") book list."""
+    app = dataset(scale, ASYNC_API=True, DB_POOL_SIZE=threads)
+    latencies: list[float] = []
+    deadline = time.perf_counter() + seconds
+    readers = [
+        threading.Thread(
+            target=_api_reader, args=(app, APIS[api], deadline, SEED + i, latencies)
+        )
+        for i in range(threads)
+    ]
+    for thread in readers:
+        thread.start()
+    for thread in readers:
+        thread.join()
+    adb.dispose(app)
+    with app.app_context():
+        db.engine.dispose()
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "reads_per_s": round(len(latencies) / seconds, 1),
+        "p50_ms": round(cuts[49], 2),
+        "p95_ms": round(cuts[94], 2),
+    }
@@ -0,0 +1,72 @@
+"""Add book full-text search index
+
+Revision ID: 3c9d2f61b8e4
+Revises: af499321505e
+Create Date: 2026-10-18 09:12:31.402117
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3c9d2f61b8e4"
+down_revision = "af499321505e"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    if dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS book_search USING fts5("
+            "title, authors, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            """
+            INSERT INTO book_search (rowid, title, authors)
+            SELECT b.id, b.title, coalesce(group_concat(a.name, ' '), '')
+            FROM books b
+            LEFT JOIN book_author ba ON ba.book_id = b.id
+            LEFT JOIN authors a ON a.id = ba.author_id
+            GROUP BY b.id, b.title
+            """
+        )
+    elif dialect == "postgresql":
+        op.create_table(
+            "book_search",
+            sa.Column(
+                "book_id",
+                sa.Integer(),
+                sa.ForeignKey("books.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            sa.Column("document", postgresql.TSVECTOR(), nullable=False),
+        )
+        op.create_index(
+            "ix_book_search_document",
+            "book_search",
+            ["document"],
+            postgresql_using="gin",
+        )
+        op.execute(
+            """
+            INSERT INTO book_search (book_id, document)
+            SELECT b.id,
+                setweight(to_tsvector('simple', b.title), 'A')
+                || setweight(to_tsvector('simple', coalesce(string_agg(a.name, ' '), '')), 'B')
+            FROM books b
+            LEFT JOIN book_author ba ON ba.book_id = b.id
+            LEFT JOIN authors a ON a.id = ba.author_id
+            GROUP BY b.id, b.title
+            """
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name in ("sqlite", "postgresql"):
+        op.execute("DROP TABLE IF EXISTS book_search")
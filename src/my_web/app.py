@@ -1,39 +1,28 @@
-import code
 import os
-import sys
 from flask import Flask
-from flask_migrate import upgrade, init, history, current, migrate as migrate_command
 from my_web.config import settings
-from my_web.extensions import db, bcrypt, login_manager, migrate, csrf
-from my_web.db.fixtures import initial_library_data
+from my_web.extensions import db, bcrypt, login_manager, csrf
+from my_web import (
+    assets,
+    compression,
+    identity,
+    instrumentation,
+    metrics,
+    passwords,
+    serialization,
+    slow_queries,
+    templating,
+)
+from my_web.cache import response_cache
+from my_web.db import routing, tuning
+from my_web.db.aio import adb
 from my_web.routes.home import home_bp
 from my_web.routes.auth import auth_bp
 from my_web.routes.user import user_bp
 from my_web.routes.book import book_bp, book_api_bp
+from my_web.routes.book_async import book_async_api_bp
 from my_web.errors import register_error_handlers
 
-HELP = """Usage:
-
-uv run web              # Run the Flask web server
-uv run shell            # Run a shell in the app context
-uv run db-init          # Initialize the database (create migration repository and initial migration)
-uv run db-migrate       # Create a new database migration from code changes
-uv run db-upgrade       # Apply database migrations to DB
-uv run db-fixtures      # Load initial data fixtures into the database
-uv run db-history       # Show the database migration history
-uv run db-current       # Show the current database revision
-uv run help             # Show this help message
-
-Do not forget to set environment variables in a .env file.
-"""
-
-
-@login_manager.user_loader
-def load_user(user_id):
-    from my_web.db.models import User
-
-    return db.session.get(User, int(user_id))
-
 
 def create_app(test_config=None) -> Flask:
     base_dir = os.path.dirname(__file__)
@@ -42,16 +31,87 @@ def create_app(test_config=None) -> Flask:
 
     app = Flask(settings.name, template_folder=template_dir, static_folder=static_dir)
     app.config["SQLALCHEMY_DATABASE_URI"] = settings.sqlalchemy_database_uri
+    app.config["SQLALCHEMY_REPLICA_URIS"] = settings.sqlalchemy_replica_uris
+    app.config["REPLICA_CHECK_INTERVAL"] = settings.replica_check_interval
+    app.config["DB_POOL_SIZE"] = settings.db_pool_size
+    app.config["DB_MAX_OVERFLOW"] = settings.db_max_overflow
+    app.config["DB_POOL_TIMEOUT"] = settings.db_pool_timeout
+    app.config["DB_POOL_RECYCLE"] = settings.db_pool_recycle
+    app.config["DB_POOL_PRE_PING"] = settings.db_pool_pre_ping
+    app.config["SQLITE_JOURNAL_MODE"] = settings.sqlite_journal_mode
+    app.config["SQLITE_SYNCHRONOUS"] = settings.sqlite_synchronous
+    app.config["SQLITE_BUSY_TIMEOUT"] = settings.sqlite_busy_timeout
+    app.config["SQLITE_MMAP_SIZE"] = settings.sqlite_mmap_size
+    app.config["SQLITE_CACHE_SIZE"] = settings.sqlite_cache_size
     app.config["SECRET_KEY"] = settings.secret_key
+    app.config["MAX_PAGE_SIZE"] = settings.max_page_size
+    app.config["BOOK_LIST_PAGE_SIZE"] = settings.book_list_page_size
+    app.config["COUNT_CACHE_TTL"] = settings.count_cache_ttl
+    app.config["COUNT_ESTIMATE_THRESHOLD"] = settings.count_estimate_threshold
+    app.config["RESPONSE_CACHE_BACKEND"] = settings.response_cache_backend
+    app.config["RESPONSE_CACHE_TTL"] = settings.response_cache_ttl
+    app.config["RESPONSE_CACHE_STALE_TTL"] = settings.response_cache_stale_ttl
+    app.config["RESPONSE_CACHE_SIZE"] = settings.response_cache_size
+    app.config["RESPONSE_CACHE_PATH"] = settings.response_cache_path
+    app.config["EXPORT_CHUNK_SIZE"] = settings.export_chunk_size
+    app.config["BULK_CHUNK_SIZE"] = settings.bulk_chunk_size
+    app.config["SERVER_TIMING"] = settings.server_timing
+    app.config["REQUEST_LOG"] = settings.request_log
+    app.config["METRICS"] = settings.metrics
+    app.config["METRICS_DIR"] = settings.metrics_dir
+    app.config["SLOW_QUERY_MS"] = settings.slow_query_ms
+    app.config["SLOW_QUERY_LOG"] = settings.slow_query_log
+    app.config["SLOW_QUERY_LOG_MAX_BYTES"] = settings.slow_query_log_max_bytes
+    app.config["SLOW_QUERY_LOG_BACKUPS"] = settings.slow_query_log_backups
+    app.config["COMPRESS"] = settings.compress
+    app.config["COMPRESS_ALGORITHMS"] = settings.compress_algorithms
+    app.config["COMPRESS_MIN_SIZE"] = settings.compress_min_size
+    app.config["COMPRESS_GZIP_LEVEL"] = settings.compress_gzip_level
+    app.config["COMPRESS_BROTLI_LEVEL"] = settings.compress_brotli_level
+    app.config["COMPRESS_ZSTD_LEVEL"] = settings.compress_zstd_level
+    app.config["ASSETS_FINGERPRINT"] = settings.assets_fingerprint
+    app.config["ASSETS_MAX_AGE"] = settings.assets_max_age
+    app.config["JINJA_BYTECODE_CACHE"] = settings.jinja_bytecode_cache
+    app.config["JINJA_BYTECODE_CACHE_DIR"] = settings.jinja_bytecode_cache_dir
+    app.config["TEMPLATE_FRAGMENT_CACHE_SIZE"] = settings.template_fragment_cache_size
+    app.config["TEMPLATE_FRAGMENT_CACHE_TTL"] = settings.template_fragment_cache_ttl
+    app.config["USER_CACHE"] = settings.user_cache
+    app.config["USER_CACHE_TTL"] = settings.user_cache_ttl
+    app.config["USER_CACHE_SIZE"] = settings.user_cache_size
+    app.config["BCRYPT_LOG_ROUNDS"] = settings.bcrypt_log_rounds
+    app.config["PASSWORD_HASH_WORKERS"] = settings.password_hash_workers
+    app.config["PASSWORD_HASH_QUEUE_SIZE"] = settings.password_hash_queue_size
+    app.config["ASYNC_API"] = settings.async_api
+    app.config["ASYNC_DATABASE_URI"] = settings.async_database_uri
 
     if test_config:
         app.config.update(test_config)
+    app.config.setdefault(
+        "SQLALCHEMY_ENGINE_OPTIONS", tuning.engine_options(app.config)
+    )
+    app.config["SQLALCHEMY_BINDS"] = {
+        **app.config.get("SQLALCHEMY_BINDS", {}),
+        **routing.replica_binds(app.config),
+    }
 
     db.init_app(app)
-    migrate.init_app(app, db)
+    adb.init_app(app)
+    tuning.init_app(app)
+    routing.init_app(app)
     login_manager.init_app(app)
+    identity.init_app(app)
     bcrypt.init_app(app)
+    passwords.init_app(app)
     csrf.init_app(app)
+    response_cache.init_app(app)
+    assets.init_app(app)
+    templating.init_app(app)
+    instrumentation.init_app(app)
+    serialization.init_app(app)
+    metrics.init_app(app)
+    slow_queries.init_app(app)
+    # Last registered, so the other after_request hooks see the final response
+    compression.init_app(app)
 
     register_error_handlers(app)
 
@@ -60,67 +120,9 @@ def create_app(test_config=None) -> Flask:
     app.register_blueprint(user_bp)
     app.register_blueprint(book_bp)
     app.register_blueprint(book_api_bp)
+    if app.config["ASYNC_API"]:
+        app.register_blueprint(book_async_api_bp)
     return app
 
 
-def db_init() -> None:
-    app = create_app()
-    with app.app_context():
-        init()
-
-
-def db_migrate() -> None:
-    app = create_app()
-    msg = sys.argv[1] if len(sys.argv) > 1 else None
-    with app.app_context():
-        migrate_command(message=msg)
-
-
-def db_upgrade() -> None:
-    app = create_app()
-    with app.app_context():
-        upgrade()
-
-
-def db_fixtures() -> None:
-    app = create_app()
-    with app.app_context():
-        initial_library_data(app)
-
-
-def db_history() -> None:
-    app = create_app()
-    with app.app_context():
-        history()
-
-
-def db_current() -> None:
-    app = create_app()
-    with app.app_context():
-        current()
-
-
-def run() -> None:
-    """Run the Flask app."""
-    app = create_app()
-    app.run(debug=settings.debug, host=settings.host, port=settings.port)
-
-
-def app_help() -> None:
-    """Print help message."""
-    print(HELP)
-
-
-def shell() -> None:
-    """Run a shell in the app context."""
-    app = create_app()
-    with app.app_context():
-        try:
-            from IPython import embed
-
-            embed(header="", user_ns=dict(globals(), **locals()))
-        except ImportError:
-            code.interact(local=dict(globals(), **locals()))
-
-
 login_manager.login_view = "auth.login"
@@ -0,0 +1,166 @@
+"""
+Static asset pipeline.
+
+`uv run assets-build` downloads the VENDORED third-party files into
+`static/vendor/` (once, versions are pinned in the URLs), then writes every
+static file to `static/dist/` minified (with the `assets` extra), under a
+name carrying a hash of its content, next to `.gz` and `.br` variants.
+`static/dist/manifest.json` maps the original names to the hashed ones.
+
+With ASSETS_FINGERPRINT and a built manifest, `url_for('static', ...)`
+returns the hashed URLs. They are served with `Cache-Control: immutable`
+and a year of max-age (ASSETS_MAX_AGE): a changed file gets a new URL. The
+precompressed variant preferred by the client is sent when there is one.
+Other static files are served as usual.
+
+Until `assets-build` has downloaded them (e.g. in a fresh clone), requests
+of the VENDORED files are redirected to their pinned upstream URLs.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import shutil
+import urllib.request
+from pathlib import Path
+
+from flask import Flask, Response, redirect, request, send_from_directory
+from loguru import logger
+
+from my_web.compression import brotli, is_compressible
+
+try:
+    import rcssmin
+    import rjsmin
+except ImportError:  # pragma: no cover - optional dependency
+    rcssmin = rjsmin = None
+
+# Path under the static folder -> pinned download URL
+VENDORED = {
+    "vendor/tabulator/tabulator.min.js": (
+        "https://unpkg.com/tabulator-tables@6.2.1/dist/js/tabulator.min.js"
+    ),
+    "vendor/tabulator/tabulator_bootstrap5.min.css": (
+        "https://unpkg.com/tabulator-tables@6.2.1/dist/css/tabulator_bootstrap5.min.css"
+    ),
+}
+DIST = "dist"
+MANIFEST = "manifest.json"
+# Content-Encoding -> suffix of the precompressed variant, by preference
+PRECOMPRESSED = {"br": ".br", "gzip": ".gz"}
+HASH_LENGTH = 12
+
+
+def vendor(static_dir: Path, refresh: bool = False) -> list[str]:
+    """Downloads the VENDORED files that are missing, returns their paths."""
+    downloaded = []
+    for name, url in VENDORED.items():
+        path = static_dir / name
+        if path.exists() and not refresh:
+            continue
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response:
+            path.write_bytes(response.read())
+        downloaded.append(name)
+    return downloaded
+
+
+def minify(name: str, data: bytes) -> bytes:
+    """Minified JS and CSS, other (and already minified) files as they are."""
+    if rjsmin is None or ".min." in name:
+        return data
+    if name.endswith(".js"):
+        return rjsmin.jsmin(data.decode()).encode()
+    if name.endswith(".css"):
+        return rcssmin.cssmin(data.decode()).encode()
+    return data
+
+
+def fingerprint(name: str, data: bytes) -> str:
+    """`js/app.js` -> `js/app.<hash of data>.js`"""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    path = Path(name)
+    return str(path.with_name(f"{path.stem}.{digest}{path.suffix}"))
+
+
+def _precompress(path: Path, data: bytes) -> None:
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data):
+            path.with_name(path.name + suffix).write_bytes(compressed)
+
+
+def build(static_dir: Path) -> dict[str, str]:
+    """Writes the hashed files and the manifest to `static_dir/dist`."""
+    dist = static_dir / DIST
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for source in sorted(static_dir.rglob("*")):
+        name = source.relative_to(static_dir).as_posix()
+        if not source.is_file() or name.startswith(f"{DIST}/"):
+            continue
+        data = minify(name, source.read_bytes())
+        manifest[name] = fingerprint(name, data)
+        target = dist / manifest[name]
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        if is_compressible(mimetypes.guess_type(name)[0]):
+            _precompress(target, data)
+    (dist / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True))
+    return manifest
+
+
+def init_app(app: Flask) -> None:
+    static_dir = Path(app.static_folder)
+    missing = [name for name in VENDORED if not (static_dir / name).exists()]
+    if missing:
+        logger.warning(
+            "Vendored assets are missing ({}), served from their CDN until "
+            "`uv run assets-build` downloads them",
+            ", ".join(missing),
+        )
+
+    manifest: dict[str, str] = {}
+    manifest_path = static_dir / DIST / MANIFEST
+    if app.config.get("ASSETS_FINGERPRINT") and manifest_path.exists():
+        manifest = json.loads(manifest_path.read_text())
+    dist = static_dir / DIST
+    # Hashed path under the static folder -> encodings of its variants
+    variants = {
+        f"{DIST}/{hashed}": [
+            encoding
+            for encoding, suffix in PRECOMPRESSED.items()
+            if (dist / f"{hashed}{suffix}").exists()
+        ]
+        for hashed in manifest.values()
+    }
+
+    @app.url_defaults
+    def hashed_static_url(endpoint: str, values: dict) -> None:
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = f"{DIST}/{manifest[values['filename']]}"
+
+    def static(filename: str) -> Response:
+        if filename in VENDORED and not (static_dir / filename).exists():
+            # A fresh clone: the pinned upstream file until the assets are built
+            return redirect(VENDORED[filename])
+        if filename not in variants:
+            return app.send_static_file(filename)
+        encoding = request.accept_encodings.best_match(variants[filename])
+        response = send_from_directory(
+            app.static_folder,
+            filename + PRECOMPRESSED[encoding] if encoding else filename,
+            mimetype=mimetypes.guess_type(filename)[0],
+            max_age=app.config["ASSETS_MAX_AGE"],
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions["static"] = static
@@ -0,0 +1,378 @@
+"""
+Response cache for read-heavy JSON endpoints.
+
+Cached views are keyed by path and normalized query arguments. Each entry
+carries tags (e.g. `book:42`) that writes invalidate, see `invalidate`.
+Entries are fresh for RESPONSE_CACHE_TTL seconds and may then be served
+stale for RESPONSE_CACHE_STALE_TTL more seconds while a background thread
+recomputes them (stale-while-revalidate).
+
+Backends:
+- "memory": per-process LRU, invalidation is visible only in this process.
+- "sqlite": local file shared by all processes of the host.
+- "none": caching disabled (default).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import wraps
+from typing import NamedTuple
+
+from flask import Flask, Response, current_app, has_app_context, make_response, request
+
+from my_web.lru import LRUCache
+from my_web.metrics import cache_lookups
+
+
+class CacheEntry(NamedTuple):
+    body: bytes
+    status: int
+    headers: list[tuple[str, str]]
+    fresh_until: float
+    stale_until: float
+
+
+class CacheBackend(ABC):
+    """
+    Storage interface. `generation` changes on every invalidation, so that a
+    response computed before a write is not stored after it.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> CacheEntry | None: ...
+
+    @abstractmethod
+    def set(self, key: str, entry: CacheEntry, tags: Iterable[str]) -> None: ...
+
+    @abstractmethod
+    def invalidate(self, tags: Iterable[str]) -> None: ...
+
+    @abstractmethod
+    def generation(self) -> int: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU of at most `maxsize` entries."""
+
+    def __init__(self, maxsize: int = 1024):
+        self._entries: LRUCache[str, tuple[CacheEntry, frozenset[str]]] = LRUCache(
+            maxsize, on_evict=self._unindex
+        )
+        self._keys_by_tag: dict[str, set[str]] = {}
+        self._generation = 0
+        # Guards the tag index together with the entries
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            item = self._entries.get(key)
+        return None if item is None else item[0]
+
+    def set(self, key: str, entry: CacheEntry, tags: Iterable[str]) -> None:
+        tags = frozenset(tags)
+        with self._lock:
+            self._remove(key)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            self._entries.set(key, (entry, tags), entry.stale_until - time.time())
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for tag in tags:
+                for key in self._keys_by_tag.pop(tag, set()):
+                    self._remove(key)
+
+    def generation(self) -> int:
+        return self._generation
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def _remove(self, key: str) -> None:
+        item = self._entries.pop(key)
+        if item is not None:
+            self._unindex(key, item)
+
+    def _unindex(self, key: str, item: tuple[CacheEntry, frozenset[str]]) -> None:
+        for tag in item[1]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+class SQLiteBackend(CacheBackend):
+    """Cache stored in a local SQLite file, shared between worker processes."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            body BLOB NOT NULL,
+            status INTEGER NOT NULL,
+            headers TEXT NOT NULL,
+            fresh_until REAL NOT NULL,
+            stale_until REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS tags (
+            tag TEXT NOT NULL,
+            key TEXT NOT NULL,
+            PRIMARY KEY (tag, key)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS ix_tags_key ON tags (key);
+        CREATE TABLE IF NOT EXISTS generation (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            value INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO generation (id, value) VALUES (1, 0);
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> CacheEntry | None:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT body, status, headers, fresh_until, stale_until "
+                "FROM entries WHERE key = ? AND stale_until >= ?",
+                (key, time.time()),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        body, status, headers, fresh_until, stale_until = row
+        return CacheEntry(
+            body,
+            status,
+            [tuple(h) for h in json.loads(headers)],
+            fresh_until,
+            stale_until,
+        )
+
+    def set(self, key: str, entry: CacheEntry, tags: Iterable[str]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    entry.body,
+                    entry.status,
+                    json.dumps(entry.headers),
+                    entry.fresh_until,
+                    entry.stale_until,
+                ),
+            )
+            conn.execute("DELETE FROM tags WHERE key = ?", (key,))
+            conn.executemany(
+                "INSERT INTO tags (tag, key) VALUES (?, ?)",
+                [(tag, key) for tag in set(tags)],
+            )
+            conn.execute("DELETE FROM entries WHERE stale_until < ?", (time.time(),))
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        tags = list(set(tags))
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE generation SET value = value + 1")
+            for tag in tags:
+                conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM tags WHERE tag = ?)",
+                    (tag,),
+                )
+                conn.execute(
+                    "DELETE FROM tags WHERE key NOT IN (SELECT key FROM entries)"
+                    " AND tag = ?",
+                    (tag,),
+                )
+
+    def generation(self) -> int:
+        return self._connect().execute("SELECT value FROM generation").fetchone()[0]
+
+    def clear(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("UPDATE generation SET value = value + 1")
+            conn.execute("DELETE FROM entries")
+            conn.execute("DELETE FROM tags")
+
+
+def _normalize(value: str) -> str:
+    """JSON arguments (sort, filter) are compared by content, not by spelling."""
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return value
+    if isinstance(parsed, (list, dict)):
+        return json.dumps(parsed, sort_keys=True, separators=(",", ":"))
+    return value
+
+
+class ResponseCache:
+    """Flask extension caching responses of decorated views."""
+
+    # Validators are kept so that hits can be answered with 304 Not Modified
+    STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="cache-refresh"
+        )
+        self._refreshing: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app: Flask) -> None:
+        backend_name = app.config.get("RESPONSE_CACHE_BACKEND", "none")
+        if backend_name == "memory":
+            backend = MemoryBackend(app.config.get("RESPONSE_CACHE_SIZE", 1024))
+        elif backend_name == "sqlite":
+            backend = SQLiteBackend(app.config["RESPONSE_CACHE_PATH"])
+        elif backend_name == "none":
+            backend = None
+        else:
+            raise ValueError(f"Unknown response cache backend '{backend_name}'")
+        app.extensions["response_cache"] = backend
+
+    @property
+    def backend(self) -> CacheBackend | None:
+        if not has_app_context():
+            return None
+        return current_app.extensions.get("response_cache")
+
+    def invalidate(self, tags: Iterable[str]) -> None:
+        """Drops all entries carrying any of `tags`."""
+        backend = self.backend
+        tags = list(tags)
+        if backend is not None and tags:
+            backend.invalidate(tags)
+
+    def key(self) -> str:
+        args = sorted(
+            (name, _normalize(value))
+            for name, value in request.args.items(multi=True)
+            if value != ""
+        )
+        return json.dumps([request.path, args], separators=(",", ":"))
+
+    def cached(self, tags: Callable[[Response], Iterable[str]] | None = None):
+        """
+        Caches successful GET responses of the decorated view. `tags` returns
+        the invalidation tags of a response.
+        """
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                backend = self.backend
+                if backend is None or request.method != "GET":
+                    return view(*args, **kwargs)
+
+                key = self.key()
+                entry = backend.get(key)
+                if entry is not None:
+                    if entry.fresh_until >= time.time():
+                        cache_lookups.inc(cache="response", result="hit")
+                        return self._response(entry, "HIT")
+                    cache_lookups.inc(cache="response", result="stale")
+                    self._refresh(key, view, args, kwargs, tags)
+                    return self._response(entry, "STALE")
+
+                cache_lookups.inc(cache="response", result="miss")
+                response = self._compute(backend, key, view, args, kwargs, tags)
+                response.headers["X-Cache"] = "MISS"
+                return response
+
+            return wrapper
+
+        return decorator
+
+    def _compute(self, backend, key, view, args, kwargs, tags) -> Response:
+        generation = backend.generation()
+        response = make_response(view(*args, **kwargs))
+        # Do not store what a concurrent write may have made stale already
+        if response.status_code == 200 and backend.generation() == generation:
+            config = current_app.config
+            now = time.time()
+            fresh_until = now + config.get("RESPONSE_CACHE_TTL", 30)
+            entry = CacheEntry(
+                response.get_data(),
+                response.status_code,
+                [
+                    (name, response.headers[name])
+                    for name in self.STORED_HEADERS
+                    if name in response.headers
+                ],
+                fresh_until,
+                fresh_until + config.get("RESPONSE_CACHE_STALE_TTL", 0),
+            )
+            backend.set(key, entry, tags(response) if tags else ())
+        return response
+
+    def _refresh(self, key, view, args, kwargs, tags) -> Future:
+        """Recomputes `key` in the background, at most once at a time."""
+        with self._lock:
+            future = self._refreshing.get(key)
+            if future is not None:
+                return future
+            app = current_app._get_current_object()
+            path, query = request.path, request.query_string
+
+            def refresh():
+                try:
+                    with app.test_request_context(path, query_string=query):
+                        backend = self.backend
+                        if backend is not None:
+                            self._compute(backend, key, view, args, kwargs, tags)
+                finally:
+                    with self._lock:
+                        self._refreshing.pop(key, None)
+
+            future = self._executor.submit(refresh)
+            self._refreshing[key] = future
+            return future
+
+    def wait(self) -> None:
+        """Waits for running background refreshes (used by tests)."""
+        with self._lock:
+            futures = list(self._refreshing.values())
+        for future in futures:
+            future.result()
+
+    @staticmethod
+    def _response(entry: CacheEntry, status: str) -> Response:
+        response = Response(entry.body, status=entry.status, headers=entry.headers)
+        response.headers["X-Cache"] = status
+        return response.make_conditional(request)
+
+
+response_cache = ResponseCache()
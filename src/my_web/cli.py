@@ -0,0 +1,204 @@
+"""
+Command line entry points (`uv run <command>`).
+
+Imports are local to the commands, so that a command loads only what it
+uses: `help` does not import Flask at all, Flask-Migrate (and Alembic),
+the fixtures and IPython are imported by the commands that need them. The
+import time budget is checked by `tests/test_cli.py`.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+HELP = """Usage:
+
+uv run web              # Run the Flask web server
+uv run shell            # Run a shell in the app context
+uv run db-init          # Initialize the database (create migration repository and initial migration)
+uv run db-migrate       # Create a new database migration from code changes
+uv run db-upgrade       # Apply database migrations to DB
+uv run db-fixtures      # Load initial data fixtures into the database
+                        #   --scale N [--seed S]: also generate N synthetic books
+uv run db-history       # Show the database migration history
+uv run db-current       # Show the current database revision
+uv run slow-queries     # Show the slow query log (--limit N, --endpoint E)
+uv run assets-build     # Vendor, minify, fingerprint and precompress static assets
+uv run help             # Show this help message
+
+Do not forget to set environment variables in a .env file.
+"""
+
+
+def migrations_app():
+    """
+    A bare app with the database and Flask-Migrate: the db-* commands need
+    neither the blueprints nor the other extensions of `create_app`.
+    """
+    from flask import Flask
+    from flask_migrate import Migrate
+
+    from my_web.config import settings
+    from my_web.db import models  # noqa: F401 - tables compared by autogenerate
+    from my_web.extensions import db
+    from my_web.services.search import include_name
+
+    app = Flask(settings.name)
+    app.config["SQLALCHEMY_DATABASE_URI"] = settings.sqlalchemy_database_uri
+    db.init_app(app)
+    Migrate(app, db, include_name=include_name)
+    return app
+
+
+def db_init() -> None:
+    from flask_migrate import init
+
+    app = migrations_app()
+    with app.app_context():
+        init()
+
+
+def db_migrate() -> None:
+    from flask_migrate import migrate
+
+    app = migrations_app()
+    msg = sys.argv[1] if len(sys.argv) > 1 else None
+    with app.app_context():
+        migrate(message=msg)
+
+
+def db_upgrade() -> None:
+    from flask_migrate import upgrade
+
+    app = migrations_app()
+    with app.app_context():
+        upgrade()
+
+
+def db_fixtures() -> None:
+    parser = argparse.ArgumentParser(prog="db-fixtures")
+    parser.add_argument(
+        "--scale", type=int, default=0, help="generate N synthetic books"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument(
+        "--chunk-size", type=int, default=10_000, help="rows per INSERT batch"
+    )
+    args = parser.parse_args()
+
+    from my_web.app import create_app
+    from my_web.db.fixtures import initial_library_data
+    from my_web.db.synthetic import generate_library
+    from my_web.extensions import db
+
+    app = create_app()
+    with app.app_context():
+        initial_library_data(app)
+        if args.scale > 0:
+            start = time.perf_counter()
+            with db.engine.begin() as connection:
+                counts = generate_library(
+                    connection, args.scale, args.seed, args.chunk_size
+                )
+            print(
+                f"Generated {counts.books} books, {counts.authors} authors and "
+                f"{counts.links} links in {time.perf_counter() - start:.1f} s"
+            )
+
+
+def db_history() -> None:
+    from flask_migrate import history
+
+    app = migrations_app()
+    with app.app_context():
+        history()
+
+
+def db_current() -> None:
+    from flask_migrate import current
+
+    app = migrations_app()
+    with app.app_context():
+        current()
+
+
+def show_slow_queries() -> None:
+    """Print the latest entries of the slow query log."""
+    from my_web import slow_queries
+    from my_web.config import settings
+
+    parser = argparse.ArgumentParser(prog="slow-queries")
+    parser.add_argument(
+        "--limit", type=int, default=20, help="show the N latest entries"
+    )
+    parser.add_argument("--endpoint", help="only queries of this endpoint")
+    parser.add_argument(
+        "--file", default=settings.slow_query_log, help="log file to read"
+    )
+    args = parser.parse_args()
+
+    entries = [
+        entry
+        for entry in slow_queries.read_log(args.file)
+        if args.endpoint is None or entry["endpoint"] == args.endpoint
+    ]
+    for entry in entries[-args.limit :]:
+        print(slow_queries.format_entry(entry), end="\n\n")
+
+
+def assets_build() -> None:
+    """Vendor, minify, fingerprint and precompress the static assets."""
+    parser = argparse.ArgumentParser(prog="assets-build")
+    parser.add_argument(
+        "--refresh", action="store_true", help="download vendored files again"
+    )
+    parser.add_argument(
+        "--offline", action="store_true", help="do not download vendored files"
+    )
+    args = parser.parse_args()
+
+    from my_web import assets
+
+    static_dir = Path(__file__).parent / "static"
+    if not args.offline:
+        try:
+            downloaded = assets.vendor(static_dir, args.refresh)
+        except OSError as e:
+            sys.exit(f"Downloading vendored assets failed: {e}")
+        for name in downloaded:
+            print(f"Downloaded {name}")
+    manifest = assets.build(static_dir)
+    print(f"Built {len(manifest)} assets into {static_dir / assets.DIST}")
+
+
+def run() -> None:
+    """Run the Flask app."""
+    from my_web.app import create_app
+    from my_web.config import settings
+
+    app = create_app()
+    app.run(debug=settings.debug, host=settings.host, port=settings.port)
+
+
+def app_help() -> None:
+    """Print help message."""
+    print(HELP)
+
+
+def shell() -> None:
+    """Run a shell in the app context."""
+    from my_web.app import create_app
+    from my_web.extensions import db
+
+    app = create_app()
+    with app.app_context():
+        namespace = {"app": app, "db": db}
+        try:
+            from IPython import embed
+
+            embed(header="", user_ns=namespace)
+        except ImportError:
+            import code
+
+            code.interact(local=namespace)
@@ -0,0 +1,168 @@
+"""
+Response compression.
+
+Responses of compressible types (HTML, JSON, CSV, ...) are compressed with
+the best encoding of COMPRESS_ALGORITHMS the client accepts: zstd and br
+need the `zstandard` and `brotli` packages (the `compression` extra),
+gzip is always available. Bodies below COMPRESS_MIN_SIZE bytes, responses
+with a Content-Encoding already, `Cache-Control: no-transform` and file
+responses are sent as they are. Streamed responses stay streamed: every
+chunk is compressed and flushed on its own.
+"""
+
+import zlib
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, Protocol
+
+from flask import Flask, Response, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+COMPRESSIBLE_TYPES = frozenset(
+    {
+        "application/json",
+        "application/javascript",
+        "application/x-ndjson",
+        "application/xml",
+        "image/svg+xml",
+    }
+)
+
+
+class Compressor(Protocol):
+    def compress(self, data: bytes) -> bytes: ...
+
+    # Everything compressed so far, the stream can go on
+    def flush(self) -> bytes: ...
+
+    def finish(self) -> bytes: ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        # wbits 31: gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# Content-Encoding -> (compressor, config key of its level)
+ENCODINGS: dict[str, tuple[Callable[[int], Compressor], str]] = {
+    "gzip": (GzipCompressor, "COMPRESS_GZIP_LEVEL"),
+}
+if brotli is not None:
+    ENCODINGS["br"] = (BrotliCompressor, "COMPRESS_BROTLI_LEVEL")
+if zstandard is not None:
+    ENCODINGS["zstd"] = (ZstdCompressor, "COMPRESS_ZSTD_LEVEL")
+
+
+def is_compressible(mimetype: str | None) -> bool:
+    return bool(mimetype) and (
+        mimetype.startswith("text/") or mimetype in COMPRESSIBLE_TYPES
+    )
+
+
+def choose_encoding(config: dict[str, Any]) -> str | None:
+    """Best encoding accepted by the client, in the order of COMPRESS_ALGORITHMS."""
+    available = [name for name in config["COMPRESS_ALGORITHMS"] if name in ENCODINGS]
+    return request.accept_encodings.best_match(available)
+
+
+def _compressed_stream(
+    source: Iterable[str | bytes], compressor: Compressor
+) -> Iterator[bytes]:
+    try:
+        for chunk in source:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        # The view's generator (and its context) is closed on disconnects too
+        if hasattr(source, "close"):
+            source.close()
+
+
+def compress_response(response: Response, config: dict[str, Any]) -> Response:
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or not is_compressible(response.mimetype)
+    ):
+        return response
+    response.vary.add("Accept-Encoding")
+    if response.cache_control.no_transform:
+        return response
+    encoding = choose_encoding(config)
+    if encoding is None:
+        return response
+    factory, level_key = ENCODINGS[encoding]
+
+    if response.is_streamed:
+        compressor = factory(config[level_key])
+        response.response = _compressed_stream(response.response, compressor)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config["COMPRESS_MIN_SIZE"]:
+            return response
+        compressor = factory(config[level_key])
+        response.set_data(compressor.compress(data) + compressor.finish())
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_app(app: Flask) -> None:
+    if not app.config.get("COMPRESS"):
+        return
+
+    @app.after_request
+    def compress(response: Response) -> Response:
+        return compress_response(response, app.config)
@@ -0,0 +1,77 @@
+"""
+Conditional GET support (ETag / Last-Modified -> 304 Not Modified).
+
+Views declare a version function that answers with a cheap version of the
+resource (one query over timestamps, see `BookService.get_version`). When
+the client already has that version, the view itself is not called, so
+entities are neither loaded nor serialized.
+"""
+
+import hashlib
+from collections.abc import Callable
+from datetime import datetime, timezone
+from functools import wraps
+from http import HTTPStatus
+from typing import Protocol
+
+from flask import Response, make_response, request
+
+
+class Versioned(Protocol):
+    token: str
+    last_modified: datetime | None
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive datetimes, they are UTC (CURRENT_TIMESTAMP)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def etag_for(version: Versioned) -> str:
+    return hashlib.blake2b(version.token.encode(), digest_size=16).hexdigest()
+
+
+def is_not_modified(etag: str, last_modified: datetime | None) -> bool:
+    """Evaluates If-None-Match (preferred) or If-Modified-Since."""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return _as_utc(last_modified) <= request.if_modified_since
+    return False
+
+
+def conditional(version: Callable[..., Versioned | None]):
+    """
+    Adds weak ETag and Last-Modified headers to GET responses of the view
+    and answers 304 Not Modified when the client's copy is current.
+    `version` gets the view arguments and returns None when the resource
+    does not exist (the view then handles the request as usual).
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+            current = version(**kwargs)
+            if current is None:
+                return view(*args, **kwargs)
+
+            etag = etag_for(current)
+            if is_not_modified(etag, current.last_modified):
+                response = Response(status=HTTPStatus.NOT_MODIFIED)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != HTTPStatus.OK:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            if current.last_modified is not None:
+                response.last_modified = _as_utc(current.last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
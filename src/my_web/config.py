@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -12,6 +14,94 @@ class Settings(BaseSettings):
 
     # Database configuration
     sqlalchemy_database_uri: str = "sqlite:///project.db"
+    # Read replicas (JSON list), reads of GET requests go to them round-robin
+    sqlalchemy_replica_uris: list[str] = []
+    replica_check_interval: float = 5.0  # seconds between replica pings
+
+    # Connection pool, None keeps the SQLAlchemy default
+    db_pool_size: int | None = None  # connections kept open
+    db_max_overflow: int | None = None  # connections opened beyond the size
+    db_pool_timeout: float | None = None  # seconds waiting for a connection
+    db_pool_recycle: int | None = None  # seconds, older connections are reopened
+    db_pool_pre_ping: bool = False  # test connections before handing them out
+
+    # SQLite pragmas applied on connect, None keeps the SQLite default
+    sqlite_journal_mode: (
+        Literal["delete", "truncate", "persist", "memory", "wal", "off"] | None
+    ) = "wal"
+    sqlite_synchronous: Literal["off", "normal", "full", "extra"] | None = "normal"
+    sqlite_busy_timeout: int | None = 5000  # milliseconds waiting for a lock
+    sqlite_mmap_size: int | None = 256 * 1024 * 1024  # bytes, 0 disables mmap
+    sqlite_cache_size: int | None = -64 * 1024  # pages, negative means KiB
+
+    # Pagination
+    max_page_size: int = 100  # rows, larger requested pages are capped
+    book_list_page_size: int = 20  # rows of the classic book list
+    count_cache_ttl: int = 300  # seconds, counts are also dropped on writes
+    count_estimate_threshold: int = 100_000  # rows, bigger tables are estimated
+
+    # Response cache of the JSON API: "none", "memory" or "sqlite"
+    response_cache_backend: Literal["none", "memory", "sqlite"] = "none"
+    response_cache_ttl: int = 30  # seconds an entry is fresh
+    response_cache_stale_ttl: int = 0  # seconds served stale while refreshing
+    response_cache_size: int = 1024  # entries, memory backend only
+    response_cache_path: str = "response_cache.db"  # sqlite backend only
+
+    # Streaming export: books fetched (and authors loaded) per round trip
+    export_chunk_size: int = 1000
+
+    # Bulk writes: rows per INSERT/UPDATE batch
+    bulk_chunk_size: int = 1000
+
+    # Instrumentation: Server-Timing header and one log line per request
+    server_timing: bool = False
+    request_log: bool = True
+
+    # Prometheus metrics on /metrics, METRICS_DIR merges multi-process workers
+    metrics: bool = False
+    metrics_dir: str = ""
+
+    # Slow query log with plans, 0 disables it; read with `uv run slow-queries`
+    slow_query_ms: float = 0  # statements taking at least this long are logged
+    slow_query_log: str = "slow_queries.log"
+    slow_query_log_max_bytes: int = 10_000_000  # rotated when bigger
+    slow_query_log_backups: int = 5  # rotated files kept
+
+    # Response compression, the first algorithm accepted by the client is used
+    # (zstd and br need the `compression` extra, gzip is always available)
+    compress: bool = True
+    compress_algorithms: list[Literal["zstd", "br", "gzip"]] = ["zstd", "br", "gzip"]
+    compress_min_size: int = 500  # bytes, smaller bodies are sent as they are
+    compress_gzip_level: int = 6  # 1-9
+    compress_brotli_level: int = 5  # 0-11
+    compress_zstd_level: int = 3  # 1-22
+
+    # Static assets built by `uv run assets-build`: hashed URLs, long caching
+    assets_fingerprint: bool = True  # serve the built assets when there are any
+    assets_max_age: int = 365 * 24 * 3600  # seconds, Cache-Control of hashed URLs
+
+    # Templates: compiled bytecode kept on disk, `{% cache %}` fragments
+    jinja_bytecode_cache: bool = True
+    jinja_bytecode_cache_dir: str = ""  # empty: a directory of the temp dir
+    template_fragment_cache_size: int = 4096  # fragments per process, 0 disables
+    template_fragment_cache_ttl: int = 300  # seconds, when the tag sets none
+
+    # Logged-in user of requests: "none", "memory" (per-process snapshots) or
+    # "session" (also signed claims in the session cookie, no query at all)
+    user_cache: Literal["none", "memory", "session"] = "memory"
+    user_cache_ttl: int = 60  # seconds, other processes see user changes after
+    user_cache_size: int = 1024  # users per process
+
+    # Passwords: bcrypt cost (2^N iterations), hashes of another cost are
+    # replaced at login; hashing runs in a bounded per-process thread pool
+    bcrypt_log_rounds: int = 12
+    password_hash_workers: int = 2  # concurrent hashes, 0 hashes inline
+    password_hash_queue_size: int = 16  # waiting hashes, more are refused (503)
+
+    # Async book API on /api/v1/async/book (needs the `async` extra), on an
+    # async engine; empty URI: SQLALCHEMY_DATABASE_URI with its async driver
+    async_api: bool = False
+    async_database_uri: str = ""
 
     # Server configuration
     debug: bool = False
@@ -0,0 +1,133 @@
+"""
+Async database access for async views.
+
+`adb` is the async counterpart of `db`: an async engine per app (on
+ASYNC_DATABASE_URI, by default SQLALCHEMY_DATABASE_URI with its async
+driver, e.g. aiosqlite) and one `AsyncSession` per app context,
+`adb.session`, closed at its teardown.
+
+Flask runs an async view in a new event loop per request by default, which
+would leave pooled connections bound to dead loops. With ASYNC_API enabled
+all async views of the process run on one long-lived loop in a background
+thread instead (`loop_thread`): connections are pooled, and the database
+waits of concurrent requests overlap on that loop while their request
+threads wait for the result. Context variables (the app and request
+contexts) are copied into the coroutine.
+
+The async session is a plain SQLAlchemy session: commits notify `events`
+subscribers like the sync ones, but reads are not routed to replicas.
+"""
+
+import asyncio
+import functools
+import threading
+from collections.abc import Callable, Coroutine
+from typing import Any, TypeVar
+
+from flask import Flask, current_app, g
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from my_web.db import tuning
+
+T = TypeVar("T")
+
+# Sync driver -> async driver of the same database
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "mysql": "mysql+aiomysql",
+}
+
+
+def async_uri(uri: str) -> str:
+    """`uri` with the async driver of its database."""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if url.drivername == backend and backend in ASYNC_DRIVERS:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    return url.render_as_string(hide_password=False)
+
+
+class LoopThread:
+    """An event loop running forever in a daemon thread, started on first use."""
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="async-views", daemon=True
+                ).start()
+            return self._loop
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Runs `coro` on the loop and waits for its result."""
+        # The callback scheduling the task runs in a copy of this context
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def async_to_sync(
+        self, func: Callable[..., Coroutine[Any, Any, T]]
+    ) -> Callable[..., T]:
+        """Replaces `Flask.async_to_sync`."""
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> T:
+            return self.run(func(*args, **kwargs))
+
+        return wrapper
+
+
+loop_thread = LoopThread()
+
+
+class AsyncDatabase:
+    """Async engine and sessions of the apps, used like `db`."""
+
+    def init_app(self, app: Flask) -> None:
+        if not app.config.get("ASYNC_API"):
+            return
+        uri = app.config.get("ASYNC_DATABASE_URI") or async_uri(
+            app.config["SQLALCHEMY_DATABASE_URI"]
+        )
+        engine = create_async_engine(uri, **tuning.engine_options(app.config))
+        if engine.dialect.name == "sqlite":
+            tuning.listen_pragmas(engine.sync_engine, app.config)
+        app.extensions["async_db"] = async_sessionmaker(engine, expire_on_commit=False)
+        app.async_to_sync = loop_thread.async_to_sync
+        app.teardown_appcontext(self._close_session)
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return current_app.extensions["async_db"].kw["bind"]
+
+    @property
+    def session(self) -> AsyncSession:
+        """The session of the current app context."""
+        if "_async_session" not in g:
+            g._async_session = current_app.extensions["async_db"]()
+        return g._async_session
+
+    def dispose(self, app: Flask) -> None:
+        """Closes the pooled connections of `app`'s engine."""
+        engine = app.extensions["async_db"].kw["bind"]
+        loop_thread.run(engine.dispose())
+
+    @staticmethod
+    def _close_session(exception: BaseException | None) -> None:
+        session = g.pop("_async_session", None)
+        if session is not None:
+            loop_thread.run(session.close())
+
+
+adb = AsyncDatabase()
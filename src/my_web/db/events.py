@@ -0,0 +1,79 @@
+"""
+Change notifications for caches and derived data.
+
+Every ORM flush records the primary keys written per table. `on_flush`
+subscribers run inside the transaction (e.g. to keep derived tables in
+sync), `on_commit` subscribers run once the data is committed (e.g. to
+invalidate caches). Core statements that bypass the unit of work must
+report their writes with `mark_changed`.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from itertools import chain
+from typing import Any
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+# table name -> primary keys written
+Changes = dict[str, set[Any]]
+
+_flush_subscribers: list[Callable[[Session, Changes], None]] = []
+_commit_subscribers: list[Callable[[Changes], None]] = []
+
+
+def on_flush(fn: Callable[[Session, Changes], None]):
+    """Registers `fn(session, changes)` to run after each flush."""
+    _flush_subscribers.append(fn)
+    return fn
+
+
+def on_commit(fn: Callable[[Changes], None]):
+    """Registers `fn(changes)` to run after each commit that wrote something."""
+    _commit_subscribers.append(fn)
+    return fn
+
+
+def mark_changed(session: Session, table: str, pks: Iterable[Any]) -> None:
+    """Reports rows written by Core statements (bulk inserts, updates...)."""
+    _dispatch(session, {table: set(pks)})
+
+
+def _dispatch(session: Session, changes: Changes) -> None:
+    if not changes:
+        return
+    for fn in _flush_subscribers:
+        fn(session, changes)
+    pending = session.info.setdefault("changes", defaultdict(set))
+    for table, pks in changes.items():
+        pending[table].update(pks)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session: Session, flush_context) -> None:
+    changes: Changes = defaultdict(set)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        mapper = inspect(obj).mapper
+        pk = mapper.primary_key_from_instance(obj)
+        changes[mapper.local_table.name].add(pk[0] if len(pk) == 1 else tuple(pk))
+    _dispatch(session, changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_commit(session: Session) -> None:
+    changes = session.info.pop("changes", None)
+    if not changes:
+        return
+    for fn in _commit_subscribers:
+        fn(changes)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changes(session: Session, previous_transaction) -> None:
+    # Writes rolled back to a savepoint may still be followed by a commit;
+    # keep them, invalidating too much is harmless.
+    if not previous_transaction.nested:
+        session.info.pop("changes", None)
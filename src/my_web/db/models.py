@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 
 from flask_login import UserMixin
@@ -18,6 +18,10 @@ class Role(Enum):
     ADMIN = "admin"
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class TimestampMixin:
     """
     Mixin for times logs
@@ -30,7 +34,9 @@ class TimestampMixin:
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
-        onupdate=func.now(),
+        # Python side: SQLite CURRENT_TIMESTAMP has one-second resolution,
+        # `updated_at` is part of HTTP validators (see `my_web.conditional`)
+        onupdate=utcnow,
         nullable=False,
     )
 
@@ -0,0 +1,177 @@
+"""
+Read-replica routing.
+
+With SQLALCHEMY_REPLICA_URIS set, SELECT statements of read-only contexts
+go to a replica: GET/HEAD/OPTIONS requests and, outside of requests,
+service methods decorated with `read_only`. Other requests and methods
+decorated with `read_write` use the primary. A session sticks to one
+replica (chosen round-robin among the healthy ones) and, once it has
+written anything, to the primary for the rest of its life (the request),
+so that it reads its own writes.
+
+Replicas are checked with a ping at most every REPLICA_CHECK_INTERVAL
+seconds and skipped while they are down; without any healthy replica
+reads go to the primary.
+"""
+
+import functools
+import itertools
+import threading
+import time
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from flask import Flask, current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Engine, Select, event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.sql.dml import UpdateBase
+
+PRIMARY = "primary"
+REPLICA = "replica"
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+BIND_PREFIX = "replica_"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Routing chosen by the innermost decorated service call, if any
+_mode: ContextVar[str | None] = ContextVar("routing", default=None)
+
+
+def current_mode() -> str:
+    mode = _mode.get()
+    if mode is None and has_request_context():
+        return REPLICA if request.method in SAFE_METHODS else PRIMARY
+    return mode or PRIMARY
+
+
+def _routed(mode: str, fn: F) -> F:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # The request method decides reads, a primary context is never left
+        if mode == REPLICA and (_mode.get() is not None or has_request_context()):
+            return fn(*args, **kwargs)
+        token = _mode.set(mode)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _mode.reset(token)
+
+    return wrapper
+
+
+def read_only(fn: F) -> F:
+    """Lets reads of the method go to a replica outside of requests."""
+    return _routed(REPLICA, fn)
+
+
+def read_write(fn: F) -> F:
+    """Keeps reads and writes of the method (and of nested calls) on the primary."""
+    return _routed(PRIMARY, fn)
+
+
+class ReplicaSet:
+    """Round-robin over replica engines, skipping those failing a ping."""
+
+    def __init__(self, engines: list[Engine], check_interval: float):
+        self.engines = engines
+        self.check_interval = check_interval
+        self._next = itertools.count()
+        # engine -> (monotonic time of the last check, healthy)
+        self._checked: dict[Engine, tuple[float, bool]] = {}
+        self._lock = threading.Lock()
+
+    def choose(self) -> Engine | None:
+        start = next(self._next)
+        for offset in range(len(self.engines)):
+            engine = self.engines[(start + offset) % len(self.engines)]
+            if self.is_healthy(engine):
+                return engine
+        return None
+
+    def is_healthy(self, engine: Engine) -> bool:
+        now = time.monotonic()
+        checked = self._checked.get(engine)
+        if checked is not None and now - checked[0] < self.check_interval:
+            return checked[1]
+        with self._lock:
+            # Another thread may have checked it meanwhile
+            checked = self._checked.get(engine)
+            if checked is None or now - checked[0] >= self.check_interval:
+                checked = self._checked[engine] = (now, self._ping(engine))
+        return checked[1]
+
+    def mark_down(self, engine: Engine) -> None:
+        self._checked[engine] = (time.monotonic(), False)
+
+    @staticmethod
+    def _ping(engine: Engine) -> bool:
+        # A raw connection: pings are not counted as queries of the request
+        errors = (DBAPIError, engine.dialect.loaded_dbapi.Error)
+        try:
+            connection = engine.raw_connection()
+        except errors:
+            return False
+        try:
+            return engine.dialect.do_ping(connection.dbapi_connection)
+        except errors:
+            connection.invalidate()
+            return False
+        finally:
+            connection.close()
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["primary"] = True
+        if (
+            bind is not None
+            or not isinstance(clause, Select)
+            or clause._for_update_arg is not None
+            or self.info.get("primary")
+            or engine is not self._db.engines.get(None)
+            or current_mode() != REPLICA
+        ):
+            return engine
+
+        replicas: ReplicaSet | None = current_app.extensions.get("replicas")
+        if replicas is None:
+            return engine
+        if "replica" not in self.info:
+            self.info["replica"] = replicas.choose()
+        return self.info["replica"] or engine
+
+
+def replica_binds(config: dict[str, Any]) -> dict[str, str]:
+    """SQLALCHEMY_BINDS of the SQLALCHEMY_REPLICA_URIS."""
+    return {
+        f"{BIND_PREFIX}{index}": uri
+        for index, uri in enumerate(config.get("SQLALCHEMY_REPLICA_URIS") or ())
+    }
+
+
+def _handle_error(replicas: ReplicaSet, engine: Engine, context) -> None:
+    if context.is_disconnect:
+        replicas.mark_down(engine)
+
+
+def init_app(app: Flask) -> None:
+    binds = replica_binds(app.config)
+    if not binds:
+        return
+    db = app.extensions["sqlalchemy"]
+    with app.app_context():
+        engines = [db.engines[key] for key in binds]
+    # No model uses these binds, their MetaData (empty, created for every bind)
+    # would make `create_all()` of any later app require them
+    for key in binds:
+        db.metadatas.pop(key, None)
+    replicas = ReplicaSet(engines, app.config["REPLICA_CHECK_INTERVAL"])
+    app.extensions["replicas"] = replicas
+    for engine in engines:
+        event.listen(
+            engine, "handle_error", functools.partial(_handle_error, replicas, engine)
+        )
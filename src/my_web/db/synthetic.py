@@ -0,0 +1,157 @@
+"""
+Synthetic library of arbitrary size for benchmarks and query-plan work.
+
+Rows are generated from a seeded random generator (same seed, same data)
+and written with chunked executemany Core INSERTs, bypassing the ORM unit
+of work. Authors follow a skewed popularity distribution: most books have
+one author, a few authors wrote most of the books.
+"""
+
+import random
+from collections.abc import Iterator
+from typing import NamedTuple
+
+from sqlalchemy import Connection, Table, func, select, text
+
+from my_web.db.models import Author, Book, BookAuthorAssociation
+from my_web.services import search
+
+FIRST_NAMES = [
+    "Ada", "Alan", "Anna", "Boris", "Clara", "David", "Elena", "Emil", "Eva",
+    "Frank", "Grace", "Hana", "Ivan", "Jakub", "Jana", "Karel", "Lucie",
+    "Marek", "Marie", "Martin", "Nina", "Olga", "Pavel", "Petra", "Robert",
+    "Sofia", "Tomas", "Ursula", "Viktor", "Zofia",
+]  # fmt: skip
+LAST_NAMES = [
+    "Adams", "Becker", "Novak", "Dvorak", "Evans", "Fischer", "Garcia",
+    "Horak", "Ivanova", "Jensen", "Kowalski", "Larsen", "Moreau", "Nielsen",
+    "Okafor", "Petrov", "Quinn", "Rossi", "Svoboda", "Tanaka", "Urban",
+    "Varga", "Weber", "Xu", "Yilmaz", "Zeman", "Cerny", "Kral", "Lang", "Muller",
+]  # fmt: skip
+ADJECTIVES = [
+    "Silent", "Last", "Broken", "Golden", "Hidden", "Lost", "Northern",
+    "Red", "Secret", "Shattered", "Burning", "Endless", "Forgotten", "Iron",
+    "Distant", "Quiet", "Wild", "Winter", "Hollow", "Crimson",
+]  # fmt: skip
+NOUNS = [
+    "Kingdom", "River", "Garden", "Empire", "Shadow", "Crown", "Sea", "City",
+    "Dragon", "Clock", "Library", "Mountain", "Storm", "Witch", "Road",
+    "Forest", "Mirror", "Tower", "Song", "Harbor",
+]  # fmt: skip
+TITLE_PATTERNS = [
+    "The {adj} {noun}",
+    "{noun} of the {adj} {noun2}",
+    "A {noun} in {noun2}",
+    "The {noun} and the {noun2}",
+    "{adj} {noun}",
+]
+# Probabilities of a book having 1, 2 or 3 authors
+AUTHORS_PER_BOOK = ([1, 2, 3], [80, 15, 5])
+# Share of books without an ISBN
+MISSING_ISBN = 0.03
+
+
+class GeneratedCounts(NamedTuple):
+    books: int
+    authors: int
+    links: int
+
+
+def _isbn(number: int) -> str:
+    """Unique, valid ISBN-13 in the 979-8 range for a book number."""
+    digits = f"9798{number:08d}"
+    check = -sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits)) % 10
+    return f"{digits}{check}"
+
+
+def _author_name(number: int) -> str:
+    first = FIRST_NAMES[number % len(FIRST_NAMES)]
+    rest, last_index = divmod(number // len(FIRST_NAMES), len(LAST_NAMES))
+    last = LAST_NAMES[last_index]
+    if rest == 0:
+        return f"{first} {last}"
+    # Middle initials keep names unique (and short) for large scales
+    initials = []
+    while rest:
+        rest, letter = divmod(rest - 1, 26)
+        initials.append(f"{chr(ord('A') + letter)}.")
+    return f"{first} {' '.join(reversed(initials))} {last}"
+
+
+def _title(rng: random.Random) -> str:
+    return rng.choice(TITLE_PATTERNS).format(
+        adj=rng.choice(ADJECTIVES),
+        noun=rng.choice(NOUNS),
+        noun2=rng.choice(NOUNS),
+    )
+
+
+def _next_id(connection: Connection, table: Table) -> int:
+    return (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def _chunks(rows: list, size: int) -> Iterator[list]:
+    for start in range(0, len(rows), size):
+        yield rows[start : start + size]
+
+
+def _reset_sequence(connection: Connection, table: Table) -> None:
+    """Explicit ids do not advance PostgreSQL sequences."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"(SELECT max(id) FROM {table.name}))"
+            )
+        )
+
+
+def generate_library(
+    connection: Connection, scale: int, seed: int = 0, chunk_size: int = 10_000
+) -> GeneratedCounts:
+    """
+    Adds `scale` books and `scale // 5` authors (at least one) to the
+    database of `connection`, links them and reindexes the search table.
+    Existing rows are kept, new ids follow the current maximum.
+    """
+    rng = random.Random(seed)
+    authors, books = Author.__table__, Book.__table__
+    links_table = BookAuthorAssociation.__table__
+
+    first_author = _next_id(connection, authors)
+    first_book = _next_id(connection, books)
+    author_count = max(scale // 5, 1)
+
+    author_rows = [
+        {"id": first_author + i, "name": _author_name(first_author + i)}
+        for i in range(author_count)
+    ]
+    for chunk in _chunks(author_rows, chunk_size):
+        connection.execute(authors.insert(), chunk)
+
+    counts, weights = AUTHORS_PER_BOOK
+    links = 0
+    for start in range(0, scale, chunk_size):
+        book_rows, link_rows = [], []
+        for book_id in range(
+            first_book + start, first_book + min(start + chunk_size, scale)
+        ):
+            isbn = None if rng.random() < MISSING_ISBN else _isbn(book_id)
+            book_rows.append({"id": book_id, "title": _title(rng), "isbn": isbn})
+            # Cubed uniform draw: low author numbers are much more popular
+            book_authors = {
+                first_author + int(author_count * rng.random() ** 3)
+                for _ in range(rng.choices(counts, weights)[0])
+            }
+            link_rows.extend(
+                {"book_id": book_id, "author_id": author_id}
+                for author_id in book_authors
+            )
+        connection.execute(books.insert(), book_rows)
+        connection.execute(links_table.insert(), link_rows)
+        links += len(link_rows)
+
+    _reset_sequence(connection, authors)
+    _reset_sequence(connection, books)
+    search.rebuild(connection)
+    return GeneratedCounts(scale, author_count, links)
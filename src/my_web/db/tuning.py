@@ -0,0 +1,88 @@
+"""
+Engine tuning: connection pool options and SQLite pragmas.
+
+`engine_options` turns the DB_POOL_* settings into SQLALCHEMY_ENGINE_OPTIONS
+(unset ones keep the SQLAlchemy defaults), `init_app` applies the SQLITE_*
+pragmas to every new SQLite connection. The defaults favour concurrent
+reads: WAL lets readers proceed while a write is in progress and
+`synchronous=NORMAL` is durable enough with WAL (a power loss can only
+drop the last commits, never corrupt the database).
+"""
+
+from typing import Any
+
+from flask import Flask
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import make_url
+
+from my_web.extensions import db
+
+# QueuePool arguments, in-memory SQLite uses a StaticPool that rejects them
+QUEUE_POOL_OPTIONS = {
+    "DB_POOL_SIZE": "pool_size",
+    "DB_MAX_OVERFLOW": "max_overflow",
+    "DB_POOL_TIMEOUT": "pool_timeout",
+}
+POOL_OPTIONS = {
+    "DB_POOL_RECYCLE": "pool_recycle",
+    "DB_POOL_PRE_PING": "pool_pre_ping",
+}
+# Config key -> pragma, applied in this order (journal mode first)
+PRAGMAS = {
+    "SQLITE_JOURNAL_MODE": "journal_mode",
+    "SQLITE_SYNCHRONOUS": "synchronous",
+    "SQLITE_BUSY_TIMEOUT": "busy_timeout",
+    "SQLITE_MMAP_SIZE": "mmap_size",
+    "SQLITE_CACHE_SIZE": "cache_size",
+}
+
+
+def _in_memory(uri: str) -> bool:
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(config: dict[str, Any]) -> dict[str, Any]:
+    """SQLALCHEMY_ENGINE_OPTIONS of the DB_POOL_* config values that are set."""
+    options = dict(POOL_OPTIONS)
+    if not _in_memory(config["SQLALCHEMY_DATABASE_URI"]):
+        options.update(QUEUE_POOL_OPTIONS)
+    return {
+        name: config[key]
+        for key, name in options.items()
+        if config.get(key) is not None
+    }
+
+
+def pragmas(config: dict[str, Any]) -> list[str]:
+    """PRAGMA statements of the SQLITE_* config values that are set."""
+    return [
+        f"PRAGMA {pragma} = {config[key]}"
+        for key, pragma in PRAGMAS.items()
+        if config.get(key) is not None
+    ]
+
+
+def listen_pragmas(engine: Engine, config: dict[str, Any]) -> None:
+    """Applies the SQLITE_* pragmas to every new connection of `engine`."""
+    statements = pragmas(config)
+    if not statements:
+        return
+
+    def set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    event.listen(engine, "connect", set_pragmas)
+
+
+def init_app(app: Flask) -> None:
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == "sqlite":
+            listen_pragmas(engine, app.config)
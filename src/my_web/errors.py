@@ -12,6 +12,15 @@ class ResourceNotFound(Exception):
     pass
 
 
+class InvalidRequest(ValueError):
+    """
+    Raised when request parameters are malformed (e.g., a broken pagination cursor).
+    Results in a 400 Bad Request HTTP response.
+    """
+
+    pass
+
+
 class BusinessError(ValueError):
     """
     Raised when a business rule is violated (e.g., duplicate entry, invalid state).
@@ -60,6 +69,14 @@ def register_error_handlers(app: Flask):
         """
         return jsonify({"error": str(e) or "Not Found"}), HTTPStatus.NOT_FOUND
 
+    @app.errorhandler(InvalidRequest)
+    def handle_invalid_request(e):
+        """
+        Handles malformed request parameters.
+        Returns 400 Bad Request.
+        """
+        return jsonify({"error": str(e)}), HTTPStatus.BAD_REQUEST
+
     @app.errorhandler(ValueError)
     @app.errorhandler(BusinessError)
     def handle_business_error(e):
@@ -1,11 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 
-db = SQLAlchemy()
+from my_web.db.routing import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 bcrypt = Bcrypt()
 login_manager = LoginManager()
-migrate = Migrate()
 csrf = CSRFProtect()
@@ -0,0 +1,135 @@
+"""
+User identity of requests.
+
+Flask-Login loads the user of every authenticated request. Instead of the
+ORM object, `current_user` is an immutable `CurrentUser` snapshot (id,
+name, email, role) and, with USER_CACHE:
+
+- "memory": snapshots are kept in a per-process LRU for USER_CACHE_TTL
+  seconds. Commits writing a user (profile, role or password change) drop
+  its snapshot in this process, other processes see the change after the
+  ttl.
+- "session": as "memory", and the snapshot is also stored as claims in the
+  signed session cookie, valid for USER_CACHE_TTL seconds: requests (and
+  role checks) do not touch the database at all until they expire. The
+  cookie is signed, not encrypted, the user can read their own claims.
+- "none": the user is loaded from the database on every request.
+
+Code that needs to write the user loads it with `db.session.get(User, ...)`.
+"""
+
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from flask import Flask, current_app, has_request_context, session
+from flask_login import UserMixin, user_logged_in, user_logged_out
+
+from my_web.db import events
+from my_web.db.models import Role, User
+from my_web.extensions import db, login_manager
+from my_web.lru import LRUCache
+
+CLAIMS_KEY = "_identity"
+
+
+@dataclass(frozen=True, eq=False)
+class CurrentUser(UserMixin):
+    """Read-only snapshot of a user, `eq=False` keeps UserMixin's comparison."""
+
+    id: int
+    name: str
+    email: str
+    role: Role
+    updated_at: datetime
+
+    @classmethod
+    def of(cls, user: User) -> "CurrentUser":
+        return cls(user.id, user.name, user.email, user.role, user.updated_at)
+
+    def claims(self, expires_at: float) -> dict:
+        return {
+            **asdict(self),
+            "role": self.role.value,
+            "updated_at": self.updated_at.isoformat(),
+            "expires_at": expires_at,
+        }
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> "CurrentUser":
+        return cls(
+            claims["id"],
+            claims["name"],
+            claims["email"],
+            Role(claims["role"]),
+            datetime.fromisoformat(claims["updated_at"]),
+        )
+
+
+class UserCache(LRUCache[int, CurrentUser]):
+    """Per-process LRU of user snapshots keyed by user id."""
+
+    def invalidate(self, changes: events.Changes) -> None:
+        user_ids = changes.get(User.__tablename__)
+        if not user_ids:
+            return
+        for user_id in user_ids:
+            self.pop(user_id)
+        # The claims of the user changing their own account
+        if has_request_context():
+            claims = session.get(CLAIMS_KEY)
+            if claims is not None and claims["id"] in user_ids:
+                session.pop(CLAIMS_KEY)
+
+
+user_cache = UserCache()
+events.on_commit(user_cache.invalidate)
+
+
+def _remember(user: CurrentUser) -> None:
+    mode = current_app.config["USER_CACHE"]
+    ttl = current_app.config["USER_CACHE_TTL"]
+    if mode != "none":
+        user_cache.set(user.id, user, ttl)
+    if mode == "session":
+        session[CLAIMS_KEY] = user.claims(time.time() + ttl)
+
+
+@login_manager.user_loader
+def load_user(user_id: str) -> CurrentUser | None:
+    user_id = int(user_id)
+    if current_app.config["USER_CACHE"] == "session":
+        claims = session.get(CLAIMS_KEY)
+        if (
+            claims is not None
+            and claims["id"] == user_id
+            and claims["expires_at"] > time.time()
+        ):
+            return CurrentUser.from_claims(claims)
+    if current_app.config["USER_CACHE"] != "none":
+        user = user_cache.get(user_id)
+        if user is not None:
+            return user
+    orm_user = db.session.get(User, user_id)
+    if orm_user is None:
+        return None
+    user = CurrentUser.of(orm_user)
+    _remember(user)
+    return user
+
+
+def _logged_in(sender: Flask, user: User) -> None:
+    # The next requests of the user need no query
+    _remember(CurrentUser.of(user))
+
+
+def _logged_out(sender: Flask, user) -> None:
+    session.pop(CLAIMS_KEY, None)
+
+
+def init_app(app: Flask) -> None:
+    user_logged_in.connect(_logged_in, app)
+    user_logged_out.connect(_logged_out, app)
+    user_cache.maxsize = app.config["USER_CACHE_SIZE"]
+    # Users of the database of a previous app
+    user_cache.clear()
@@ -0,0 +1,165 @@
+"""
+Per-request instrumentation.
+
+SQL statements are counted and timed from engine events, template
+rendering from Flask signals and serialization by the JSON provider and
+`timed("serialize")` blocks. Every request reports them in a
+`Server-Timing` header (SERVER_TIMING) and one structured log line
+(REQUEST_LOG).
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from flask import (
+    Flask,
+    Response,
+    before_render_template,
+    g,
+    request,
+    request_started,
+    template_rendered,
+)
+from loguru import logger
+from sqlalchemy import Engine, event
+
+
+@dataclass
+class Stats:
+    queries: int = 0
+    db_ms: float = 0.0
+    serialize_ms: float = 0.0
+    template_ms: float = 0.0
+    # Executed statements, only kept by `record(statements=True)`
+    statements: list[str] | None = None
+
+
+# Stats collecting the work of the current context: the request's and those
+# of enclosing `record()` blocks
+_active: ContextVar[tuple[Stats, ...]] = ContextVar("instrumentation", default=())
+
+
+def _elapsed_ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def _add(name: str, ms: float) -> None:
+    for stats in _active.get():
+        setattr(stats, name, getattr(stats, name) + ms)
+
+
+@contextmanager
+def record(statements: bool = False) -> Iterator[Stats]:
+    """Collects stats of everything (including requests) run in the block."""
+    stats = Stats(statements=[] if statements else None)
+    token = _active.set(_active.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Adds the duration of the block to `<name>_ms` of the active stats."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _add(f"{name}_ms", _elapsed_ms(start))
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    elapsed = _elapsed_ms(conn.info["query_start"].pop())
+    for stats in _active.get():
+        stats.queries += 1
+        stats.db_ms += elapsed
+        if stats.statements is not None:
+            stats.statements.append(statement)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context) -> None:
+    starts = context.connection.info.get("query_start") if context.connection else None
+    if starts:
+        _add("db_ms", _elapsed_ms(starts.pop()))
+
+
+def _request_started(sender: Flask, **extra) -> None:
+    # Before any before_request function, so that their queries count too
+    g._request_stats = Stats()
+    g._request_start = time.perf_counter()
+    g._request_token = _active.set(_active.get() + (g._request_stats,))
+
+
+def _template_started(sender: Flask, template, context, **extra) -> None:
+    g.setdefault("_template_starts", []).append(time.perf_counter())
+
+
+def _template_rendered(sender: Flask, template, context, **extra) -> None:
+    starts = g.get("_template_starts")
+    if starts:
+        _add("template_ms", _elapsed_ms(starts.pop()))
+
+
+def request_timing() -> tuple[Stats, float] | None:
+    """Stats and milliseconds elapsed so far of the current request."""
+    stats = g.get("_request_stats")
+    if stats is None:
+        return None
+    return stats, _elapsed_ms(g._request_start)
+
+
+def server_timing(stats: Stats, total_ms: float) -> str:
+    return ", ".join(
+        [
+            f'db;dur={stats.db_ms:.2f};desc="{stats.queries} queries"',
+            f"serialize;dur={stats.serialize_ms:.2f}",
+            f"template;dur={stats.template_ms:.2f}",
+            f"total;dur={total_ms:.2f}",
+        ]
+    )
+
+
+def init_app(app: Flask) -> None:
+    request_started.connect(_request_started, app)
+    before_render_template.connect(_template_started, app)
+    template_rendered.connect(_template_rendered, app)
+
+    @app.after_request
+    def report_request(response: Response) -> Response:
+        timing = request_timing()
+        if timing is None:
+            return response
+        stats, total_ms = timing
+        if app.config.get("SERVER_TIMING"):
+            response.headers["Server-Timing"] = server_timing(stats, total_ms)
+        if app.config.get("REQUEST_LOG"):
+            # Keyword arguments also end up in the record's `extra` (structured)
+            logger.info(
+                "{method} {path} {status} {duration_ms}ms queries={queries}",
+                method=request.method,
+                path=request.path,
+                status=response.status_code,
+                duration_ms=round(total_ms, 2),
+                queries=stats.queries,
+                db_ms=round(stats.db_ms, 2),
+                serialize_ms=round(stats.serialize_ms, 2),
+                template_ms=round(stats.template_ms, 2),
+            )
+        return response
+
+    @app.teardown_request
+    def end_request(exc: BaseException | None) -> None:
+        token = g.pop("_request_token", None)
+        if token is not None:
+            _active.reset(token)
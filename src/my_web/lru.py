@@ -0,0 +1,77 @@
+"""
+Per-process LRU with expiring entries, the storage of the in-memory caches
+(row counts, responses, template fragments, logged-in users).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe LRU of at most `maxsize` entries (nothing is stored when it
+    is 0), each expiring `ttl` seconds after it was set. `on_evict` is
+    called, under the lock of the cache, with the key and value of entries
+    dropped as expired or least recently used, or not stored at all.
+    """
+
+    def __init__(
+        self, maxsize: int = 1024, on_evict: Callable[[K, V], None] | None = None
+    ):
+        self.maxsize = maxsize
+        self._on_evict = on_evict
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self._evicted(key, value)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V, ttl: float) -> None:
+        with self._lock:
+            if self.maxsize <= 0:
+                self._evicted(key, value)
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                oldest, (_, evicted) = self._entries.popitem(last=False)
+                self._evicted(oldest, evicted)
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return None if entry is None else entry[1]
+
+    def pop_where(self, predicate: Callable[[K, V], bool]) -> None:
+        """Drops the entries for which `predicate(key, value)` is true."""
+        with self._lock:
+            stale = [k for k, (_, v) in self._entries.items() if predicate(k, v)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _evicted(self, key: K, value: V) -> None:
+        if self._on_evict is not None:
+            self._on_evict(key, value)
@@ -0,0 +1,333 @@
+"""
+Application metrics in the Prometheus text exposition format.
+
+Metrics are kept in a per-process registry. With METRICS_DIR set, every
+worker process also writes its values to `<METRICS_DIR>/metrics-<pid>.json`
+(at most every FLUSH_INTERVAL seconds and on exit) and `/metrics` merges
+the files of all workers: counters and histograms are summed, gauges are
+summed over the processes that are still running. Empty the directory
+whenever the server is (re)started.
+
+The `/metrics` route is registered only with METRICS enabled.
+"""
+
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, TypeVar
+
+from flask import Flask, Response, request
+
+from my_web import instrumentation
+from my_web.extensions import db
+
+FLUSH_INTERVAL = 1.0  # seconds between snapshots written by a worker
+# Seconds, the defaults of the official Prometheus clients
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.075,
+    0.1,
+    0.25,
+    0.5,
+    0.75,
+    1.0,
+    2.5,
+    5.0,
+    7.5,
+    10.0,
+)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = tuple[str, ...]
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[Labels, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> Labels:
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(
+                f"Metric '{self.name}' has labels {self.labelnames}, "
+                f"got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> dict[Labels, Any]:
+        with self._lock:
+            return {
+                key: list(value) if isinstance(value, list) else value
+                for key, value in self._values.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Values are lists of per-bucket counts (the last one is +Inf) and the sum."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+
+M = TypeVar("M", bound=Metric)
+
+
+def _merge(metric_type: str, a: Any, b: Any) -> Any:
+    if metric_type == "histogram":
+        return [x + y for x, y in zip(a, b)]
+    return a + b
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._written_at = 0.0
+
+    def register(self, metric: M) -> M:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def clear(self) -> None:
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Values of this process, as stored in METRICS_DIR."""
+        return {
+            "pid": os.getpid(),
+            "metrics": {
+                name: [[list(key), value] for key, value in metric.samples().items()]
+                for name, metric in self._metrics.items()
+            },
+        }
+
+    def write(self, directory: str) -> None:
+        """Atomically replaces the snapshot file of this process."""
+        path = Path(directory) / f"metrics-{os.getpid()}.json"
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp, path)
+        self._written_at = time.monotonic()
+
+    def maybe_write(self, directory: str) -> None:
+        if time.monotonic() - self._written_at >= FLUSH_INTERVAL:
+            self.write(directory)
+
+    def _snapshots(self, directory: str | None) -> list[dict[str, Any]]:
+        if not directory:
+            return [self.snapshot()]
+        self.write(directory)
+        snapshots = []
+        for path in Path(directory).glob("metrics-*.json"):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # removed or being replaced meanwhile
+        return snapshots
+
+    def render(self, directory: str | None = None) -> str:
+        """Prometheus text format of this process or of all METRICS_DIR workers."""
+        merged: dict[str, dict[Labels, Any]] = {name: {} for name in self._metrics}
+        for snapshot in self._snapshots(directory):
+            running = _is_running(snapshot["pid"])
+            for name, samples in snapshot["metrics"].items():
+                metric = self._metrics.get(name)
+                if metric is None or (metric.type == "gauge" and not running):
+                    continue
+                values = merged[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    values[key] = (
+                        _merge(metric.type, values[key], value)
+                        if key in values
+                        else value
+                    )
+
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, value in sorted(merged[name].items()):
+                if metric.type != "histogram":
+                    lines.append(
+                        f"{name}{_labels(metric.labelnames, key)} {_number(value)}"
+                    )
+                    continue
+                names = metric.labelnames + ("le",)
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), value):
+                    cumulative += count
+                    labels = _labels(names, key + (_number(bound),))
+                    lines.append(f"{name}_bucket{labels} {_number(cumulative)}")
+                labels = _labels(metric.labelnames, key)
+                lines.append(f"{name}_sum{labels} {_number(value[-1])}")
+                lines.append(f"{name}_count{labels} {_number(cumulative)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Duration of HTTP requests by endpoint, method and status.",
+    ["endpoint", "method", "status"],
+)
+request_queries = registry.counter(
+    "http_request_db_queries_total",
+    "SQL statements executed by HTTP requests.",
+    ["endpoint"],
+)
+cache_lookups = registry.counter(
+    "cache_lookups_total",
+    "Cache lookups by cache and result (hit, stale or miss).",
+    ["cache", "result"],
+)
+# Pool method -> gauge, only pools with a fixed size (QueuePool) have all four
+pool_gauges = {
+    "size": registry.gauge("db_pool_size", "Configured size of the connection pool."),
+    "checkedout": registry.gauge(
+        "db_pool_checked_out", "Connections currently in use."
+    ),
+    "checkedin": registry.gauge(
+        "db_pool_checked_in", "Idle connections kept in the pool."
+    ),
+    "overflow": registry.gauge(
+        "db_pool_overflow", "Connections opened beyond the pool size."
+    ),
+}
+
+
+def update_pool_gauges() -> None:
+    pool = db.engine.pool
+    for method, gauge in pool_gauges.items():
+        value = getattr(pool, method, None)
+        if callable(value):
+            gauge.set(value())
+
+
+def init_app(app: Flask) -> None:
+    if not app.config.get("METRICS"):
+        return
+    directory = app.config.get("METRICS_DIR") or None
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        atexit.register(registry.write, directory)
+
+    @app.after_request
+    def observe_request(response: Response) -> Response:
+        timing = instrumentation.request_timing()
+        if timing is None:
+            return response
+        stats, duration_ms = timing
+        endpoint = request.url_rule.endpoint if request.url_rule else "unmatched"
+        request_duration.observe(
+            duration_ms / 1000,
+            endpoint=endpoint,
+            method=request.method,
+            status=response.status_code,
+        )
+        request_queries.inc(stats.queries, endpoint=endpoint)
+        if directory:
+            update_pool_gauges()
+            registry.maybe_write(directory)
+        return response
+
+    def metrics_view() -> Response:
+        update_pool_gauges()
+        return Response(registry.render(directory), content_type=CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics_view)
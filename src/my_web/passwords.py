@@ -0,0 +1,133 @@
+"""
+Password hashing off the request threads.
+
+bcrypt is slow on purpose: a hash takes 2^BCRYPT_LOG_ROUNDS iterations
+(about 0.25 s of CPU at 12). Hashed inline, a burst of logins takes every
+core and the cheap requests served next to them wait for CPU.
+
+Hashes and checks run in a per-process pool of PASSWORD_HASH_WORKERS
+threads, so a login burst occupies at most that many cores (bcrypt
+releases the GIL while hashing). The request waits for its hash; when
+every worker is busy and PASSWORD_HASH_QUEUE_SIZE more hashes are already
+waiting (0: no queue at all), `HashingBusy` is raised at once (503)
+instead of parking one more request thread. With 0 workers hashes run
+inline on the request thread.
+
+The cost of a stored hash is part of it (`$2b$12$...`): logins of users
+hashed with another cost than BCRYPT_LOG_ROUNDS store a new hash of the
+password they just typed, raising (or lowering) the cost of existing
+accounts as they log in.
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+from flask import Flask, current_app
+
+from my_web.extensions import bcrypt
+from my_web.metrics import registry
+
+T = TypeVar("T")
+
+queue_depth = registry.gauge(
+    "password_hash_queue_depth", "Password hashes waiting for a worker."
+)
+active_hashes = registry.gauge(
+    "password_hash_active", "Password hashes being computed."
+)
+wait_seconds = registry.histogram(
+    "password_hash_wait_seconds", "Time password hashes waited for a worker."
+)
+rejected_hashes = registry.counter(
+    "password_hash_rejected_total", "Password hashes refused with a full queue."
+)
+
+
+class HashingBusy(Exception):
+    """
+    Raised when the password hashing queue is full.
+    Results in a 503 Service Unavailable HTTP response.
+    """
+
+    pass
+
+
+class HashPool:
+    """Bounded thread pool running the password hashes of a process."""
+
+    def __init__(self):
+        self.workers = 0
+        self.queue_size = 0
+        self._executor: ThreadPoolExecutor | None = None
+        self._waiting = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def configure(self, workers: int, queue_size: int) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self.workers = workers
+            self.queue_size = queue_size
+            if workers > 0:
+                self._executor = ThreadPoolExecutor(
+                    workers, thread_name_prefix="password-hash"
+                )
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def run(self, fn: Callable[..., T], *args) -> T:
+        """Runs `fn(*args)` in the pool and waits for its result."""
+        with self._lock:
+            executor = self._executor
+            if executor is not None:
+                if self._waiting + self._active >= self.workers + self.queue_size:
+                    rejected_hashes.inc()
+                    raise HashingBusy("Too many logins at once, try again shortly.")
+                self._waiting += 1
+                queue_depth.set(self._waiting)
+        if executor is None:
+            return fn(*args)
+        return executor.submit(self._call, time.monotonic(), fn, args).result()
+
+    def _call(self, queued_at: float, fn: Callable[..., T], args: tuple) -> T:
+        wait_seconds.observe(time.monotonic() - queued_at)
+        with self._lock:
+            self._waiting -= 1
+            self._active += 1
+            queue_depth.set(self._waiting)
+            active_hashes.set(self._active)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+                active_hashes.set(self._active)
+
+
+hash_pool = HashPool()
+
+
+def hash_password(password: str) -> str:
+    rounds = current_app.config["BCRYPT_LOG_ROUNDS"]
+    hashed = hash_pool.run(bcrypt.generate_password_hash, password, rounds)
+    return hashed.decode("utf-8")
+
+
+def check_password(hashed: str, password: str) -> bool:
+    return hash_pool.run(bcrypt.check_password_hash, hashed, password)
+
+
+def needs_rehash(hashed: str) -> bool:
+    """Whether `hashed` was made with another cost than BCRYPT_LOG_ROUNDS."""
+    # $<version>$<cost>$<salt and hash>
+    cost = int(hashed.split("$")[2])
+    return cost != current_app.config["BCRYPT_LOG_ROUNDS"]
+
+
+def init_app(app: Flask) -> None:
+    hash_pool.configure(
+        app.config["PASSWORD_HASH_WORKERS"], app.config["PASSWORD_HASH_QUEUE_SIZE"]
+    )
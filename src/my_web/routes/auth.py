@@ -1,8 +1,10 @@
+from http import HTTPStatus
+
 from flask import Blueprint, render_template, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required
 from my_web.db.models import User, db
 from my_web.forms.auth import LoginForm, RegisterForm
-from my_web.app import bcrypt
+from my_web.passwords import HashingBusy, check_password, hash_password, needs_rehash
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -12,12 +14,20 @@ def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
-        if user and bcrypt.check_password_hash(
-            user.hashed_password, form.password.data
-        ):
-            login_user(user)
-            flash("Login succesful.", "success")  # Přidána kategorie zprávy
-            return redirect(url_for("user.profile"))
+        try:
+            if user and check_password(user.hashed_password, form.password.data):
+                if needs_rehash(user.hashed_password):
+                    # BCRYPT_LOG_ROUNDS changed since the password was stored
+                    user.hashed_password = hash_password(form.password.data)
+                    db.session.commit()
+                login_user(user)
+                flash("Login succesful.", "success")  # Přidána kategorie zprávy
+                return redirect(url_for("user.profile"))
+        except HashingBusy as e:
+            flash(str(e), "warning")
+            return render_template(
+                "auth/login.html", form=form
+            ), HTTPStatus.SERVICE_UNAVAILABLE
         flash("Invalid email or password.", "danger")
 
     return render_template("auth/login.html", form=form)
@@ -38,9 +48,13 @@ def register():
             flash("Email already registered..", "warning")
             return redirect(url_for("auth.register"))
 
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode(
-            "utf-8"
-        )
+        try:
+            hashed_password = hash_password(form.password.data)
+        except HashingBusy as e:
+            flash(str(e), "warning")
+            return render_template(
+                "auth/register.html", form=form
+            ), HTTPStatus.SERVICE_UNAVAILABLE
         user = User(
             name=form.name.data, email=form.email.data, hashed_password=hashed_password
         )
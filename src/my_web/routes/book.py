@@ -1,20 +1,113 @@
+import csv
+import io
+import json
+import time
+from collections.abc import Iterable, Iterator, Sequence
 from http import HTTPStatus
-from flask import Blueprint, render_template, redirect, url_for, request
-from flask_login import login_required
-from my_web.services.book import book_service
-from my_web.schemas.pagination import PaginatedResponse
-from my_web.schemas.book import BookSchema, BookCreateSchema, BookUpdateSchema
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    render_template,
+    redirect,
+    url_for,
+    request,
+    session,
+    stream_with_context,
+)
+from flask_login import login_required, current_user
+from pydantic import TypeAdapter, ValidationError
+from my_web.cache import response_cache
+from my_web.conditional import conditional
+from my_web.db import events
+from my_web.errors import InvalidRequest
+from my_web.services.book import Version, book_service
+from my_web.services.counting import CountMode
+from my_web.services.pagination import page_args
+from my_web.schemas.book import (
+    BookSchema,
+    BookCreateSchema,
+    BookUpdateSchema,
+    book_create_items,
+    book_update_items,
+    book_upsert_items,
+)
+from my_web.schemas.bulk import BulkError, BulkRequest, BulkResponse, BulkWritten
 
 book_bp = Blueprint("book", __name__, url_prefix="/book")
 book_api_bp = Blueprint("api_book", __name__, url_prefix="/api/v1/book")
 
 
+def list_cache_tags(response: Response) -> list[str]:
+    # Any book or author write may move books between pages and filters
+    return ["books"]
+
+
+def detail_cache_tags(response: Response) -> list[str]:
+    book = response.get_json()
+    return [f"book:{book['id']}"] + [f"author:{a['id']}" for a in book["authors"]]
+
+
+@events.on_commit
+def invalidate_cached_responses(changes: events.Changes) -> None:
+    tags = set()
+    for book_id in changes.get("books", ()):
+        tags.add(f"book:{book_id}")
+    for book_id, _ in changes.get("book_author", ()):
+        tags.add(f"book:{book_id}")
+    for author_id in changes.get("authors", ()):
+        tags.add(f"author:{author_id}")
+    if tags:
+        tags.add("books")
+    response_cache.invalidate(tags)
+
+
+def list_args() -> dict:
+    """Listing arguments of the API (Tabulator remote mode + extensions)."""
+    return {
+        "page": request.args.get("page", 1, type=int),
+        "per_page": request.args.get("size", 10, type=int),
+        "sort_param": request.args.get("sort"),
+        "filter_param": request.args.get("filter"),
+        # Opt-in keyset pagination: `?cursor=` for the first page, then `next_cursor`
+        "cursor": request.args.get("cursor"),
+        # Full-text search over titles and author names, ordered by relevance
+        "search": request.args.get("q"),
+    }
+
+
+def list_version() -> Version:
+    return book_service.get_books_version(**list_args())
+
+
+def detail_version(id: int) -> Version | None:
+    return book_service.get_version(id)
+
+
+def page_version(id: int) -> Version | None:
+    """
+    HTML pages also depend on the logged-in user, pending messages and the
+    CSRF token in <head>. The token is timestamped, so a revalidated page
+    must not outlive half of its time limit.
+    """
+    version = book_service.get_version(id)
+    if version is None or session.get("_flashes"):
+        return None
+    user = current_user.get_id() if current_user.is_authenticated else None
+    time_limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+    period = int(time.time() // (time_limit / 2)) if time_limit else 0
+    token = f"{version.token}-{user}-{session.get('csrf_token')}-{period}"
+    return version._replace(token=token, last_modified=None)
+
+
 @book_bp.route("/")
 def index():
     return redirect(url_for("book.list"))
 
 
 @book_bp.route("/<int:id>")
+@conditional(page_version)
 def detail(id: int):
     book = book_service.get(id)
     if not book:
@@ -22,36 +115,121 @@ def detail(id: int):
     return render_template("book/book.html", book=book)
 
 
+# Columns of the classic list that can be sorted by `?sort=<field>&dir=desc`
+LIST_SORT_FIELDS = ("title", "authors", "isbn")
+
+
 @book_bp.route("/list")
 def list():
-    books = book_service.get_all()
-    return render_template("book/books.html", books=books)
+    """Server-side paginated and sorted list, authors are loaded in batches."""
+    page, per_page = page_args(
+        request.args.get("page", 1, type=int),
+        request.args.get("size", current_app.config["BOOK_LIST_PAGE_SIZE"], type=int),
+    )
+    sort = request.args.get("sort")
+    if sort not in LIST_SORT_FIELDS:
+        sort = "title"
+    direction = "desc" if request.args.get("dir") == "desc" else "asc"
+
+    result = book_service.get_books(
+        page=page,
+        per_page=per_page,
+        sort_param=json.dumps([{"field": sort, "dir": direction}]),
+    )
+    return render_template(
+        "book/books.html",
+        books=result["data"],
+        page=page,
+        per_page=per_page,
+        last_page=max(result["last_page"] or 1, 1),
+        last_page_estimated=result["last_page_estimated"],
+        sort=sort,
+        direction=direction,
+    )
 
 
 @book_api_bp.route("/list")
+@response_cache.cached(tags=list_cache_tags)
+@conditional(list_version)
 def api_list() -> dict:
-    page = request.args.get("page", 1, type=int)
-    per_page = request.args.get("size", 10, type=int)
-    sort_param = request.args.get("sort")
-    filter_param = request.args.get("filter")
+    # `count=none` skips counting, last_page is then None
+    count = CountMode.parse(request.args.get("count"))
 
-    result = book_service.get_books(
-        page=page, per_page=per_page, sort_param=sort_param, filter_param=filter_param
-    )
-    response_schema = PaginatedResponse[BookSchema](
-        last_page=result["last_page"],
-        data=[BookSchema.model_validate(b) for b in result["data"]],
-    )
+    # Projected rows are already dicts shaped like BookSchema
+    result = book_service.get_books(count=count, projection=True, **list_args())
+    return {
+        "last_page": result["last_page"],
+        "last_page_estimated": result.get("last_page_estimated", False),
+        "data": result["data"],
+        "next_cursor": result.get("next_cursor"),
+    }
+
+
+CSV_COLUMNS = ("id", "title", "isbn", "authors", "created_at", "updated_at")
 
-    return response_schema.model_dump()
+
+def ndjson_lines(chunks: Iterable[Sequence[dict]]) -> Iterator[str]:
+    for chunk in chunks:
+        yield "".join(
+            BookSchema.model_validate(row).model_dump_json() + "\n" for row in chunk
+        )
+
+
+def csv_lines(chunks: Iterable[Sequence[dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for chunk in chunks:
+        for row in chunk:
+            authors = "; ".join(a["name"] for a in row["authors"])
+            writer.writerow(
+                [
+                    row["id"],
+                    row["title"],
+                    row["isbn"],
+                    authors,
+                    row["created_at"].isoformat(),
+                    row["updated_at"].isoformat(),
+                ]
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+EXPORT_FORMATS = {
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    "csv": (csv_lines, "text/csv"),
+}
+
+
+@book_api_bp.route("/export")
+def api_export() -> Response:
+    """
+    Streams the whole catalogue (`?format=ndjson|csv`), one chunk of books
+    at a time, see `BookService.export`.
+    """
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        raise InvalidRequest(f"Unknown export format '{export_format}'")
+    lines, mimetype = EXPORT_FORMATS[export_format]
+
+    chunks = book_service.export(current_app.config["EXPORT_CHUNK_SIZE"])
+    response = Response(stream_with_context(lines(chunks)), mimetype=mimetype)
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="books.{export_format}"'
+    )
+    return response
 
 
 @book_api_bp.route("/<int:id>")
-def api_detail(id: int) -> dict:
+@response_cache.cached(tags=detail_cache_tags)
+@conditional(detail_version)
+def api_detail(id: int):
     book = book_service.get(id)
     if not book:
         return {"error": "Not found"}, HTTPStatus.NOT_FOUND
-    return BookSchema.model_validate(book).model_dump()
+    return jsonify(BookSchema.model_validate(book))
 
 
 @book_api_bp.route("/", methods=["POST"])
@@ -67,7 +245,73 @@ def api_create():
     payload = request.get_json()
     schema = BookCreateSchema(**payload)
     book = book_service.create(schema.model_dump())
-    return BookSchema.model_validate(book).model_dump(), HTTPStatus.CREATED
+    return jsonify(BookSchema.model_validate(book)), HTTPStatus.CREATED
+
+
+# Item validators and service methods of bulk modes
+BULK_MODES = {
+    "create": (book_create_items, book_service.bulk_create),
+    "update": (book_update_items, book_service.bulk_update),
+    "upsert": (book_upsert_items, book_service.bulk_upsert),
+}
+
+
+def validate_items(
+    adapter: TypeAdapter, items: Sequence
+) -> tuple[dict[int, dict], dict[int, BulkError]]:
+    """
+    Validates `items` in one pass. Returns valid rows and errors, both keyed
+    by the item index (invalid items do not stop the valid ones).
+    """
+    try:
+        models = adapter.validate_python(items)
+        return {i: m.model_dump(exclude_unset=True) for i, m in enumerate(models)}, {}
+    except ValidationError as e:
+        details = {}
+        for error in e.errors(include_url=False, include_context=False):
+            index, *loc = error["loc"]
+            details.setdefault(index, []).append({"loc": loc, "msg": error["msg"]})
+
+    valid = [i for i in range(len(items)) if i not in details]
+    models = adapter.validate_python([items[i] for i in valid])
+    rows = {i: m.model_dump(exclude_unset=True) for i, m in zip(valid, models)}
+    errors = {
+        i: BulkError(index=i, error="Validation error", details=d)
+        for i, d in details.items()
+    }
+    return rows, errors
+
+
+@book_api_bp.route("/bulk", methods=["POST"])
+@login_required
+def api_bulk():
+    """
+    Creates, updates or upserts many books in chunked batches:
+    `{"mode": "create" | "update" | "upsert", "items": [...]}`.
+
+    Note: Invalid items and items violating a constraint are reported in
+    `errors` by their index, the other items are written and reported in
+    `created`/`updated` by their index and id.
+    """
+    payload = BulkRequest(**request.get_json())
+    adapter, write = BULK_MODES[payload.mode]
+
+    rows, errors = validate_items(adapter, payload.items)
+    indexes = [*rows]
+    result = write([*rows.values()], current_app.config["BULK_CHUNK_SIZE"])
+    for i, error in result.errors.items():
+        errors[indexes[i]] = BulkError(index=indexes[i], error=error)
+
+    response = BulkResponse(
+        created=[
+            BulkWritten(index=indexes[i], id=id) for i, id in result.created.items()
+        ],
+        updated=[
+            BulkWritten(index=indexes[i], id=id) for i, id in result.updated.items()
+        ],
+        errors=[errors[i] for i in sorted(errors)],
+    )
+    return response.model_dump(exclude_none=True), HTTPStatus.OK
 
 
 @book_api_bp.route("/<int:id>", methods=["PUT", "PATCH"])
@@ -85,7 +329,7 @@ def api_update(id: int):
     if not updated_book:
         return {"error": "Not found"}, HTTPStatus.NOT_FOUND
 
-    return BookSchema.model_validate(updated_book).model_dump(), HTTPStatus.OK
+    return jsonify(BookSchema.model_validate(updated_book)), HTTPStatus.OK
 
 
 @book_api_bp.route("/<int:book_id>/authors/<int:author_id>", methods=["PUT"])
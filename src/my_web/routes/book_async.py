@@ -0,0 +1,57 @@
+"""
+Async variant of the book JSON API (ASYNC_API), on the async engine of
+`my_web.db.aio`. Same requests and responses as `/api/v1/book`, without
+the response cache and conditional requests of the sync API.
+"""
+
+from http import HTTPStatus
+
+from flask import Blueprint, jsonify, request
+from flask_login import login_required
+
+from my_web.routes.book import list_args
+from my_web.schemas.book import BookCreateSchema, BookSchema, BookUpdateSchema
+from my_web.services.book import book_service
+from my_web.services.counting import CountMode
+
+book_async_api_bp = Blueprint(
+    "api_book_async", __name__, url_prefix="/api/v1/async/book"
+)
+
+
+@book_async_api_bp.route("/list")
+async def api_list() -> dict:
+    count = CountMode.parse(request.args.get("count"))
+    result = await book_service.aget_books(count=count, projection=True, **list_args())
+    return {
+        "last_page": result["last_page"],
+        "last_page_estimated": result.get("last_page_estimated", False),
+        "data": result["data"],
+        "next_cursor": result.get("next_cursor"),
+    }
+
+
+@book_async_api_bp.route("/<int:id>")
+async def api_detail(id: int):
+    book = await book_service.aget(id)
+    if not book:
+        return {"error": "Not found"}, HTTPStatus.NOT_FOUND
+    return jsonify(BookSchema.model_validate(book))
+
+
+@book_async_api_bp.route("/", methods=["POST"])
+@login_required
+async def api_create():
+    schema = BookCreateSchema(**request.get_json())
+    book = await book_service.acreate(schema.model_dump())
+    return jsonify(BookSchema.model_validate(book)), HTTPStatus.CREATED
+
+
+@book_async_api_bp.route("/<int:id>", methods=["PUT", "PATCH"])
+@login_required
+async def api_update(id: int):
+    schema = BookUpdateSchema(**request.get_json())
+    book = await book_service.aupdate(id, schema.model_dump(exclude_unset=True))
+    if not book:
+        return {"error": "Not found"}, HTTPStatus.NOT_FOUND
+    return jsonify(BookSchema.model_validate(book)), HTTPStatus.OK
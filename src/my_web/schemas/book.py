@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 from my_web.schemas.author import AuthorSchema
 from my_web.schemas.base import ORMModel
@@ -24,3 +24,17 @@ class BookCreateSchema(BaseModel):
 class BookUpdateSchema(BaseModel):
     title: str | None = Field(None, min_length=1, max_length=100)
     isbn: str | None = Field(None, max_length=20)
+
+
+class BookBulkUpdateSchema(BookUpdateSchema):
+    id: int
+
+
+class BookUpsertSchema(BookCreateSchema):
+    id: int | None = None
+
+
+# Validators of bulk payloads, built once
+book_create_items = TypeAdapter(list[BookCreateSchema])
+book_update_items = TypeAdapter(list[BookBulkUpdateSchema])
+book_upsert_items = TypeAdapter(list[BookUpsertSchema])
@@ -0,0 +1,27 @@
+from typing import Any, Literal
+
+from pydantic import BaseModel
+
+
+class BulkRequest(BaseModel):
+    """Payload of bulk endpoints, items are validated per mode."""
+
+    mode: Literal["create", "update", "upsert"]
+    items: list[Any]
+
+
+class BulkError(BaseModel):
+    index: int
+    error: str
+    details: list[dict[str, Any]] | None = None
+
+
+class BulkWritten(BaseModel):
+    index: int
+    id: int
+
+
+class BulkResponse(BaseModel):
+    created: list[BulkWritten] = []
+    updated: list[BulkWritten] = []
+    errors: list[BulkError] = []
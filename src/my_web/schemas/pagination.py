@@ -5,5 +5,9 @@ T = TypeVar("T")
 
 
 class PaginatedResponse(ORMModel, Generic[T]):
-    last_page: int
+    last_page: int | None = None
+    # True when last_page comes from an estimated row count
+    last_page_estimated: bool = False
     data: list[T]
+    # Token of the next page in cursor mode, None on the last page
+    next_cursor: str | None = None
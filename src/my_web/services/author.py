@@ -6,6 +6,7 @@ class AuthorService(CRUDService[Author]):
     MODEL = Author
     PK_NAME = "id"
     FILTER_FIELD = "name"
+    SORT_FIELDS = ("name", "created_at", "updated_at")
 
 
 author_service = AuthorService()
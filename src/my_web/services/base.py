@@ -1,19 +1,54 @@
-from typing import TypeVar, Generic
+from collections import defaultdict
+from collections.abc import Callable
+from itertools import groupby
+from typing import Any, NamedTuple, TypeVar, Generic
+from sqlalchemy import delete, insert, inspect, update
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.interfaces import LoaderOption
+from my_web.db import events
+from my_web.db.aio import adb
+from my_web.db.routing import read_only, read_write
+from my_web.errors import InvalidRequest
 from my_web.extensions import db
+from my_web.services.counting import CountMode
+from my_web.services.pagination import (
+    SortKey,
+    akeyset_paginate,
+    aoffset_paginate,
+    keyset_paginate,
+    offset_paginate,
+)
 
 T = TypeVar("T", bound=db.Model)
 
 
+class BulkResult(NamedTuple):
+    """Outcome of a bulk write: written ids and errors, by input row index."""
+
+    created: dict[int, Any]
+    updated: dict[int, Any]
+    errors: dict[int, str]
+
+
 class CRUDService(Generic[T]):
     """
     Generic CRUD operations for any SQLAlchemy Model.
     Inheriting services must define MODEL and can optionally override PK_NAME.
+    LOAD_OPTIONS are applied to every read so that relationships used by the
+    schemas are loaded in batches instead of lazily row by row.
+
+    Methods prefixed with `a` (`aget`, `acreate`...) are their async
+    variants, run in `adb.session` (see `my_web.db.aio`). Async sessions
+    cannot load lazily: what the schemas read must be in LOAD_OPTIONS.
     """
 
     MODEL: type[T] = None
     PK_NAME: str = "id"
     FILTER_FIELD: str | None = None
+    # Columns a cursor (keyset) listing may be sorted by, besides PK_NAME
+    SORT_FIELDS: tuple[str, ...] = ()
+    LOAD_OPTIONS: tuple[LoaderOption, ...] = ()
 
     @classmethod
     def __init_subclass__(cls, **kwargs):
@@ -27,14 +62,18 @@ class CRUDService(Generic[T]):
                 "pointing to a SQLAlchemy model class."
             )
 
+    @read_only
     def get(self, entity_id: int) -> T | None:
         """Retrieves a single entity by ID using modern session.get."""
-        return db.session.get(self.MODEL, entity_id)
+        return db.session.get(self.MODEL, entity_id, options=self.LOAD_OPTIONS)
 
+    @read_only
     def get_all(self) -> list[T]:
         """Retrieves all entities of the model."""
-        return db.session.execute(db.select(self.MODEL)).scalars().all()
+        stmt = db.select(self.MODEL).options(*self.LOAD_OPTIONS)
+        return db.session.execute(stmt).scalars().all()
 
+    @read_write
     def create(self, data: dict, commit: bool = True) -> T:
         """Creates a new entity from a data dictionary.
         :raise ValueError: if an IntegrityError occurs during creation."""
@@ -50,6 +89,7 @@ class CRUDService(Generic[T]):
             db.session.rollback()
             raise ValueError(f"Integrity error when creating {self.MODEL.__name__}")
 
+    @read_write
     def update(self, entity_id: int, data: dict, commit: bool = True) -> T | None:
         """Updates an existing entity by ID. Ignores primary key from data."""
         entity = self.get(entity_id)
@@ -78,6 +118,7 @@ class CRUDService(Generic[T]):
             db.session.rollback()
             raise ValueError(f"Integrity error when updating {self.MODEL.__name__}")
 
+    @read_write
     def delete(self, entity_id: int, commit: bool = True) -> bool:
         """Deletes an entity by ID."""
         entity = self.get(entity_id)
@@ -91,6 +132,7 @@ class CRUDService(Generic[T]):
             db.session.flush()
         return True
 
+    @read_write
     def upsert(
         self, entity_id: int | None, data: dict, commit: bool = True
     ) -> tuple[T, bool]:
@@ -131,6 +173,284 @@ class CRUDService(Generic[T]):
             db.session.rollback()
             raise ValueError(f"Integrity error during upsert of {self.MODEL.__name__}")
 
+    async def aget(self, entity_id: int) -> T | None:
+        """Async `get`."""
+        return await adb.session.get(self.MODEL, entity_id, options=self.LOAD_OPTIONS)
+
+    async def aget_all(self) -> list[T]:
+        """Async `get_all`."""
+        stmt = db.select(self.MODEL).options(*self.LOAD_OPTIONS)
+        return (await adb.session.execute(stmt)).scalars().all()
+
+    async def acreate(self, data: dict, commit: bool = True) -> T:
+        """Async `create`.
+        :raise ValueError: if an IntegrityError occurs during creation."""
+        session = adb.session
+        entity = self.MODEL(**data)
+        session.add(entity)
+        await self._afinish(session, commit, "creating")
+        return await self._areload(session, entity)
+
+    async def aupdate(
+        self, entity_id: int, data: dict, commit: bool = True
+    ) -> T | None:
+        """Async `update`. Ignores primary key from data."""
+        entity = await self.aget(entity_id)
+        if not entity:
+            return None
+
+        self._apply(entity, data)
+        await self._afinish(adb.session, commit, "updating")
+        return entity
+
+    async def adelete(self, entity_id: int, commit: bool = True) -> bool:
+        """Async `delete`."""
+        entity = await self.aget(entity_id)
+        if not entity:
+            return False
+
+        session = adb.session
+        await session.delete(entity)
+        if commit:
+            await session.commit()
+        else:
+            await session.flush()
+        return True
+
+    async def aupsert(
+        self, entity_id: int | None, data: dict, commit: bool = True
+    ) -> tuple[T, bool]:
+        """Async `upsert`."""
+        session = adb.session
+        entity = await self.aget(entity_id) if entity_id is not None else None
+        if entity:
+            self._apply(entity, data)
+            await self._afinish(session, commit, "upserting")
+            return entity, False
+
+        entity = self.MODEL(**data)
+        session.add(entity)
+        await self._afinish(session, commit, "upserting")
+        return await self._areload(session, entity), True
+
+    def _apply(self, entity: T, data: dict) -> None:
+        """Sets the attributes of `data` on `entity`, except the primary key."""
+        for key, value in data.items():
+            if key != self.PK_NAME and hasattr(entity, key):
+                setattr(entity, key, value)
+
+    async def _afinish(self, session: AsyncSession, commit: bool, action: str) -> None:
+        """Commits (or flushes) the session.
+        :raise ValueError: if an IntegrityError occurs."""
+        try:
+            if commit:
+                await session.commit()
+            else:
+                await session.flush()
+        except IntegrityError:
+            await session.rollback()
+            raise ValueError(self._integrity_message(action))
+
+    async def _areload(self, session: AsyncSession, entity: T) -> T:
+        """
+        `entity` as read back by `aget`: with its server defaults and
+        LOAD_OPTIONS loaded, which a new entity does not have.
+        """
+        return await session.get(
+            self.MODEL,
+            getattr(entity, self.PK_NAME),
+            options=self.LOAD_OPTIONS,
+            populate_existing=True,
+        )
+
+    @read_write
+    def bulk_create(
+        self, rows: list[dict], chunk_size: int = 1000, commit: bool = True
+    ) -> BulkResult:
+        """
+        Inserts `rows` with one batched INSERT ... RETURNING per chunk.
+        A chunk violating a constraint is retried row by row, so that only
+        the offending rows end up in `errors` and the others are written.
+        """
+
+        def key_set(item: tuple[int, dict]) -> list[str]:
+            return sorted(item[1])
+
+        pending = [(index, self._values(row)) for index, row in enumerate(rows)]
+        created, errors = {}, {}
+        # An executemany INSERT takes a single key set, chunk rows per key set
+        for _, group in groupby(sorted(pending, key=key_set), key=key_set):
+            written, failed = self._write_chunks(
+                list(group), chunk_size, self._insert, "creating"
+            )
+            created.update(written)
+            errors.update(failed)
+        if commit:
+            db.session.commit()
+        return BulkResult(
+            dict(sorted(created.items())), {}, dict(sorted(errors.items()))
+        )
+
+    @read_write
+    def bulk_update(
+        self, rows: list[dict], chunk_size: int = 1000, commit: bool = True
+    ) -> BulkResult:
+        """
+        Updates entities by the primary key contained in each row, with one
+        executemany UPDATE per chunk. Missing entities and rows violating a
+        constraint are reported in `errors`, the others are written.
+        """
+        pk_name = self.PK_NAME
+        existing = self._existing_ids([row.get(pk_name) for row in rows], chunk_size)
+
+        pending, errors = [], {}
+        for index, row in enumerate(rows):
+            entity_id = row.get(pk_name)
+            if entity_id in existing:
+                pending.append((index, {**self._values(row), pk_name: entity_id}))
+            else:
+                errors[index] = f"{self.MODEL.__name__} with id {entity_id} not found."
+
+        def write(values: list[dict]) -> list[Any]:
+            db.session.execute(update(self.MODEL), values)
+            return [v[pk_name] for v in values]
+
+        updated, update_errors = self._write_chunks(
+            pending, chunk_size, write, "updating"
+        )
+        errors.update(update_errors)
+        if commit:
+            db.session.commit()
+        return BulkResult({}, updated, dict(sorted(errors.items())))
+
+    @read_write
+    def bulk_upsert(
+        self, rows: list[dict], chunk_size: int = 1000, commit: bool = True
+    ) -> BulkResult:
+        """
+        Updates rows whose primary key exists and creates the others (like
+        `upsert`, the primary key of a created row is not used).
+        """
+        pk_name = self.PK_NAME
+        existing = self._existing_ids([row.get(pk_name) for row in rows], chunk_size)
+        to_update = [i for i, row in enumerate(rows) if row.get(pk_name) in existing]
+        to_create = [
+            i for i, row in enumerate(rows) if row.get(pk_name) not in existing
+        ]
+
+        updated = self.bulk_update([rows[i] for i in to_update], chunk_size, False)
+        created = self.bulk_create([rows[i] for i in to_create], chunk_size, False)
+        if commit:
+            db.session.commit()
+
+        errors = {to_update[i]: e for i, e in updated.errors.items()}
+        errors.update({to_create[i]: e for i, e in created.errors.items()})
+        return BulkResult(
+            {to_create[i]: pk for i, pk in created.created.items()},
+            {to_update[i]: pk for i, pk in updated.updated.items()},
+            dict(sorted(errors.items())),
+        )
+
+    def _values(self, row: dict) -> dict:
+        """Column values of `row`, without the primary key and unknown keys."""
+        columns = inspect(self.MODEL).column_attrs.keys()
+        return {
+            key: value
+            for key, value in row.items()
+            if key in columns and key != self.PK_NAME
+        }
+
+    def _insert(self, values: list[dict]) -> list[Any]:
+        """
+        Inserts `values` (rows with the same keys) and returns their ids in
+        the order of `values`.
+
+        The rows of a batched INSERT ... RETURNING come back in no defined
+        order and SQLite has no sentinel for `sort_by_parameter_order` (it
+        would run one INSERT per row), so ids are matched to the rows by the
+        returned values of the inserted columns. Rows with equal values are
+        interchangeable. Values which are unhashable, or do not come back as
+        sent (e.g. timezone-aware datetimes on SQLite), are inserted in
+        parameter order instead.
+        """
+        pk = getattr(self.MODEL, self.PK_NAME)
+        keys = list(values[0])
+        ordered = insert(self.MODEL).returning(pk, sort_by_parameter_order=True)
+        positions = defaultdict(list)
+        try:
+            for position, row in enumerate(values):
+                positions[tuple(row[key] for key in keys)].append(position)
+        except TypeError:
+            return db.session.execute(ordered, values).scalars().all()
+
+        columns = [getattr(self.MODEL, key) for key in keys]
+        stmt = insert(self.MODEL).returning(pk, *columns)
+        returned = db.session.execute(stmt, values).all()
+        ids = [None] * len(values)
+        for entity_id, *row in returned:
+            matching = positions.get(tuple(row))
+            if not matching:
+                inserted = [entity_id for entity_id, *_ in returned]
+                db.session.execute(delete(self.MODEL).where(pk.in_(inserted)))
+                return db.session.execute(ordered, values).scalars().all()
+            ids[matching.pop()] = entity_id
+        return ids
+
+    def _existing_ids(self, ids: list[Any], chunk_size: int) -> set[Any]:
+        pk = getattr(self.MODEL, self.PK_NAME)
+        ids = [entity_id for entity_id in ids if entity_id is not None]
+        existing = set()
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start : start + chunk_size]
+            existing.update(
+                db.session.execute(db.select(pk).where(pk.in_(chunk))).scalars()
+            )
+        return existing
+
+    def _write_chunks(
+        self,
+        rows: list[tuple[int, dict]],
+        chunk_size: int,
+        write: Callable[[list[dict]], list[Any]],
+        action: str,
+    ) -> tuple[dict[int, Any], dict[int, str]]:
+        """
+        Runs `write` over chunks of (index, values) pairs, each chunk in a
+        savepoint, and returns the ids it returns (in the order of the values)
+        and the errors by index. Failed chunks are retried row by row. Written
+        ids are reported with `events.mark_changed` (Core DML bypasses the
+        flush).
+        """
+        table = self.MODEL.__table__.name
+        written, errors = {}, {}
+
+        def attempt(chunk: list[tuple[int, dict]]) -> None:
+            with db.session.begin_nested():
+                ids = write([values for _, values in chunk])
+                events.mark_changed(db.session(), table, ids)
+            written.update(zip([index for index, _ in chunk], ids, strict=True))
+
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start : start + chunk_size]
+            try:
+                attempt(chunk)
+                continue
+            except IntegrityError:
+                if len(chunk) == 1:
+                    errors[chunk[0][0]] = self._integrity_message(action)
+                    continue
+
+            for index, values in chunk:
+                try:
+                    attempt([(index, values)])
+                except IntegrityError:
+                    errors[index] = self._integrity_message(action)
+        return dict(sorted(written.items())), errors
+
+    def _integrity_message(self, action: str) -> str:
+        return f"Integrity error when {action} {self.MODEL.__name__}"
+
+    @read_only
     def get_paginated(
         self,
         page: int = 1,
@@ -138,11 +458,17 @@ class CRUDService(Generic[T]):
         sort_field: str | None = None,
         sort_dir: str = "asc",
         filter_value: str | None = None,
+        cursor: str | None = None,
+        count: CountMode = CountMode.AUTO,
     ) -> dict:
         """
         Retrieves a paginated list with optional sorting and filtering on the FILTER_FIELD.
+        When `cursor` is given (an empty string means the first page), keyset
+        pagination is used instead of OFFSET/LIMIT and the result contains
+        `next_cursor` instead of `last_page`. `count` selects how `last_page`
+        is computed (see `my_web.services.counting`).
         """
-        stmt = db.select(self.MODEL)
+        stmt = db.select(self.MODEL).options(*self.LOAD_OPTIONS)
 
         # 1. Simple Filtering
         if filter_value and self.FILTER_FIELD:
@@ -152,6 +478,10 @@ class CRUDService(Generic[T]):
                 stmt = stmt.where(col.ilike(search_pattern))
 
         # 2. Simple Sorting
+        if cursor is not None:
+            keys = self._cursor_keys(sort_field, sort_dir)
+            return keyset_paginate(stmt, keys, cursor, per_page)
+
         sort_field = (
             sort_field
             if sort_field and hasattr(self.MODEL, sort_field)
@@ -165,13 +495,54 @@ class CRUDService(Generic[T]):
             else:
                 stmt = stmt.order_by(col.asc())
 
-        pagination = db.paginate(stmt, page=page, per_page=per_page, error_out=False)
+        return offset_paginate(stmt, page, per_page, count)
 
-        return {
-            "last_page": pagination.pages,
-            "data": pagination.items,
-        }
+    async def aget_paginated(
+        self,
+        page: int = 1,
+        per_page: int = 10,
+        sort_field: str | None = None,
+        sort_dir: str = "asc",
+        filter_value: str | None = None,
+        cursor: str | None = None,
+        count: CountMode = CountMode.AUTO,
+    ) -> dict:
+        """Async `get_paginated`."""
+        stmt = db.select(self.MODEL).options(*self.LOAD_OPTIONS)
+        if filter_value and self.FILTER_FIELD:
+            col = getattr(self.MODEL, self.FILTER_FIELD, None)
+            if col is not None:
+                stmt = stmt.where(col.ilike("%" + filter_value + "%"))
+
+        if cursor is not None:
+            keys = self._cursor_keys(sort_field, sort_dir)
+            return await akeyset_paginate(adb.session, stmt, keys, cursor, per_page)
+
+        if sort_field is None or not hasattr(self.MODEL, sort_field):
+            sort_field = self.PK_NAME
+        col = getattr(self.MODEL, sort_field)
+
+        stmt = stmt.order_by(col.desc() if sort_dir == "desc" else col.asc())
+        return await aoffset_paginate(adb.session, stmt, page, per_page, count)
+
+    def _cursor_keys(self, sort_field: str | None, sort_dir: str) -> list[SortKey]:
+        """
+        Keyset sort keys of `get_paginated`: `sort_field` then the primary
+        key, which makes them unique, in the same direction so that the
+        database reads one index in order.
+        :raise InvalidRequest: if `sort_field` is not one of SORT_FIELDS.
+        """
+        direction = "desc" if sort_dir == "desc" else "asc"
+        pk = getattr(self.MODEL, self.PK_NAME)
+        if not sort_field or sort_field == self.PK_NAME:
+            return [(pk, direction)]
+        if sort_field not in self.SORT_FIELDS:
+            raise InvalidRequest(
+                f"Cannot sort {self.MODEL.__name__} by '{sort_field}' with a cursor."
+            )
+        return [(getattr(self.MODEL, sort_field), direction), (pk, direction)]
 
+    @read_only
     def get_by_name(self, name: str) -> T | None:
         """Retrieves a single entity by its name field.
         :raise AttributeError: if FILTER_FIELD is not defined on the model."""
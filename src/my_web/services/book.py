@@ -1,29 +1,95 @@
 import json
-from typing import Any
-from sqlalchemy import func
+from collections.abc import Iterator
+from datetime import datetime
+from typing import Any, NamedTuple
+from operator import itemgetter
+from sqlalchemy import JSON, Row, Select, func, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.orm import selectinload
 from my_web.extensions import db
-from my_web.db.models import Book, Author, BookAuthorAssociation
+from my_web.db.aio import adb
+from my_web.db.models import Book, Author, BookAuthorAssociation, utcnow
+from my_web.db.routing import read_only, read_write
 from my_web.services.base import CRUDService
 from my_web.services.author import author_service
-from my_web.errors import ResourceNotFound
+from my_web.services.counting import CountMode
+from my_web.services.pagination import (
+    SortKey,
+    akeyset_paginate,
+    aoffset_paginate,
+    keyset_page,
+    keyset_paginate,
+    offset_page,
+    offset_paginate,
+)
+from my_web.services import search as search_index
+from my_web.errors import InvalidRequest, ResourceNotFound
+
+
+def _timestamp(value: str | None) -> datetime | None:
+    """Timestamp of JSON aggregated rows, as the column type would return it."""
+    return None if value is None else datetime.fromisoformat(value)
+
+
+class Version(NamedTuple):
+    """Cheap version of a set of books, see `BookService._version`."""
+
+    rows: int
+    token: str
+    last_modified: datetime | None
 
 
 class BookService(CRUDService[Book]):
     MODEL = Book
     PK_NAME = "id"
     FILTER_FIELD = "title"
+    SORT_FIELDS = ("title", "isbn", "created_at", "updated_at")
+    # Authors are serialized with every book: load them in two batched
+    # SELECT ... IN queries per page instead of two lazy loads per book.
+    LOAD_OPTIONS = (
+        selectinload(Book.author_associations).selectinload(
+            BookAuthorAssociation.author
+        ),
+    )
 
-    @staticmethod
-    def get_books(
-        page: int,
-        per_page: int,
+    # Book columns of projected rows (see `get_books`), in BookSchema order
+    ROW_COLUMNS = (Book.id, Book.title, Book.isbn, Book.created_at, Book.updated_at)
+    AUTHOR_COLUMNS = (
+        Author.id,
+        Author.name,
+        Author.preferences,
+        Author.created_at,
+        Author.updated_at,
+    )
+
+    def _books_query(
+        self,
         sort_param: str | None = None,
         filter_param: str | None = None,
-    ) -> dict[str, Any]:
-        """Retrieves a paginated, filtered, and sorted list of books for API."""
+        search: str | None = None,
+        columns: tuple[ColumnElement, ...] | None = None,
+        keyset: bool = False,
+    ) -> tuple[Select, list[SortKey]]:
+        """
+        Builds the filtered statement and the sort keys of a book listing,
+        selecting `Book` entities or only `columns`.
+        :raise InvalidRequest: if a `keyset` listing is sorted by authors,
+            whose first name is computed per row and cannot be sought.
+        """
 
         columns_map = {"id": Book.id, "title": Book.title, "isbn": Book.isbn}
-        stmt = db.select(Book)
+        # First author name (alphabetically) of the current row, used for sorting
+        first_author = (
+            db.select(func.min(Author.name))
+            .join(BookAuthorAssociation, BookAuthorAssociation.author_id == Author.id)
+            .where(BookAuthorAssociation.book_id == Book.id)
+            .scalar_subquery()
+        )
+        if columns is None:
+            stmt = db.select(Book).options(*self.LOAD_OPTIONS)
+        else:
+            stmt = db.select(*columns)
 
         if filter_param:
             try:
@@ -36,10 +102,14 @@ class BookService(CRUDService[Book]):
                         continue
 
                     if field == "authors":
-                        stmt = stmt.join(Book.author_associations).join(
-                            BookAuthorAssociation.author
+                        # EXISTS instead of JOIN: a book must appear only once
+                        stmt = stmt.where(
+                            Book.author_associations.any(
+                                BookAuthorAssociation.author.has(
+                                    Author.name.ilike(f"%{value}%")
+                                )
+                            )
                         )
-                        stmt = stmt.where(Author.name.ilike(f"%{value}%"))
 
                     elif field in columns_map:
                         col = columns_map[field]
@@ -47,43 +117,331 @@ class BookService(CRUDService[Book]):
             except (ValueError, TypeError) as e:
                 print(f"Filter parsing error: {e}")
 
+        sort_keys = []
+        ranked = search_index.match(search) if search else None
+        if ranked is not None:
+            matches, rank = ranked
+            stmt = stmt.join(matches, matches.c.book_id == Book.id)
+
         if sort_param:
             try:
                 sorters = json.loads(sort_param)
                 for s in sorters:
                     field = s.get("field")
-                    direction = s.get("dir")
+                    direction = "desc" if s.get("dir") == "desc" else "asc"
 
                     if field == "authors":
-                        stmt = stmt.outerjoin(Book.author_associations).outerjoin(
-                            BookAuthorAssociation.author
-                        )
-                        stmt = stmt.group_by(Book.id)
-                        order_col = func.min(Author.name)
-
-                        if direction == "desc":
-                            stmt = stmt.order_by(order_col.desc())
-                        else:
-                            stmt = stmt.order_by(order_col.asc())
-
+                        sort_keys.append((first_author, direction))
                     elif field in columns_map:
-                        col = columns_map[field]
-                        if direction == "desc":
-                            stmt = stmt.order_by(col.desc())
-                        else:
-                            stmt = stmt.order_by(col.asc())
-            except (ValueError, TypeError) as e:
+                        sort_keys.append((columns_map[field], direction))
+            except (ValueError, TypeError, AttributeError) as e:
                 print(f"Sort parsing error: {e}")
+            if keyset and any(expr is first_author for expr, _ in sort_keys):
+                raise InvalidRequest(
+                    "Sorting by authors is not supported with a cursor, use pages."
+                )
+        elif ranked is not None:
+            sort_keys.append((rank, "asc"))
+        else:
+            sort_keys.append((Book.title, "asc"))
+
+        return stmt, sort_keys
+
+    @staticmethod
+    def _keyset_keys(sort_keys: list[SortKey]) -> list[SortKey]:
+        """
+        Sort keys of keyset pagination. Book.id makes them unique, so that the
+        cursor is unambiguous, in the direction of the last key: the database
+        then reads a single index (entries end with the row id) in order.
+        Keys after Book.id would not change the order and are dropped.
+        """
+        for i, (expr, _) in enumerate(sort_keys):
+            if expr is Book.id:
+                return sort_keys[: i + 1]
+        direction = sort_keys[-1][1] if sort_keys else "asc"
+        return sort_keys + [(Book.id, direction)]
+
+    @staticmethod
+    def _order(stmt: Select, sort_keys: list[SortKey]) -> Select:
+        for col, direction in sort_keys:
+            stmt = stmt.order_by(col.desc() if direction == "desc" else col.asc())
+        return stmt
+
+    @read_only
+    def get_books(
+        self,
+        page: int,
+        per_page: int,
+        sort_param: str | None = None,
+        filter_param: str | None = None,
+        cursor: str | None = None,
+        count: CountMode = CountMode.AUTO,
+        search: str | None = None,
+        projection: bool = False,
+    ) -> dict[str, Any]:
+        """Retrieves a paginated, filtered, and sorted list of books for API.
+
+        When `cursor` is given (an empty string means the first page), keyset
+        pagination is used instead of OFFSET/LIMIT and the result contains
+        `next_cursor` instead of `last_page`. `count` selects how `last_page`
+        is computed (see `my_web.services.counting`). `search` is a full-text
+        query over titles and author names; matches are ordered by relevance
+        unless `sort_param` is given.
+
+        With `projection`, the page contains dicts shaped like `BookSchema`
+        instead of `Book` objects, built from result tuples of only the
+        needed columns. Authors are aggregated to JSON in the same query
+        (SQLite, PostgreSQL) or loaded with one more query.
+        """
+        columns = authors = None
+        if projection:
+            authors = self._authors_json()
+            columns = self.ROW_COLUMNS + ((authors,) if authors is not None else ())
+        stmt, sort_keys = self._books_query(
+            sort_param, filter_param, search, columns, keyset=cursor is not None
+        )
+
+        if cursor is not None:
+            keys = self._keyset_keys(sort_keys)
+            result = keyset_paginate(
+                stmt, keys, cursor, per_page, scalars=not projection
+            )
+        else:
+            result = offset_paginate(
+                self._order(stmt, sort_keys),
+                page,
+                per_page,
+                count,
+                scalars=not projection,
+            )
+        if projection:
+            rows = result["data"]
+            by_book = None
+            if authors is None:
+                by_book = self._authors_by_book([row[0] for row in rows])
+            result["data"] = self._rows(rows, by_book)
+        return result
+
+    async def aget_books(
+        self,
+        page: int,
+        per_page: int,
+        sort_param: str | None = None,
+        filter_param: str | None = None,
+        cursor: str | None = None,
+        count: CountMode = CountMode.AUTO,
+        search: str | None = None,
+        projection: bool = False,
+    ) -> dict[str, Any]:
+        """Async `get_books`."""
+        session = adb.session
+        columns = authors = None
+        if projection:
+            authors = self._authors_json()
+            columns = self.ROW_COLUMNS + ((authors,) if authors is not None else ())
+        stmt, sort_keys = self._books_query(
+            sort_param, filter_param, search, columns, keyset=cursor is not None
+        )
+
+        if cursor is not None:
+            keys = self._keyset_keys(sort_keys)
+            result = await akeyset_paginate(
+                session, stmt, keys, cursor, per_page, scalars=not projection
+            )
+        else:
+            result = await aoffset_paginate(
+                session,
+                self._order(stmt, sort_keys),
+                page,
+                per_page,
+                count,
+                scalars=not projection,
+            )
+        if projection:
+            rows = result["data"]
+            by_book = None
+            if authors is None:
+                ids = [row[0] for row in rows]
+                by_book = await self._aauthors_by_book(session, ids)
+            result["data"] = self._rows(rows, by_book)
+        return result
+
+    def _authors_json(self) -> ColumnElement | None:
+        """
+        Authors of the current book as a JSON array (a correlated subquery),
+        None when the database has no JSON aggregates we know.
+        """
+        dialect = db.session.get_bind().dialect.name
+        if dialect == "sqlite":
+            # Timestamps come as stored text, preferences as embedded JSON
+            author = func.json_object(
+                "id", Author.id,
+                "name", Author.name,
+                "preferences", func.json(Author.preferences),
+                "created_at", Author.created_at,
+                "updated_at", Author.updated_at,
+            )  # fmt: skip
+            aggregate = func.json_group_array(author, type_=JSON)
+        elif dialect == "postgresql":
+            author = func.json_build_object(
+                "id", Author.id,
+                "name", Author.name,
+                "preferences", Author.preferences,
+                "created_at", Author.created_at,
+                "updated_at", Author.updated_at,
+            )  # fmt: skip
+            aggregate = func.coalesce(
+                func.json_agg(author), literal_column("'[]'::json"), type_=JSON
+            )
+        else:
+            return None
+        return (
+            db.select(aggregate)
+            .join(BookAuthorAssociation, BookAuthorAssociation.author_id == Author.id)
+            .where(BookAuthorAssociation.book_id == Book.id)
+            .scalar_subquery()
+            .label("authors")
+        )
+
+    def _rows(
+        self, rows: list[Row], authors: dict[int, list[dict]] | None
+    ) -> list[dict[str, Any]]:
+        """
+        Dicts of projected `rows`: tuples of ROW_COLUMNS followed by the
+        authors JSON when `authors` (by book id) is None (and by keyset
+        values, ignored). Authors are ordered by id like the ORM relationship
+        and `_authors_by_book`.
+        """
+        names = [column.key for column in self.ROW_COLUMNS]
+        books = [dict(zip(names, row)) for row in rows]
+        if authors is None:
+            for book, row in zip(books, rows):
+                book["authors"] = sorted(row[len(names)], key=itemgetter("id"))
+                for author in book["authors"]:
+                    author["created_at"] = _timestamp(author["created_at"])
+                    author["updated_at"] = _timestamp(author["updated_at"])
         else:
-            stmt = stmt.order_by(Book.title.asc())
+            for book in books:
+                book["authors"] = authors[book["id"]]
+        return books
+
+    def _authors_by_book(self, book_ids: list[int]) -> dict[int, list[dict]]:
+        """Authors (dicts shaped like `AuthorSchema`) of `book_ids`, by id."""
+        rows = db.session.execute(self._authors_query(book_ids))
+        return self._group_authors(book_ids, rows)
+
+    async def _aauthors_by_book(
+        self, session: AsyncSession, book_ids: list[int]
+    ) -> dict[int, list[dict]]:
+        rows = await session.execute(self._authors_query(book_ids))
+        return self._group_authors(book_ids, rows)
+
+    def _authors_query(self, book_ids: list[int]) -> Select:
+        return (
+            db.select(BookAuthorAssociation.book_id, *self.AUTHOR_COLUMNS)
+            .join(BookAuthorAssociation.author)
+            .where(BookAuthorAssociation.book_id.in_(book_ids))
+            .order_by(BookAuthorAssociation.book_id, Author.id)
+        )
+
+    @staticmethod
+    def _group_authors(book_ids: list[int], rows) -> dict[int, list[dict]]:
+        authors = {book_id: [] for book_id in book_ids}
+        for row in rows:
+            author = row._asdict()
+            authors[author.pop("book_id")].append(author)
+        return authors
+
+    @read_only
+    def get_books_version(
+        self,
+        page: int,
+        per_page: int,
+        sort_param: str | None = None,
+        filter_param: str | None = None,
+        cursor: str | None = None,
+        search: str | None = None,
+    ) -> Version:
+        """
+        Version of the page `get_books` returns for the same arguments, read
+        in one query over ids and timestamps only. The total count is not
+        part of it, so `last_page` may lag until a row of the page changes.
+        """
+        stmt, sort_keys = self._books_query(
+            sort_param, filter_param, search, keyset=cursor is not None
+        )
+
+        if cursor is not None:
+            keys = self._keyset_keys(sort_keys)
+            page_stmt = keyset_page(stmt, keys, cursor, per_page)
+        else:
+            page_stmt = offset_page(self._order(stmt, sort_keys), page, per_page)
+
+        ids = page_stmt.with_only_columns(Book.id, maintain_column_froms=True)
+        return self._version(ids)
+
+    @read_only
+    def get_version(self, book_id: int) -> Version | None:
+        """Version of a single book, None if it does not exist."""
+        version = self._version(db.select(Book.id).where(Book.id == book_id))
+        return version if version.rows else None
+
+    @staticmethod
+    def _version(ids: Select) -> Version:
+        """
+        Aggregates books selected by `ids` (a statement of book ids) and
+        their authors: count, sum of ids, number of author links and newest
+        `updated_at`. Linking or unlinking an author touches the book and
+        renaming an author touches the author, so any change of the
+        serialized books changes the version.
+        """
+        book_ids = db.select(ids.subquery().c.id)
+        links = BookAuthorAssociation.book_id.in_(book_ids)
+        row = db.session.execute(
+            db.select(
+                func.count(Book.id),
+                func.coalesce(func.sum(Book.id), 0),
+                func.max(Book.updated_at),
+                db.select(func.count(BookAuthorAssociation.book_id))
+                .where(links)
+                .scalar_subquery(),
+                db.select(func.max(Author.updated_at))
+                .join(BookAuthorAssociation)
+                .where(links)
+                .scalar_subquery(),
+            ).where(Book.id.in_(book_ids))
+        ).first()
+        if row is None:
+            return Version(0, "", None)
 
-        pagination = db.paginate(stmt, page=page, per_page=per_page, error_out=False)
+        rows, id_sum, books_updated, link_count, authors_updated = row
+        last_modified = max(
+            (t for t in (books_updated, authors_updated) if t is not None),
+            default=None,
+        )
+        token = f"{rows}-{id_sum}-{link_count}-{last_modified}"
+        return Version(rows, token, last_modified)
 
-        return {
-            "last_page": pagination.pages,
-            "data": pagination.items,
-        }
+    def export(self, chunk_size: int = 1000) -> Iterator[list[dict[str, Any]]]:
+        """
+        Yields all books (dicts shaped like `BookSchema`) ordered by id, in
+        chunks of `chunk_size`. Rows are fetched through a server-side cursor
+        and authors are loaded with one query per chunk, so memory does not
+        grow with the size of the catalogue.
+        """
+        books = (
+            db.select(*self.ROW_COLUMNS)
+            .order_by(Book.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        for partition in db.session.execute(books).partitions():
+            rows = [row._asdict() for row in partition]
+            authors = self._authors_by_book([row["id"] for row in rows])
+            for row in rows:
+                row["authors"] = authors[row["id"]]
+            yield rows
 
+    @read_write
     def add_author(self, book_id: int, author_id: int) -> None:
         """Add author-book relation.
         :raise ResourceNotFound: if book or author not found"""
@@ -97,8 +455,10 @@ class BookService(CRUDService[Book]):
 
         if author not in book.authors:
             book.authors.append(author)
+            book.updated_at = utcnow()  # authors are part of the book's version
             db.session.commit()
 
+    @read_write
     def remove_author(self, book_id: int, author_id: int) -> None:
         """Remove author-book relation.
         :raise ResourceNotFound: if book or author not found"""
@@ -110,6 +470,7 @@ class BookService(CRUDService[Book]):
 
         if author in book.authors:
             book.authors.remove(author)
+            book.updated_at = utcnow()  # authors are part of the book's version
             db.session.commit()
 
         return True
@@ -0,0 +1,167 @@
+import json
+from enum import Enum
+from typing import Any, NamedTuple
+
+from flask import current_app
+from sqlalchemy import Select, Table, TableClause, func, inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, lazyload
+from sqlalchemy.sql import visitors
+
+from my_web.db import events
+from my_web.errors import InvalidRequest
+from my_web.extensions import db
+from my_web.lru import LRUCache
+from my_web.metrics import cache_lookups
+
+
+class CountMode(Enum):
+    AUTO = "auto"  # cached exact count, estimate for large tables
+    EXACT = "exact"  # cached exact count
+    NONE = "none"  # no count at all, last_page is None
+
+    @classmethod
+    def parse(cls, value: str | None) -> "CountMode":
+        """:raise InvalidRequest: if value is not a known mode."""
+        if not value:
+            return cls.AUTO
+        try:
+            return cls(value)
+        except ValueError:
+            raise InvalidRequest(
+                f"Invalid count mode '{value}', use one of: "
+                + ", ".join(m.value for m in cls)
+            )
+
+
+class Count(NamedTuple):
+    total: int | None
+    estimated: bool = False
+
+
+class CountCache(LRUCache[str, tuple[frozenset[str], Count]]):
+    """
+    Per-process LRU of row counts, with the tables they read, keyed by the
+    normalized SQL of the counted statement. Entries expire after
+    COUNT_CACHE_TTL seconds and are dropped as soon as a commit writes into
+    any table the statement reads.
+    """
+
+    def invalidate(self, changes: events.Changes) -> None:
+        self.pop_where(lambda _, entry: bool(entry[0] & changes.keys()))
+
+
+count_cache = CountCache()
+events.on_commit(count_cache.invalidate)
+
+
+def _count_statement(stmt: Select) -> Select:
+    sub = stmt.options(lazyload("*")).order_by(None).subquery()
+    return db.select(func.count()).select_from(sub)
+
+
+def _cache_key(session: Session, stmt: Select) -> str:
+    compiled = stmt.compile(dialect=session.get_bind().dialect)
+    return json.dumps([str(compiled), compiled.params], sort_keys=True, default=str)
+
+
+def _tables(stmt: Select) -> frozenset[str]:
+    return frozenset(
+        node.name for node in visitors.iterate(stmt) if isinstance(node, TableClause)
+    )
+
+
+def _table_size(session: Session, table: Table) -> int:
+    """Cheap upper bound of the number of rows in `table`."""
+    if session.get_bind().dialect.name == "postgresql":
+        # -1 (never analyzed) falls back to an exact count
+        return session.execute(
+            text("SELECT reltuples FROM pg_class WHERE oid = CAST(:name AS regclass)"),
+            {"name": table.name},
+        ).scalar_one()
+    # Integer primary keys are assigned in ascending order, MAX() is an index seek
+    pk = list(table.primary_key.columns)[0]
+    return session.execute(db.select(func.max(pk))).scalar() or 0
+
+
+def _estimate(
+    session: Session, stmt: Select, limit: int, table: Table, size: int
+) -> Count:
+    """
+    Estimated number of rows of `stmt`, whose primary `table` holds about
+    `size` rows: the planner estimate on PostgreSQL. Elsewhere the first
+    `limit` matching rows in primary key order are read: fewer is an exact
+    count, otherwise their density over the key range they span is
+    extrapolated to the whole table (`size` is its highest key).
+    """
+    bind = session.get_bind()
+    if bind.dialect.name == "postgresql":
+        compiled = stmt.order_by(None).compile(
+            bind, compile_kwargs={"literal_binds": True}
+        )
+        plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+        return Count(int(plan[0]["Plan"]["Plan Rows"]), estimated=True)
+
+    pk = list(table.primary_key.columns)[0]
+    sample = (
+        stmt.add_columns(pk.label("sample_key"))
+        .options(lazyload("*"))
+        .order_by(None)
+        .order_by(pk)
+        .limit(limit)
+        .subquery()
+    )
+    matches, last_key = session.execute(
+        db.select(func.count(), func.max(sample.c.sample_key))
+    ).one()
+    if matches < limit:
+        return Count(matches)
+    return Count(max(round(matches * size / last_key), matches), estimated=True)
+
+
+def count_rows(
+    stmt: Select, mode: CountMode = CountMode.AUTO, session: Session | None = None
+) -> Count:
+    """
+    Returns the number of rows of `stmt` according to `mode`, counted in
+    `session` (`db.session` by default).
+
+    Results are cached until a write touches one of the queried tables. In
+    AUTO mode tables bigger than COUNT_ESTIMATE_THRESHOLD rows are estimated
+    instead of counted.
+    """
+    if mode is CountMode.NONE:
+        return Count(None)
+    if session is None:
+        session = db.session
+
+    config: dict[str, Any] = current_app.config
+    key = _cache_key(session, stmt)
+    _, cached = count_cache.get(key) or ((), None)
+    if cached is not None and (mode is CountMode.AUTO or not cached.estimated):
+        cache_lookups.inc(cache="count", result="hit")
+        return cached
+    cache_lookups.inc(cache="count", result="miss")
+
+    threshold = config["COUNT_ESTIMATE_THRESHOLD"]
+    primary_table = inspect(stmt.column_descriptions[0]["entity"]).local_table
+    size = _table_size(session, primary_table) if mode is CountMode.AUTO else 0
+    if size > threshold:
+        count = _estimate(session, stmt, threshold, primary_table, size)
+    else:
+        count = Count(session.execute(_count_statement(stmt)).scalar_one())
+
+    count_cache.set(key, (_tables(stmt), count), config["COUNT_CACHE_TTL"])
+    return count
+
+
+async def acount_rows(
+    session: AsyncSession, stmt: Select, mode: CountMode = CountMode.AUTO
+) -> Count:
+    """
+    `count_rows` in an async session: the counting code runs on its sync
+    session, its statements are still awaited by the event loop.
+    """
+    if mode is CountMode.NONE:
+        return Count(None)
+    return await session.run_sync(lambda sync: count_rows(stmt, mode, sync))
@@ -0,0 +1,283 @@
+import base64
+import json
+import math
+from datetime import date, datetime
+from typing import Any
+
+from flask import current_app
+from sqlalchemy import Row, Select, and_, false, or_, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from my_web.errors import InvalidRequest
+from my_web.extensions import db
+from my_web.services.counting import Count, CountMode, acount_rows, count_rows
+
+# Sort key: (expression, "asc" | "desc")
+SortKey = tuple[ColumnElement, str]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    raise TypeError(f"Cannot store {type(value).__name__} in a cursor")
+
+
+def _decode_value(obj: dict[str, Any]) -> Any:
+    if obj.keys() == {"datetime"}:
+        return datetime.fromisoformat(obj["datetime"])
+    if obj.keys() == {"date"}:
+        return date.fromisoformat(obj["date"])
+    return obj
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """Encodes the sort-key tuple of the last returned row as an opaque token."""
+    raw = json.dumps(values, separators=(",", ":"), default=_encode_value)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    """Decodes a token created by `encode_cursor`.
+    :raise InvalidRequest: if the token is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii"))
+        values = json.loads(raw, object_hook=_decode_value)
+    except (ValueError, TypeError):
+        raise InvalidRequest("Invalid pagination cursor.")
+    if not isinstance(values, list):
+        raise InvalidRequest("Invalid pagination cursor.")
+    return values
+
+
+def _nullable(expr: ColumnElement) -> bool:
+    """Whether `expr` may be NULL: columns tell, other expressions may."""
+    column = getattr(expr, "expression", expr)
+    return getattr(column, "nullable", True)
+
+
+def _order_by(key: SortKey) -> ColumnElement:
+    expr, direction = key
+    return expr.desc() if direction == "desc" else expr.asc()
+
+
+def _keyset_order_by(key: SortKey) -> ColumnElement:
+    """
+    Like `_order_by`, NULLs sorting before every value on every database,
+    which is how SQLite orders them and stores them in its indexes.
+    """
+    expr, direction = key
+    if not _nullable(expr):
+        return _order_by(key)
+    return expr.desc().nulls_last() if direction == "desc" else expr.asc().nulls_first()
+
+
+def _after(
+    keys: list[SortKey], values: list[Any], nullable: list[bool] | None = None
+) -> ColumnElement:
+    """
+    Builds the "row comes after the cursor" predicate, NULLs sorting first
+    (see `_keyset_order_by`). `nullable` overrides which keys may be NULL.
+
+    Keys of one direction compare as a row value, `(k1, k2) > (v1, v2)`,
+    which databases answer with an index seek. Mixed directions and NULLs
+    expand to `k1 > v1 OR (k1 = v1 AND (k2 > v2 OR ...))`, with a leading
+    `k1 >= v1` where possible so that the seek is still used.
+    """
+    if nullable is None:
+        nullable = [_nullable(expr) for expr, _ in keys]
+    directions = {direction for _, direction in keys}
+    if (
+        len(directions) == 1
+        and None not in values
+        and (directions == {"asc"} or not any(nullable))
+    ):
+        # Rows with a NULL key compare as NULL and are left out, in ascending
+        # order they are before the cursor
+        row = tuple_(*(expr for expr, _ in keys)) if len(keys) > 1 else keys[0][0]
+        cursor = tuple_(*values) if len(values) > 1 else values[0]
+        return row < cursor if directions == {"desc"} else row > cursor
+
+    def after(i: int) -> ColumnElement:
+        (expr, direction), value = keys[i], values[i]
+        if value is None:
+            # NULLs are first: non-NULL rows are after them in ascending order
+            later = expr.is_not(None) if direction == "asc" else false()
+            equal = expr.is_(None)
+        else:
+            later = expr < value if direction == "desc" else expr > value
+            if direction == "desc" and nullable[i]:
+                later = or_(later, expr.is_(None))
+            equal = expr == value
+        if i == len(keys) - 1:
+            return later
+        return or_(later, and_(equal, after(i + 1)))
+
+    predicate = after(0)
+    (first, direction), value = keys[0], values[0]
+    if value is not None and direction == "asc":
+        predicate = and_(first >= value, predicate)
+    elif value is not None and not nullable[0]:
+        predicate = and_(first <= value, predicate)
+    return predicate
+
+
+def _after_with_nulls(
+    stmt: Select, keys: list[SortKey], values: list[Any], limit: int
+) -> ColumnElement:
+    """
+    `_after` of a descending nullable first key with a non-NULL cursor value.
+    The NULLs come after the cursor but outside of its index range, so no
+    single seek finds both: the rows before the cursor value and the NULLs
+    are sought separately, `limit` of each, and the page is picked from
+    their primary keys (the last key).
+    """
+    first, pk = keys[0][0], keys[-1][0]
+    order = [_keyset_order_by(key) for key in keys]
+    not_null = [False] + [_nullable(expr) for expr, _ in keys[1:]]
+
+    def seek(where: ColumnElement) -> Select:
+        page = stmt.with_only_columns(pk, maintain_column_froms=True)
+        page = page.where(where).order_by(None).order_by(*order).limit(limit)
+        return page.subquery().select()
+
+    return pk.in_(
+        union_all(seek(_after(keys, values, not_null)), seek(first.is_(None)))
+    )
+
+
+def page_args(page: int, per_page: int) -> tuple[int, int]:
+    """
+    Normalizes page arguments: out of range values fall back like in
+    `db.paginate(error_out=False)` and the page size is capped at
+    MAX_PAGE_SIZE, so that no request renders an unbounded page.
+    """
+    max_per_page = current_app.config.get("MAX_PAGE_SIZE", 100)
+    page = page if page >= 1 else 1
+    per_page = per_page if per_page >= 1 else 20
+    return page, min(per_page, max_per_page)
+
+
+def offset_page(stmt: Select, page: int, per_page: int) -> Select:
+    """Limits `stmt` to one OFFSET/LIMIT page."""
+    page, per_page = page_args(page, per_page)
+    return stmt.limit(per_page).offset((page - 1) * per_page)
+
+
+def offset_paginate(
+    stmt: Select,
+    page: int,
+    per_page: int,
+    count: CountMode = CountMode.AUTO,
+    scalars: bool = True,
+) -> dict[str, Any]:
+    """
+    Returns one OFFSET/LIMIT page of `stmt`, its first column or (without
+    `scalars`) whole rows. The total count used for `last_page` comes from
+    the count strategy layer (cached, estimated or skipped), not from a
+    COUNT(*) per request.
+    """
+    page, per_page = page_args(page, per_page)
+    result = db.session.execute(offset_page(stmt, page, per_page))
+    items = result.scalars().all() if scalars else result.all()
+    return _offset_result(items, count_rows(stmt, count), per_page)
+
+
+async def aoffset_paginate(
+    session: AsyncSession,
+    stmt: Select,
+    page: int,
+    per_page: int,
+    count: CountMode = CountMode.AUTO,
+    scalars: bool = True,
+) -> dict[str, Any]:
+    """`offset_paginate` in an async session."""
+    page, per_page = page_args(page, per_page)
+    result = await session.execute(offset_page(stmt, page, per_page))
+    items = result.scalars().all() if scalars else result.all()
+    return _offset_result(items, await acount_rows(session, stmt, count), per_page)
+
+
+def _offset_result(items: list, total: Count, per_page: int) -> dict[str, Any]:
+    return {
+        "last_page": None if total.total is None else math.ceil(total.total / per_page),
+        "last_page_estimated": total.estimated,
+        "data": items,
+    }
+
+
+def keyset_page(
+    stmt: Select, keys: list[SortKey], cursor: str | None, per_page: int
+) -> Select:
+    """
+    Limits `stmt` to the rows right after `cursor`, plus one row telling
+    whether there is a next page. Sort key values are appended as columns.
+
+    `keys` must identify a row uniquely (end them with the primary key), so
+    that the cost of a page does not depend on how deep it is: the database
+    seeks to the cursor position instead of skipping OFFSET rows.
+    :raise InvalidRequest: if the cursor does not match the sort keys.
+    """
+    _, per_page = page_args(1, per_page)
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(keys):
+            raise InvalidRequest("Pagination cursor does not match the sort order.")
+        (first, direction), value = keys[0], values[0]
+        if direction == "desc" and value is not None and _nullable(first):
+            stmt = stmt.where(_after_with_nulls(stmt, keys, values, per_page + 1))
+        else:
+            stmt = stmt.where(_after(keys, values))
+
+    stmt = stmt.add_columns(*(expr for expr, _ in keys))
+    stmt = stmt.order_by(None).order_by(*(_keyset_order_by(k) for k in keys))
+    return stmt.limit(per_page + 1)
+
+
+def keyset_paginate(
+    stmt: Select,
+    keys: list[SortKey],
+    cursor: str | None,
+    per_page: int,
+    scalars: bool = True,
+) -> dict[str, Any]:
+    """
+    Returns one page of `stmt` that starts right after `cursor`,
+    see `keyset_page`. Without `scalars` the page contains whole rows, sort
+    key values appended at their end.
+    :raise InvalidRequest: if the cursor does not match the sort keys.
+    """
+    _, per_page = page_args(1, per_page)
+    rows = db.session.execute(keyset_page(stmt, keys, cursor, per_page)).all()
+    return _keyset_result(rows, len(keys), per_page, scalars)
+
+
+async def akeyset_paginate(
+    session: AsyncSession,
+    stmt: Select,
+    keys: list[SortKey],
+    cursor: str | None,
+    per_page: int,
+    scalars: bool = True,
+) -> dict[str, Any]:
+    """`keyset_paginate` in an async session."""
+    _, per_page = page_args(1, per_page)
+    result = await session.execute(keyset_page(stmt, keys, cursor, per_page))
+    return _keyset_result(result.all(), len(keys), per_page, scalars)
+
+
+def _keyset_result(
+    rows: list[Row], key_count: int, per_page: int, scalars: bool
+) -> dict[str, Any]:
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    return {
+        "last_page": None,
+        "data": [row[0] for row in rows] if scalars else rows,
+        "next_cursor": encode_cursor(list(rows[-1][-key_count:])) if has_more else None,
+    }
@@ -0,0 +1,197 @@
+"""
+Full-text index of book titles and author names.
+
+SQLite uses an FTS5 virtual table, PostgreSQL a table with a tsvector column
+and a GIN index. The index is not part of the ORM metadata: it is created
+together with the other tables (and by its migration) and kept in sync from
+the flush events of books, authors and their associations.
+"""
+
+import re
+
+from sqlalchemy import Connection, Subquery, bindparam, event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import column, literal_column, table
+from sqlalchemy.sql.elements import ColumnElement
+
+from my_web.db import events
+from my_web.extensions import db
+
+SEARCH_TABLE = "book_search"
+SUPPORTED_DIALECTS = ("sqlite", "postgresql")
+
+CREATE_DDL = {
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+        "title, authors, tokenize = 'unicode61 remove_diacritics 2')",
+    ],
+    "postgresql": [
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+        "book_id INTEGER PRIMARY KEY REFERENCES books (id) ON DELETE CASCADE, "
+        "document TSVECTOR NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_document "
+        f"ON {SEARCH_TABLE} USING GIN (document)",
+    ],
+}
+DROP_DDL = f"DROP TABLE IF EXISTS {SEARCH_TABLE}"
+
+# Rows of `books` (filtered by :ids) in the shape of the search table
+INDEX_SQL = {
+    "sqlite": f"""
+        INSERT INTO {SEARCH_TABLE} (rowid, title, authors)
+        SELECT b.id, b.title, coalesce(group_concat(a.name, ' '), '')
+        FROM books b
+        LEFT JOIN book_author ba ON ba.book_id = b.id
+        LEFT JOIN authors a ON a.id = ba.author_id
+        WHERE b.id IN :ids
+        GROUP BY b.id, b.title
+    """,
+    "postgresql": f"""
+        INSERT INTO {SEARCH_TABLE} (book_id, document)
+        SELECT b.id,
+            setweight(to_tsvector('simple', b.title), 'A')
+            || setweight(to_tsvector('simple', coalesce(string_agg(a.name, ' '), '')), 'B')
+        FROM books b
+        LEFT JOIN book_author ba ON ba.book_id = b.id
+        LEFT JOIN authors a ON a.id = ba.author_id
+        WHERE b.id IN :ids
+        GROUP BY b.id, b.title
+    """,
+}
+DELETE_SQL = {
+    "sqlite": f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN :ids",
+    "postgresql": f"DELETE FROM {SEARCH_TABLE} WHERE book_id IN :ids",
+}
+
+# Lightweight table constructs, so that queries (and the count cache) know
+# they read from the search table
+sqlite_search = table(SEARCH_TABLE, column("rowid"), column("title"), column("authors"))
+postgresql_search = table(SEARCH_TABLE, column("book_id"), column("document"))
+
+
+def _supported(dialect_name: str) -> bool:
+    return dialect_name in SUPPORTED_DIALECTS
+
+
+def create_index(connection: Connection) -> None:
+    """Creates the search table for the connection's dialect (if supported)."""
+    for statement in CREATE_DDL.get(connection.dialect.name, []):
+        connection.execute(text(statement))
+
+
+def drop_index(connection: Connection) -> None:
+    if _supported(connection.dialect.name):
+        connection.execute(text(DROP_DDL))
+
+
+def reindex(connection: Connection, book_ids) -> None:
+    """Rebuilds index entries of the given books, removing deleted ones."""
+    dialect = connection.dialect.name
+    if not _supported(dialect) or not book_ids:
+        return
+    ids = bindparam("ids", expanding=True)
+    params = {"ids": list(book_ids)}
+    connection.execute(text(DELETE_SQL[dialect]).bindparams(ids), params)
+    connection.execute(text(INDEX_SQL[dialect]).bindparams(ids), params)
+
+
+def rebuild(connection: Connection, chunk_size: int = 10_000) -> None:
+    """(Re)indexes all books, in chunks to keep memory bounded."""
+    if not _supported(connection.dialect.name):
+        return
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    last_id = 0
+    while True:
+        ids = (
+            connection.execute(
+                text("SELECT id FROM books WHERE id > :last ORDER BY id LIMIT :n"),
+                {"last": last_id, "n": chunk_size},
+            )
+            .scalars()
+            .all()
+        )
+        if not ids:
+            break
+        index_sql = text(INDEX_SQL[connection.dialect.name])
+        connection.execute(
+            index_sql.bindparams(bindparam("ids", expanding=True)), {"ids": ids}
+        )
+        last_id = ids[-1]
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Alembic autogenerate filter: the search table is managed by hand."""
+    return not (type_ == "table" and name.startswith(SEARCH_TABLE))
+
+
+def _tokens(query: str) -> list[str]:
+    return re.findall(r"\w+", query)
+
+
+def match(query: str) -> tuple[Subquery, ColumnElement] | None:
+    """
+    Returns a (subquery of matching book ids, rank column) pair for `query`,
+    or None when the query has no searchable word. Every word is matched as
+    a prefix, all words must match. Lower rank is a better match.
+    """
+    tokens = _tokens(query)
+    if not tokens:
+        return None
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        expression = " ".join(f'"{token}"*' for token in tokens)
+        stmt = db.select(
+            sqlite_search.c.rowid.label("book_id"),
+            # Title matches weigh more than author matches (like setweight A/B)
+            literal_column(f"bm25({SEARCH_TABLE}, 10.0, 1.0)").label("rank"),
+        ).where(literal_column(SEARCH_TABLE).op("MATCH")(expression))
+    elif dialect == "postgresql":
+        tsquery = db.func.to_tsquery(
+            "simple", " & ".join(f"{token}:*" for token in tokens)
+        )
+        stmt = db.select(
+            postgresql_search.c.book_id,
+            (-db.func.ts_rank(postgresql_search.c.document, tsquery)).label("rank"),
+        ).where(postgresql_search.c.document.op("@@")(tsquery))
+    else:
+        return None
+
+    subquery = stmt.subquery("search")
+    return subquery, subquery.c.rank
+
+
+@events.on_flush
+def _sync_index(session: Session, changes: events.Changes) -> None:
+    book_ids = set(changes.get("books", ()))
+    book_ids.update(book_id for book_id, _ in changes.get("book_author", ()))
+
+    author_ids = changes.get("authors")
+    if not book_ids and not author_ids:
+        return
+
+    connection = session.connection()
+    if not _supported(connection.dialect.name):
+        return
+    if author_ids:
+        # Renamed authors change the documents of all their books
+        book_ids.update(
+            connection.execute(
+                text(
+                    "SELECT book_id FROM book_author WHERE author_id IN :ids"
+                ).bindparams(bindparam("ids", expanding=True)),
+                {"ids": list(author_ids)},
+            ).scalars()
+        )
+    reindex(connection, book_ids)
+    events.mark_changed(session, SEARCH_TABLE, book_ids)
+
+
+@event.listens_for(db.metadata, "after_create")
+def _create_index(target, connection, **kwargs) -> None:
+    create_index(connection)
+
+
+@event.listens_for(db.metadata, "before_drop")
+def _drop_index(target, connection, **kwargs) -> None:
+    drop_index(connection)
@@ -0,0 +1,161 @@
+"""
+Slow query log.
+
+With SLOW_QUERY_MS set, every SQL statement taking at least that long is
+logged with its bound parameters, duration, the endpoint of the request
+that ran it and the plan of the database (`EXPLAIN QUERY PLAN` on SQLite,
+`EXPLAIN` elsewhere). Entries are JSON lines of a rotating file
+(SLOW_QUERY_LOG, SLOW_QUERY_LOG_MAX_BYTES, SLOW_QUERY_LOG_BACKUPS), read
+them with `uv run slow-queries`.
+"""
+
+import json
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from flask import Flask, has_request_context, request
+from loguru import logger
+from sqlalchemy import Engine, event
+
+from my_web.extensions import db
+
+# Only these are explained: EXPLAIN of writes is not supported everywhere
+EXPLAINED = ("select", "with")
+SAVEPOINT = "slow_query_explain"
+
+# Log file path -> loguru sink id, each file is added once per process
+_sinks: dict[str, int] = {}
+
+
+def _in_savepoint(cursor, statement: str, parameters: Any) -> list[Any]:
+    """Rows of `statement`, run in a savepoint rolled back to when it fails."""
+    cursor.execute(f"SAVEPOINT {SAVEPOINT}")
+    try:
+        cursor.execute(statement, parameters)
+        return cursor.fetchall()
+    except Exception:
+        cursor.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+        raise
+    finally:
+        cursor.execute(f"RELEASE SAVEPOINT {SAVEPOINT}")
+
+
+def _explain(conn, statement: str, parameters: Any) -> list[str]:
+    """
+    Plan of `statement`, run on a raw cursor so that it is not instrumented.
+    It runs in the transaction of the request, in a savepoint except on
+    SQLite: elsewhere (PostgreSQL) a failed statement aborts the transaction.
+    """
+    if not statement.lstrip().lower().startswith(EXPLAINED):
+        return []
+    sqlite = conn.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    cursor = conn.connection.cursor()
+    try:
+        if sqlite:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        else:
+            rows = _in_savepoint(cursor, prefix + statement, parameters)
+    except Exception as e:  # any DBAPI error, the query itself has succeeded
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        cursor.close()
+    if not sqlite:
+        return [str(row[0]) for row in rows]
+    # (id, parent, notused, detail), children are indented under their parent
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def _parameters(parameters: Any) -> Any:
+    """Bound parameters in a JSON serializable form."""
+    return json.loads(json.dumps(parameters, default=str))
+
+
+def init_app(app: Flask) -> None:
+    threshold = app.config.get("SLOW_QUERY_MS") or 0
+    if threshold <= 0:
+        return
+    path = str(Path(app.config["SLOW_QUERY_LOG"]).absolute())
+    if path not in _sinks:
+        _sinks[path] = logger.add(
+            path,
+            format="{message}",
+            filter=lambda record: record["extra"].get("slow_query_log") == path,
+            serialize=True,
+            rotation=app.config["SLOW_QUERY_LOG_MAX_BYTES"],
+            retention=app.config["SLOW_QUERY_LOG_BACKUPS"],
+        )
+    slow_logger = logger.bind(slow_query_log=path)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, many):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, many):
+        duration_ms = (time.perf_counter() - conn.info["slow_query_start"].pop()) * 1000
+        if duration_ms < threshold:
+            return
+        slow_logger.warning(
+            "Slow query {duration_ms}ms at {endpoint}",
+            duration_ms=round(duration_ms, 2),
+            endpoint=request.endpoint if has_request_context() else None,
+            statement=statement,
+            parameters=_parameters(parameters),
+            plan=[] if many else _explain(conn, statement, parameters),
+        )
+
+    def handle_error(context) -> None:
+        starts = (
+            context.connection.info.get("slow_query_start")
+            if context.connection
+            else None
+        )
+        if starts:
+            starts.pop()
+
+    with app.app_context():
+        engines: list[Engine] = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(engine, "handle_error", handle_error)
+
+
+def read_log(path: str) -> Iterator[dict[str, Any]]:
+    """Entries of the log and of its rotated files, oldest first."""
+    log = Path(path)
+    files = sorted(
+        log.parent.glob(f"{log.stem}*{log.suffix}"), key=lambda f: f.stat().st_mtime
+    )
+    for file in files:
+        with file.open(encoding="utf-8") as lines:
+            for line in lines:
+                record = json.loads(line)["record"]
+                extra = record["extra"]
+                yield {
+                    "time": record["time"]["repr"],
+                    "duration_ms": extra["duration_ms"],
+                    "endpoint": extra["endpoint"],
+                    "statement": extra["statement"],
+                    "parameters": extra["parameters"],
+                    "plan": extra["plan"],
+                }
+
+
+def format_entry(entry: dict[str, Any]) -> str:
+    lines = [
+        f"{entry['time']}  {entry['duration_ms']} ms  {entry['endpoint'] or '-'}",
+        entry["statement"].strip(),
+        f"parameters: {json.dumps(entry['parameters'])}",
+    ]
+    if entry["plan"]:
+        lines.append("plan:")
+        lines.extend(f"  {line}" for line in entry["plan"])
+    return "\n".join(lines)
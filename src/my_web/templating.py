@@ -0,0 +1,71 @@
+"""
+Template compilation and fragment caching.
+
+Compiled templates are stored in a bytecode cache on disk
+(JINJA_BYTECODE_CACHE_DIR, a directory of the system temp directory when
+empty), a restarted worker loads them instead of compiling the sources.
+
+`{% cache key, ttl %}...{% endcache %}` keeps the rendered block in a
+per-process LRU for `ttl` seconds (TEMPLATE_FRAGMENT_CACHE_TTL when
+omitted). Writes do not invalidate fragments: put the `updated_at` of
+every rendered entity in the key, related ones included, so that edits are
+visible at once in every process and unrelated fragments stay cached, e.g.
+
+    {% cache ("book-row", book.id, book.updated_at,
+              book.authors | map(attribute="updated_at") | select | max) %}
+"""
+
+import os
+from collections.abc import Callable
+from typing import Any
+
+from flask import Flask, current_app
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+from my_web.lru import LRUCache
+
+
+# Rendered fragments by the repr of their key
+fragment_cache: LRUCache[str, str] = LRUCache(maxsize=4096)
+
+
+class FragmentCacheExtension(Extension):
+    """The `{% cache key[, ttl] %}...{% endcache %}` tag."""
+
+    tags = frozenset({"cache"})
+
+    def parse(self, parser) -> nodes.Node:
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_cache", args), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache(self, key: Any, ttl: float | None, caller: Callable[[], str]) -> str:
+        # Keys are expressions of the template, e.g. tuples with datetimes
+        key = repr(key)
+        fragment = fragment_cache.get(key)
+        if fragment is None:
+            fragment = caller()
+            if ttl is None:
+                ttl = current_app.config["TEMPLATE_FRAGMENT_CACHE_TTL"]
+            fragment_cache.set(key, fragment, ttl)
+        return fragment
+
+
+def init_app(app: Flask) -> None:
+    if app.config.get("JINJA_BYTECODE_CACHE"):
+        directory = app.config.get("JINJA_BYTECODE_CACHE_DIR") or None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    fragment_cache.maxsize = app.config["TEMPLATE_FRAGMENT_CACHE_SIZE"]
+    # Fragments rendered against the database of a previous app
+    fragment_cache.clear()
@@ -1,9 +1,14 @@
 import pytest
+from contextlib import contextmanager
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
+from sqlalchemy.dialects import sqlite
 from my_web.app import create_app
 from my_web.extensions import db
 from my_web.db.models import Author, Book, User
 from my_web.db.fixtures import initial_library_data, get_initial_data
+from my_web.instrumentation import record
+from my_web.services.counting import count_cache
 
 
 class AuthActions:
@@ -51,7 +56,7 @@ class MockSession:
             User: len(initial_users) + 1 if initial_users else 1,
         }
 
-    def get(self, model, id):
+    def get(self, model, id, **kwargs):
         return self.store.get(model, {}).get(id)
 
     def add(self, instance):
@@ -80,6 +85,9 @@ class MockSession:
     def rollback(self):
         pass
 
+    def get_bind(self):
+        return SimpleNamespace(dialect=sqlite.dialect())
+
     def execute(self, statement):
         mock_result = MagicMock()
         target_model = None
@@ -102,7 +110,12 @@ class MockSession:
         else:
             mock_scalars = MagicMock()
             mock_scalars.all.return_value = []
+            mock_scalars.first.return_value = None
             mock_result.scalars.return_value = mock_scalars
+            mock_result.first.return_value = None
+            # Aggregates (e.g. COUNT of a listing) of an empty database
+            mock_result.scalar.return_value = None
+            mock_result.scalar_one.return_value = 0
 
         return mock_result
 
@@ -132,9 +145,12 @@ def app():
         "TESTING": True,
         "WTF_CSRF_ENABLED": False,
         "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+        # The cheapest bcrypt cost, logins of the tests take milliseconds
+        "BCRYPT_LOG_ROUNDS": 4,
     }
 
     app = create_app(test_config=test_config)
+    count_cache.clear()
 
     with app.app_context():
         db.create_all()
@@ -179,3 +195,25 @@ def fast_client(fast_app):
 @pytest.fixture
 def runner(app):
     return app.test_cli_runner()
+
+
+@pytest.fixture
+def query_budget(app):
+    """
+    Fails when a block runs more SQL statements than declared, e.g.
+    `with query_budget(4): client.get(url)`.
+    """
+
+    @contextmanager
+    def budget(max_queries: int):
+        # Requests share the test's session: start without loaded objects
+        db.session.expire_all()
+        count_cache.clear()
+        with record(statements=True) as stats:
+            yield stats
+        assert stats.queries <= max_queries, (
+            f"{stats.queries} queries, budget {max_queries}:\n"
+            + "\n".join(stats.statements)
+        )
+
+    return budget
@@ -0,0 +1,108 @@
+import gzip
+import shutil
+from pathlib import Path
+
+import brotli
+import pytest
+from flask import Flask, url_for
+
+from my_web import assets
+
+PACKAGE_STATIC = Path(assets.__file__).parent / "static"
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    static = tmp_path / "static"
+    shutil.copytree(
+        PACKAGE_STATIC, static, ignore=shutil.ignore_patterns("dist", "vendor")
+    )
+    return static
+
+
+def make_app(static_dir: Path) -> Flask:
+    app = Flask(__name__, static_folder=static_dir)
+    app.config.update(ASSETS_FINGERPRINT=True, ASSETS_MAX_AGE=3600)
+    assets.init_app(app)
+    return app
+
+
+def test_build(static_dir):
+    manifest = assets.build(static_dir)
+
+    hashed = manifest["js/datatable.js"]
+    assert hashed.startswith("js/datatable.") and hashed.endswith(".js")
+    built = (static_dir / "dist" / hashed).read_bytes()
+    assert len(built) < (static_dir / "js/datatable.js").stat().st_size
+    assert gzip.decompress((static_dir / "dist" / f"{hashed}.gz").read_bytes()) == built
+    assert (
+        brotli.decompress((static_dir / "dist" / f"{hashed}.br").read_bytes()) == built
+    )
+    # Same content, same name
+    assert assets.build(static_dir) == manifest
+
+
+def test_hashed_urls(static_dir):
+    manifest = assets.build(static_dir)
+    app = make_app(static_dir)
+
+    with app.test_request_context():
+        url = url_for("static", filename="css/tabulator-custom.css")
+    assert url == f"/static/dist/{manifest['css/tabulator-custom.css']}"
+
+
+def test_serves_precompressed_immutable(static_dir):
+    manifest = assets.build(static_dir)
+    app = make_app(static_dir)
+    url = f"/static/dist/{manifest['css/tabulator-custom.css']}"
+    built = (static_dir / "dist" / manifest["css/tabulator-custom.css"]).read_bytes()
+
+    with app.test_client() as client:
+        response = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+        assert response.headers["Content-Encoding"] == "br"
+        assert response.mimetype == "text/css"
+        assert "immutable" in response.headers["Cache-Control"]
+        assert response.cache_control.max_age == 3600
+        assert brotli.decompress(response.get_data()) == built
+        response.close()
+
+        response = client.get(url)
+        assert "Content-Encoding" not in response.headers
+        assert response.get_data() == built
+        response.close()
+
+        # Unhashed files are still served, without long caching
+        response = client.get("/static/css/tabulator-custom.css")
+        assert response.status_code == 200
+        assert "immutable" not in response.headers.get("Cache-Control", "")
+        response.close()
+
+
+def test_without_manifest(static_dir):
+    app = make_app(static_dir)
+    with app.test_request_context():
+        assert url_for("static", filename="js/theme.js") == "/static/js/theme.js"
+
+
+def test_vendor_keeps_downloaded_files(static_dir):
+    for name in assets.VENDORED:
+        (static_dir / name).parent.mkdir(parents=True, exist_ok=True)
+        (static_dir / name).write_text("/* vendored */")
+
+    assert assets.vendor(static_dir) == []
+
+
+def test_missing_vendored_files_redirect(static_dir):
+    app = make_app(static_dir)
+    name = "vendor/tabulator/tabulator.min.js"
+
+    with app.test_client() as client:
+        response = client.get(f"/static/{name}")
+        assert response.status_code == 302
+        assert response.location == assets.VENDORED[name]
+
+        (static_dir / name).parent.mkdir(parents=True)
+        (static_dir / name).write_text("/* vendored */")
+        response = client.get(f"/static/{name}")
+        assert response.status_code == 200
+        response.close()
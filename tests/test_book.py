@@ -1,4 +1,5 @@
 import json
+
 from my_web.db.models import Book
 
 
@@ -193,3 +194,176 @@ def test_api_add_author_not_found(client, auth):
     # Non-existent book
     resp = client.put("/api/v1/book/99999/authors/1")
     assert resp.status_code == 404
+
+
+def test_api_list_query_count_independent_of_page_size(client, query_budget):
+    """Authors are eager loaded, so a bigger page must not issue more queries."""
+    # version (ETag) + books with their authors + table size + count
+    with query_budget(4) as small:
+        assert client.get("/api/v1/book/list?size=1").status_code == 200
+    with query_budget(4) as large:
+        assert client.get("/api/v1/book/list?size=50").status_code == 200
+
+    assert small.queries == large.queries
+
+
+def test_api_list_sort_author_query_count(client, query_budget):
+    sort_data = json.dumps([{"field": "authors", "dir": "asc"}])
+
+    with query_budget(4) as small:
+        client.get(f"/api/v1/book/list?size=1&sort={sort_data}")
+    with query_budget(4) as large:
+        client.get(f"/api/v1/book/list?size=50&sort={sort_data}")
+
+    assert small.queries == large.queries
+
+
+def test_api_detail_query_count(client, query_budget):
+    """Detail loads the book and its authors in a fixed number of queries."""
+    url = f"/api/v1/book/{Book.query.filter_by(title='Good Omens').first().id}"
+
+    # version (ETag) + book + associations + authors
+    with query_budget(4):
+        assert client.get(url).status_code == 200
+
+
+def walk_cursor(client, query=""):
+    """Follows `next_cursor` from the first page to the last one."""
+    books, cursor, pages = [], "", 0
+    while cursor is not None:
+        response = client.get(f"/api/v1/book/list?size=2&cursor={cursor}{query}")
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data["last_page"] is None
+        books.extend(data["data"])
+        cursor = data["next_cursor"]
+        pages += 1
+    return books, pages
+
+
+def test_api_list_cursor_default_sort(client):
+    books, pages = walk_cursor(client)
+    titles = [b["title"] for b in books]
+
+    assert pages == 4  # 7 books / 2 per page
+    assert titles == sorted(titles)
+    assert len(titles) == 7
+
+
+def test_api_list_cursor_all_sorts(client):
+    for field in ["id", "title", "isbn"]:
+        for direction in ["asc", "desc"]:
+            sort_data = json.dumps([{"field": field, "dir": direction}])
+            books, _ = walk_cursor(client, f"&sort={sort_data}")
+
+            # NULLs (an ISBN) sort first, ties are broken by id
+            expected = sorted(
+                books,
+                key=lambda b: (b[field] is not None, b[field] or "", b["id"]),
+                reverse=direction == "desc",
+            )
+            assert len({b["id"] for b in books}) == 7, (field, direction)
+            assert books == expected, (field, direction)
+
+
+def test_api_list_cursor_refuses_authors_sort(client):
+    sort_data = json.dumps([{"field": "authors", "dir": "asc"}])
+    response = client.get(f"/api/v1/book/list?cursor=&sort={sort_data}")
+    assert response.status_code == 400
+    assert "authors" in response.get_json()["error"]
+
+
+def test_api_list_cursor_matches_offset_order(client):
+    sort_data = json.dumps([{"field": "title", "dir": "desc"}])
+    offset = client.get(f"/api/v1/book/list?size=50&sort={sort_data}").get_json()
+    books, _ = walk_cursor(client, f"&sort={sort_data}")
+
+    assert [b["id"] for b in books] == [b["id"] for b in offset["data"]]
+
+
+def test_api_list_cursor_with_filter(client):
+    filter_data = json.dumps([{"field": "authors", "value": "Tolkien"}])
+    books, _ = walk_cursor(client, f"&filter={filter_data}")
+
+    assert len(books) == 3
+
+
+def test_api_list_invalid_cursor(client):
+    response = client.get("/api/v1/book/list?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert "cursor" in response.get_json()["error"]
+
+
+def test_book_list_paginated(client):
+    first = client.get("/book/list?size=2").get_data(as_text=True)
+    second = client.get("/book/list?size=2&page=2").get_data(as_text=True)
+
+    assert first.count('href="/book/') - first.count('href="/book/list') == 2
+    assert "page=2" in first
+    assert "Page 2 of" in second
+    titles = sorted(b.title for b in Book.query.all())
+    assert titles[0] in first and titles[0] not in second
+    assert titles[2] in second
+
+
+def test_book_list_sort_desc(client):
+    data = client.get("/book/list?size=1&sort=title&dir=desc").get_data(as_text=True)
+    assert max(b.title for b in Book.query.all()) in data
+
+
+def test_book_list_page_size_ceiling(app, client):
+    app.config["MAX_PAGE_SIZE"] = 2
+    data = client.get("/book/list?size=1000").get_data(as_text=True)
+    assert data.count('href="/book/') - data.count('href="/book/list') == 2
+
+
+def test_book_list_query_count_independent_of_page_size(client, query_budget):
+    with query_budget(5) as small:
+        assert client.get("/book/list?size=1").status_code == 200
+    with query_budget(5) as large:
+        assert client.get("/book/list?size=50").status_code == 200
+
+    assert small.queries == large.queries
+
+
+def test_api_bulk_create(client, auth):
+    auth.register("Editor", "editor@example.com", "password")
+    auth.login("editor@example.com", "password")
+    existing = Book.query.filter_by(title="1984").first()
+
+    items = [
+        {"title": "Bulk One", "isbn": "bulk-001"},
+        {"title": ""},
+        {"title": "Bulk Two", "isbn": existing.isbn},
+        {"title": "Bulk Three"},
+    ]
+    response = client.post("/api/v1/book/bulk", json={"mode": "create", "items": items})
+    assert response.status_code == 200
+    data = response.get_json()
+
+    assert [c["index"] for c in data["created"]] == [0, 3]
+    assert [e["index"] for e in data["errors"]] == [1, 2]
+    assert data["errors"][0]["details"][0]["loc"] == ["title"]
+
+    for created in data["created"]:
+        book = client.get(f"/api/v1/book/{created['id']}").get_json()
+        assert book["title"] == items[created["index"]]["title"]
+
+
+def test_api_bulk_update(client, auth):
+    auth.register("Editor", "editor@example.com", "password")
+    auth.login("editor@example.com", "password")
+    book = Book.query.filter_by(title="1984").first()
+
+    response = client.post(
+        "/api/v1/book/bulk",
+        json={"mode": "update", "items": [{"id": book.id, "isbn": "bulk-002"}]},
+    )
+    assert response.get_json()["updated"] == [{"index": 0, "id": book.id}]
+    assert client.get(f"/api/v1/book/{book.id}").get_json()["isbn"] == "bulk-002"
+
+
+def test_api_bulk_requires_login(client):
+    response = client.post("/api/v1/book/bulk", json={"mode": "create", "items": []})
+    # Redirected to the login page
+    assert response.status_code == 302
@@ -0,0 +1,135 @@
+import pytest
+
+from my_web.app import create_app
+from my_web.db.aio import adb, async_uri, loop_thread
+from my_web.db.fixtures import initial_library_data
+from my_web.extensions import db
+from my_web.services.book import book_service
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def async_app(tmp_path):
+    app = create_app(
+        test_config={
+            "TESTING": True,
+            "WTF_CSRF_ENABLED": False,
+            "BCRYPT_LOG_ROUNDS": 4,
+            # In-memory databases are not shared by the sync and async engines
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+            "ASYNC_API": True,
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        initial_library_data(app)
+    yield app
+    adb.dispose(app)
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def async_client(async_app):
+    return async_app.test_client()
+
+
+def run(app, coro_fn):
+    """Runs `coro_fn()` on the loop of the async views, in an app context."""
+    with app.app_context():
+        return loop_thread.run(coro_fn())
+
+
+def test_async_uri():
+    assert async_uri("sqlite:///books.db") == "sqlite+aiosqlite:///books.db"
+    assert (
+        async_uri("postgresql://u:p@host/books")
+        == "postgresql+asyncpg://u:p@host/books"
+    )
+    # An explicit driver is kept
+    assert async_uri("sqlite+aiosqlite:///b.db") == "sqlite+aiosqlite:///b.db"
+
+
+def test_disabled_by_default(client):
+    assert client.get("/api/v1/async/book/list").status_code == 404
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "size=3",
+        "size=3&page=2",
+        "size=3&cursor=",
+        "size=5&sort=" + '[{"field":"authors","dir":"desc"}]',
+        "q=orwell",
+    ],
+)
+def test_list_same_as_sync(async_client, query):
+    response = async_client.get(f"/api/v1/async/book/list?{query}")
+    assert response.status_code == 200
+    assert (
+        response.get_json() == async_client.get(f"/api/v1/book/list?{query}").get_json()
+    )
+
+
+def test_detail(async_client):
+    response = async_client.get("/api/v1/async/book/1")
+    assert response.get_json() == async_client.get("/api/v1/book/1").get_json()
+    assert async_client.get("/api/v1/async/book/999").status_code == 404
+
+
+def test_writes(async_client):
+    # Redirected to the login page
+    response = async_client.post("/api/v1/async/book/", json={"title": "X"})
+    assert response.status_code == 302
+    async_client.post(
+        "/auth/login", data={"email": "admin@example.com", "password": "password"}
+    )
+    last_page = async_client.get("/api/v1/async/book/list?size=1").json["last_page"]
+
+    response = async_client.post("/api/v1/async/book/", json={"title": "Async"})
+    assert response.status_code == 201
+    book = response.get_json()
+    assert book["title"] == "Async" and book["authors"] == []
+    # The commit dropped the cached count
+    listed = async_client.get("/api/v1/async/book/list?size=1").json
+    assert listed["last_page"] == last_page + 1
+
+    response = async_client.patch(
+        f"/api/v1/async/book/{book['id']}", json={"title": "Renamed"}
+    )
+    assert response.get_json()["title"] == "Renamed"
+    assert async_client.get(f"/api/v1/book/{book['id']}").json["title"] == "Renamed"
+    assert async_client.patch("/api/v1/async/book/999", json={}).status_code == 404
+
+
+def test_duplicate_isbn(async_client):
+    async_client.post(
+        "/auth/login", data={"email": "admin@example.com", "password": "password"}
+    )
+    isbn = async_client.get("/api/v1/book/1").json["isbn"]
+    response = async_client.post(
+        "/api/v1/async/book/", json={"title": "Copy", "isbn": isbn}
+    )
+    assert response.status_code == 409
+
+
+def test_crud_service(async_app):
+    async def scenario():
+        book, created = await book_service.aupsert(None, {"title": "Upserted"})
+        assert created
+        same, created = await book_service.aupsert(book.id, {"title": "Again"})
+        assert same is book and not created and book.title == "Again"
+
+        page = await book_service.aget_paginated(
+            per_page=2, sort_field="title", filter_value="again"
+        )
+        assert [b.id for b in page["data"]] == [book.id]
+
+        total = len(await book_service.aget_all())
+        assert await book_service.adelete(book.id)
+        assert not await book_service.adelete(book.id)
+        return total - len(await book_service.aget_all())
+
+    assert run(async_app, scenario) == 1
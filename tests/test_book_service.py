@@ -1,7 +1,10 @@
 import pytest
 from my_web.db.models import Book
+from my_web.errors import InvalidRequest
+from my_web.extensions import db
 from my_web.services.book import book_service
-from my_web.schemas.book import BookCreateSchema
+from my_web.services.pagination import encode_cursor, keyset_page
+from my_web.schemas.book import BookCreateSchema, BookSchema
 
 
 @pytest.mark.usefixtures("app")
@@ -105,3 +108,148 @@ class TestBookService:
         titles = [b.title for b in result["data"]]
         # Just check that the first item is alphabetically "larger" than the last
         assert titles[0] > titles[-1]
+
+    def test_10_get_paginated_cursor(self):
+        """Tests keyset pagination over all books."""
+        first = book_service.get_paginated(
+            per_page=4, sort_field="title", sort_dir="desc", cursor=""
+        )
+        second = book_service.get_paginated(
+            per_page=4, sort_field="title", sort_dir="desc", cursor=first["next_cursor"]
+        )
+
+        titles = [b.title for b in first["data"] + second["data"]]
+        assert len(titles) == 7
+        assert titles == sorted(titles, reverse=True)
+        assert second["next_cursor"] is None
+
+    def test_11_bulk_create_reports_conflicts(self):
+        """Tests that conflicting rows are reported and the others written."""
+        existing = Book.query.filter_by(title="1984").first()
+        rows = [
+            # Written after the rows with an ISBN (batched by key set)
+            {"title": "Bulk D"},
+            {"title": "Bulk A", "isbn": "bulk-1"},
+            {"title": "Bulk B", "isbn": existing.isbn},
+            {"title": "Bulk C", "isbn": "bulk-1"},
+        ]
+
+        result = book_service.bulk_create(rows, chunk_size=3)
+
+        assert sorted(result.errors) == [2, 3]
+        assert list(result.created) == [0, 1]
+        for index, book_id in result.created.items():
+            assert book_service.get(book_id).title == rows[index]["title"]
+
+    def test_12_bulk_update_and_upsert(self):
+        """Tests updating by primary key, missing ids are reported."""
+        book = Book.query.filter_by(title="1984").first()
+
+        result = book_service.bulk_update(
+            [{"id": book.id, "title": "Nineteen"}, {"id": 9999, "title": "Missing"}]
+        )
+        assert result.updated == {0: book.id}
+        assert list(result.errors) == [1]
+        assert book_service.get(book.id).title == "Nineteen"
+
+        result = book_service.bulk_upsert(
+            [{"title": "Upserted"}, {"id": book.id, "title": "1984"}]
+        )
+        assert result.updated == {1: book.id}
+        assert book_service.get(result.created[0]).title == "Upserted"
+        assert book_service.get(book.id).title == "1984"
+
+    def test_13_get_books_projection(self, monkeypatch):
+        """Tests that projected rows match the serialized ORM books."""
+        author_sort = '[{"field": "authors", "dir": "desc"}]'
+        for args in [
+            {},
+            {"sort_param": author_sort},
+            {"sort_param": '[{"field": "isbn", "dir": "desc"}]', "cursor": ""},
+            {"filter_param": '[{"field": "authors", "value": "a"}]'},
+        ]:
+            books = book_service.get_books(page=1, per_page=5, **args)
+            rows = book_service.get_books(page=1, per_page=5, projection=True, **args)
+
+            expected = [
+                BookSchema.model_validate(b).model_dump() for b in books["data"]
+            ]
+            assert rows["data"] == expected
+            assert (
+                rows["next_cursor" if "cursor" in args else "last_page"]
+                == (books["next_cursor" if "cursor" in args else "last_page"])
+            )
+        assert any(len(row["authors"]) > 1 for row in rows["data"])
+
+        # Databases without JSON aggregates load authors with another query
+        monkeypatch.setattr(book_service, "_authors_json", lambda: None)
+        fallback = book_service.get_books(page=1, per_page=5, projection=True)
+        books = book_service.get_books(page=1, per_page=5)
+        assert fallback["data"] == [
+            BookSchema.model_validate(b).model_dump() for b in books["data"]
+        ]
+
+    def test_14_bulk_create_batches_inserts(self, query_budget):
+        """Tests one INSERT per chunk and key set, ids mapped to the rows."""
+        rows = [{"title": f"Batched {i % 7}"} for i in range(25)]
+        rows += [{"title": f"Batched {i}", "isbn": f"batched-{i}"} for i in range(5)]
+
+        # 3 chunks of titles and 1 of titles with an ISBN, each one SAVEPOINT,
+        # INSERT, search index DELETE + INSERT and RELEASE
+        with query_budget(20) as stats:
+            result = book_service.bulk_create(rows, chunk_size=10)
+        inserts = [s for s in stats.statements if s.startswith("INSERT INTO books")]
+        assert len(inserts) == 4
+
+        assert list(result.created) == list(range(30))
+        for index, book_id in result.created.items():
+            book = book_service.get(book_id)
+            assert (book.title, book.isbn) == (
+                rows[index]["title"],
+                rows[index].get("isbn"),
+            )
+
+    def test_15_cursor_pages_seek(self):
+        """Tests that a deep cursor page seeks the sort index, not scans."""
+        book = Book.query.filter_by(title="1984").first()
+        for field, direction in [
+            ("id", "desc"),
+            ("title", "asc"),
+            ("title", "desc"),
+            ("isbn", "asc"),
+            # NULLs follow the cursor, sought separately
+            ("isbn", "desc"),
+        ]:
+            keys = book_service._keyset_keys([(getattr(Book, field), direction)])
+            cursor = encode_cursor([getattr(book, key.key) for key, _ in keys])
+            plan = query_plan(keyset_page(db.select(Book), keys, cursor, 10))
+
+            assert any(line.startswith("SEARCH books") for line in plan), plan
+            assert not any(line.startswith("SCAN books") for line in plan), plan
+
+    def test_16_get_paginated_cursor_datetime(self):
+        """Tests walking a cursor over a datetime sort key."""
+        books, cursor = [], ""
+        while cursor is not None:
+            page = book_service.get_paginated(
+                per_page=2, sort_field="created_at", sort_dir="desc", cursor=cursor
+            )
+            books.extend(page["data"])
+            cursor = page["next_cursor"]
+
+        assert len({b.id for b in books}) == len(books) == Book.query.count()
+        keys = [(b.created_at, b.id) for b in books]
+        assert keys == sorted(keys, reverse=True)
+
+        with pytest.raises(InvalidRequest):
+            book_service.get_paginated(sort_field="author_associations", cursor="")
+
+
+def query_plan(stmt) -> list[str]:
+    """`EXPLAIN QUERY PLAN` details of `stmt` (SQLite)."""
+    compiled = stmt.compile(db.engine)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(compiled), params
+    )
+    return [row[3] for row in rows]
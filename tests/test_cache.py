@@ -0,0 +1,155 @@
+import json
+
+import pytest
+from sqlalchemy import event, text
+
+from my_web.cache import CacheEntry, MemoryBackend, response_cache
+from my_web.db.models import Author, Book
+from my_web.extensions import db
+from my_web.services.author import author_service
+from my_web.services.book import book_service
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cached_client(app, client, tmp_path, request):
+    app.config["RESPONSE_CACHE_BACKEND"] = request.param
+    app.config["RESPONSE_CACHE_PATH"] = str(tmp_path / "cache.db")
+    response_cache.init_app(app)
+    yield client
+    response_cache.wait()
+
+
+def get(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    return response.headers["X-Cache"], response.get_json()
+
+
+def book_id(title):
+    return Book.query.filter_by(title=title).first().id
+
+
+def test_list_hit_runs_no_sql(cached_client):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    assert get(cached_client, "/api/v1/book/list?size=2")[0] == "MISS"
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    status, data = get(cached_client, "/api/v1/book/list?size=2")
+    event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    assert status == "HIT"
+    assert len(data["data"]) == 2
+    assert statements == []
+
+
+def test_key_is_normalized(cached_client):
+    sort_a = json.dumps([{"field": "title", "dir": "desc"}])
+    sort_b = json.dumps([{"dir": "desc", "field": "title"}], indent=1)
+
+    assert get(cached_client, f"/api/v1/book/list?sort={sort_a}&size=3")[0] == "MISS"
+    assert get(cached_client, f"/api/v1/book/list?size=3&sort={sort_b}")[0] == "HIT"
+    assert get(cached_client, f"/api/v1/book/list?size=4&sort={sort_b}")[0] == "MISS"
+
+
+def test_update_invalidates_book_and_lists(cached_client):
+    hobbit, dune = book_id("The Hobbit"), book_id("1984")
+    for url in ["/api/v1/book/list", f"/api/v1/book/{hobbit}", f"/api/v1/book/{dune}"]:
+        get(cached_client, url)
+
+    book_service.update(hobbit, {"title": "There and Back Again"})
+
+    status, data = get(cached_client, f"/api/v1/book/{hobbit}")
+    assert status == "MISS"
+    assert data["title"] == "There and Back Again"
+    assert get(cached_client, "/api/v1/book/list")[0] == "MISS"
+    assert get(cached_client, f"/api/v1/book/{dune}")[0] == "HIT"
+
+
+def test_author_links_invalidate_book(cached_client):
+    hobbit = book_id("The Hobbit")
+    orwell = Author.query.filter_by(name="George Orwell").first().id
+    get(cached_client, f"/api/v1/book/{hobbit}")
+
+    book_service.add_author(hobbit, orwell)
+    status, data = get(cached_client, f"/api/v1/book/{hobbit}")
+    assert status == "MISS"
+    assert len(data["authors"]) == 2
+
+    book_service.remove_author(hobbit, orwell)
+    status, data = get(cached_client, f"/api/v1/book/{hobbit}")
+    assert status == "MISS"
+    assert len(data["authors"]) == 1
+
+
+def test_author_rename_invalidates_only_their_books(cached_client):
+    nineteen, hobbit = book_id("1984"), book_id("The Hobbit")
+    get(cached_client, f"/api/v1/book/{nineteen}")
+    get(cached_client, f"/api/v1/book/{hobbit}")
+
+    orwell = Author.query.filter_by(name="George Orwell").first()
+    author_service.update(orwell.id, {"name": "Eric Blair"})
+
+    status, data = get(cached_client, f"/api/v1/book/{nineteen}")
+    assert status == "MISS"
+    assert data["authors"][0]["name"] == "Eric Blair"
+    assert get(cached_client, f"/api/v1/book/{hobbit}")[0] == "HIT"
+
+
+def test_delete_invalidates_book(cached_client):
+    book = book_service.create({"title": "Short lived"})
+    get(cached_client, f"/api/v1/book/{book.id}")
+
+    book_service.delete(book.id)
+
+    assert cached_client.get(f"/api/v1/book/{book.id}").status_code == 404
+
+
+def test_errors_are_not_cached(cached_client):
+    cached_client.get("/api/v1/book/999999")
+    response = cached_client.get("/api/v1/book/999999")
+    assert response.status_code == 404
+    assert response.headers["X-Cache"] == "MISS"
+
+
+def test_stale_while_revalidate(cached_client, app):
+    app.config["RESPONSE_CACHE_TTL"] = 0
+    app.config["RESPONSE_CACHE_STALE_TTL"] = 60
+    hobbit = book_id("The Hobbit")
+    get(cached_client, f"/api/v1/book/{hobbit}")
+
+    # Raw SQL bypasses invalidation, only the refresh can pick it up
+    db.session.execute(
+        text("UPDATE books SET title = 'Refreshed' WHERE id = :id"), {"id": hobbit}
+    )
+    db.session.commit()
+
+    status, data = get(cached_client, f"/api/v1/book/{hobbit}")
+    assert status == "STALE"
+    assert data["title"] == "The Hobbit"
+
+    response_cache.wait()
+    status, data = get(cached_client, f"/api/v1/book/{hobbit}")
+    assert status == "STALE"
+    assert data["title"] == "Refreshed"
+
+
+def test_disabled_by_default(client):
+    response = client.get("/api/v1/book/list")
+    assert response.status_code == 200
+    assert "X-Cache" not in response.headers
+
+
+def test_memory_backend_lru():
+    backend = MemoryBackend(maxsize=2)
+    for key in ["a", "b", "c"]:
+        entry = CacheEntry(b"", 200, [], float("inf"), float("inf"))
+        backend.set(key, entry, [key])
+
+    assert backend.get("a") is None
+    assert backend.get("c") is not None
+    # Evicted entries leave the tag index
+    assert set(backend._keys_by_tag) == {"b", "c"}
@@ -1,4 +1,8 @@
-from my_web.app import app_help
+import os
+import subprocess
+import sys
+
+from my_web.cli import app_help
 
 
 def test_help(capsys):
@@ -6,3 +10,36 @@ def test_help(capsys):
     captured = capsys.readouterr()
     for word in ["Usage:", "uv run web", "uv run shell", "uv run help"]:
         assert word in captured.out
+
+
+# Loaded only by the commands that use them, never by `import my_web.app`
+LAZY_MODULES = {"alembic", "flask_migrate", "IPython", "my_web.db.fixtures"}
+
+
+def import_profile(module: str) -> dict[str, int]:
+    """Cumulative import time in microseconds of every module `module` loads."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.removeprefix("import time:").split("|")
+            if cumulative.strip().isdigit():
+                profile[name.strip()] = int(cumulative)
+    return profile
+
+
+def test_cli_imports_nothing_heavy():
+    profile = import_profile("my_web.cli")
+    assert {"flask", "sqlalchemy", "my_web.app"}.isdisjoint(profile)
+
+
+def test_app_imports_no_lazy_modules():
+    profile = import_profile("my_web.app")
+    assert LAZY_MODULES.isdisjoint(profile)
@@ -0,0 +1,74 @@
+import gzip
+import json
+
+import brotli
+import pytest
+import zstandard
+
+
+def test_gzip_json(client):
+    response = client.get(
+        "/api/v1/book/list?size=50", headers={"Accept-Encoding": "gzip"}
+    )
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    data = json.loads(gzip.decompress(response.data))
+    assert data["data"]
+
+
+@pytest.mark.parametrize(
+    "accept, encoding",
+    [
+        ("gzip, deflate, br, zstd", "zstd"),
+        ("gzip, br", "br"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("deflate", None),
+        ("gzip;q=0", None),
+    ],
+)
+def test_negotiation(client, accept, encoding):
+    response = client.get("/book/list", headers={"Accept-Encoding": accept})
+    assert response.headers.get("Content-Encoding") == encoding
+
+    decompress = {
+        "zstd": zstandard.ZstdDecompressor().decompressobj().decompress,
+        "br": brotli.decompress,
+        "gzip": gzip.decompress,
+        None: bytes,
+    }[encoding]
+    assert b"</html>" in decompress(response.data)
+
+
+def test_below_min_size(app, client):
+    app.config["COMPRESS_MIN_SIZE"] = 1_000_000
+    response = client.get("/book/list", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_streamed_export(client):
+    plain = client.get("/api/v1/book/export")
+    response = client.get("/api/v1/book/export", headers={"Accept-Encoding": "gzip"})
+
+    assert response.is_streamed
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_compressed_stream_flushes_every_chunk(app):
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        response = app.response_class(iter(["first line\n", "second line\n"]))
+        response = app.process_response(response)
+        stream = iter(response.response)
+        decompressor = gzip.zlib.decompressobj(31)
+
+        assert decompressor.decompress(next(stream)) == b"first line\n"
+        assert decompressor.decompress(next(stream)) == b"second line\n"
+
+
+def test_no_algorithms(client, app):
+    app.config["COMPRESS_ALGORITHMS"] = []
+    response = client.get("/book/list", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
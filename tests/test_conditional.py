@@ -0,0 +1,97 @@
+from sqlalchemy import event
+
+from my_web.db.models import Book
+from my_web.extensions import db
+from my_web.services.author import author_service
+from my_web.services.book import book_service
+
+
+def book_id(title):
+    return Book.query.filter_by(title=title).first().id
+
+
+def etag(client, url):
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('W/"')
+    return response.headers["ETag"]
+
+
+def test_detail_not_modified(client):
+    url = f"/api/v1/book/{book_id('Good Omens')}"
+    response = client.get(url)
+
+    again = client.get(url, headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == response.headers["ETag"]
+
+    since = client.get(
+        url, headers={"If-Modified-Since": response.headers["Last-Modified"]}
+    )
+    assert since.status_code == 304
+
+
+def test_not_modified_loads_no_entities(client):
+    url = f"/api/v1/book/{book_id('Good Omens')}"
+    tag = etag(client, url)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    response = client.get(url, headers={"If-None-Match": tag})
+    event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == 304
+    assert len(statements) == 1
+
+
+def test_detail_etag_changes_on_writes(client):
+    id = book_id("Good Omens")
+    url = f"/api/v1/book/{id}"
+    seen = {etag(client, url)}
+
+    book_service.update(id, {"title": "Good Omens (2nd ed.)"})
+    seen.add(etag(client, url))
+
+    author = author_service.create({"name": "Neil Gaiman Jr."})
+    book_service.add_author(id, author.id)
+    seen.add(etag(client, url))
+
+    author_service.update(author.id, {"name": "N. Gaiman Jr."})
+    seen.add(etag(client, url))
+
+    book_service.remove_author(id, author.id)
+    seen.add(etag(client, url))
+
+    assert len(seen) == 5
+
+
+def test_list_not_modified_until_page_changes(client):
+    url = "/api/v1/book/list?size=2"
+    tag = etag(client, url)
+    assert client.get(url, headers={"If-None-Match": tag}).status_code == 304
+
+    first = client.get(url).get_json()["data"][0]
+    book_service.update(first["id"], {"isbn": "978-0-00-000000-0"})
+
+    assert client.get(url, headers={"If-None-Match": tag}).status_code == 200
+
+
+def test_missing_book_has_no_etag(client):
+    response = client.get("/api/v1/book/99999")
+    assert response.status_code == 404
+    assert "ETag" not in response.headers
+
+
+def test_detail_page_not_modified(client, auth):
+    url = f"/book/{book_id('Good Omens')}"
+    etag(client, url)  # the first visit creates the session (CSRF token)
+    tag = etag(client, url)
+    assert client.get(url, headers={"If-None-Match": tag}).status_code == 304
+
+    auth.register("Reader", "reader@example.com", "password")
+    auth.login("reader@example.com", "password")
+    assert client.get(url, headers={"If-None-Match": tag}).status_code == 200
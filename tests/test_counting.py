@@ -0,0 +1,137 @@
+import json
+
+import pytest
+from sqlalchemy import event
+
+from my_web.db.models import Book
+from my_web.extensions import db
+from my_web.services.author import author_service
+from my_web.services.book import book_service
+from my_web.services.counting import CountMode, count_cache, count_rows
+
+
+@pytest.fixture
+def count_statements(app):
+    """Collects row count statements sent to the database."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if "count(*)" in statement.lower():
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_count_none_skips_counting(client, count_statements):
+    response = client.get("/api/v1/book/list?size=2&count=none")
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert data["last_page"] is None
+    assert len(data["data"]) == 2
+    assert count_statements == []
+
+
+def test_count_invalid_mode(client):
+    response = client.get("/api/v1/book/list?count=maybe")
+    assert response.status_code == 400
+
+
+def test_count_is_cached(app, count_statements):
+    book_service.get_books(page=1, per_page=2)
+    book_service.get_books(page=2, per_page=2)
+    result = book_service.get_books(page=3, per_page=2)
+
+    assert len(count_statements) == 1
+    assert result["last_page"] == 4
+
+
+def test_count_cache_per_filter(app, count_statements):
+    tolkien = json.dumps([{"field": "authors", "value": "Tolkien"}])
+    orwell = json.dumps([{"field": "authors", "value": "Orwell"}])
+
+    assert book_service.get_books(1, 1, filter_param=tolkien)["last_page"] == 3
+    assert book_service.get_books(1, 1, filter_param=orwell)["last_page"] == 1
+    assert book_service.get_books(1, 1, filter_param=tolkien)["last_page"] == 3
+    assert len(count_statements) == 2
+
+
+def test_count_cache_invalidated_on_write(app):
+    assert book_service.get_books(page=1, per_page=1)["last_page"] == 7
+
+    book_service.create({"title": "Invalidation"})
+
+    assert book_service.get_books(page=1, per_page=1)["last_page"] == 8
+
+
+def test_count_cache_invalidated_on_author_rename(app):
+    filter_data = json.dumps([{"field": "authors", "value": "Orwell"}])
+    assert book_service.get_books(1, 1, filter_param=filter_data)["last_page"] == 1
+    orwell = author_service.get_paginated(filter_value="Orwell")["data"][0]
+    author_service.update(orwell.id, {"name": "Eric Blair"})
+
+    assert book_service.get_books(1, 1, filter_param=filter_data)["last_page"] == 0
+
+
+def test_count_estimated_above_threshold(app):
+    app.config["COUNT_ESTIMATE_THRESHOLD"] = 3
+
+    result = book_service.get_books(page=1, per_page=2)
+
+    assert result["last_page_estimated"] is True
+    # Extrapolated from the first 3 books, not capped at the threshold
+    assert result["last_page"] == 4
+
+
+def test_count_estimate_of_filtered_rows(client, app):
+    book_service.bulk_create(
+        [{"title": f"{'Even' if i % 2 == 0 else 'Odd'} {i}"} for i in range(200)]
+    )
+    app.config["COUNT_ESTIMATE_THRESHOLD"] = 20
+    filter_data = json.dumps([{"field": "title", "value": "Even"}])
+
+    data = client.get(f"/api/v1/book/list?size=10&filter={filter_data}").get_json()
+
+    # 100 matching books
+    assert data["last_page_estimated"] is True
+    assert 8 <= data["last_page"] <= 12
+
+
+def test_count_exact_below_limit(app):
+    app.config["COUNT_ESTIMATE_THRESHOLD"] = 3
+    filter_data = json.dumps([{"field": "authors", "value": "Orwell"}])
+
+    result = book_service.get_books(page=1, per_page=1, filter_param=filter_data)
+
+    # Fewer matching rows than the threshold: counted
+    assert result["last_page_estimated"] is False
+    assert result["last_page"] == 1
+
+
+def test_book_list_pages_past_threshold(client, app):
+    app.config["COUNT_ESTIMATE_THRESHOLD"] = 3
+
+    response = client.get("/book/list?size=2&page=3")
+
+    assert "Page 3 of about 4" in response.text
+    assert '<li class="page-item disabled">' not in response.text
+
+
+def test_count_exact_mode_ignores_threshold(app):
+    app.config["COUNT_ESTIMATE_THRESHOLD"] = 3
+    count_cache.clear()
+
+    count = count_rows(db.select(Book), CountMode.EXACT)
+
+    assert count.total == 7
+    assert count.estimated is False
+
+
+def test_api_list_reports_estimate(client, app):
+    app.config["COUNT_ESTIMATE_THRESHOLD"] = 3
+
+    data = client.get("/api/v1/book/list?size=2").get_json()
+
+    assert data["last_page_estimated"] is True
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+
+from sqlalchemy import event
+
+from my_web.db.models import Book
+from my_web.extensions import db
+
+
+def test_export_ndjson(client):
+    response = client.get("/api/v1/book/export")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert "books.ndjson" in response.headers["Content-Disposition"]
+
+    books = [json.loads(line) for line in response.text.splitlines()]
+    assert len(books) == Book.query.count()
+    assert [b["id"] for b in books] == sorted(b["id"] for b in books)
+
+    good_omens = next(b for b in books if b["title"] == "Good Omens")
+    detail = client.get(f"/api/v1/book/{good_omens['id']}").get_json()
+    # Same authors in the same order as the API
+    assert [a["name"] for a in good_omens["authors"]] == [
+        a["name"] for a in detail["authors"]
+    ]
+    assert set(good_omens) == set(detail)
+
+
+def test_export_csv(client):
+    response = client.get("/api/v1/book/export?format=csv")
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == Book.query.count()
+    good_omens = next(r for r in rows if r["title"] == "Good Omens")
+    assert "Terry Pratchett" in good_omens["authors"].split("; ")
+
+
+def test_export_queries_per_chunk(app, client):
+    """Two queries per chunk of books, independent of the number of books."""
+    app.config["EXPORT_CHUNK_SIZE"] = 2
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    response = client.get("/api/v1/book/export")
+    lines = response.text.splitlines()
+    event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+    chunks = -(-len(lines) // 2)
+    assert len(statements) == 1 + chunks
+
+
+def test_export_unknown_format(client):
+    response = client.get("/api/v1/book/export?format=xml")
+    assert response.status_code == 400
@@ -0,0 +1,97 @@
+import pytest
+from flask import g
+from sqlalchemy import event
+
+from my_web.db.models import Role, User
+from my_web.extensions import db
+from my_web.identity import CLAIMS_KEY, user_cache
+
+
+def new_request() -> None:
+    """
+    The test's app context (`g` and the session) is shared by the requests:
+    forget the user loaded by the previous ones.
+    """
+    g.pop("_login_user", None)
+    db.session.expunge_all()
+
+
+@pytest.fixture
+def user_queries(app):
+    """SELECTs of the users table run so far."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "users" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_memory_cache(app, client, auth, user_queries):
+    auth.login("test@example.com", "password")
+    user_queries.clear()
+    new_request()
+
+    response = client.get("/user/profile")
+    assert "test@example.com" in response.get_data(as_text=True)
+    assert user_queries == []
+
+
+def test_role_change_invalidates(app, client, auth):
+    auth.login("test@example.com", "password")
+    assert "Role: user" in client.get("/user/profile").get_data(as_text=True)
+    new_request()
+
+    user = db.session.execute(db.select(User).filter_by(email="test@example.com"))
+    user.scalar_one().role = Role.ADMIN
+    db.session.commit()
+    new_request()
+
+    assert "Role: admin" in client.get("/user/profile").get_data(as_text=True)
+
+
+def test_no_cache(app, client, auth, user_queries):
+    app.config["USER_CACHE"] = "none"
+    auth.login("test@example.com", "password")
+    user_queries.clear()
+    new_request()
+
+    client.get("/user/profile")
+    assert len(user_queries) == 1
+
+
+def test_session_claims(app, client, auth, user_queries):
+    app.config["USER_CACHE"] = "session"
+    auth.login("test@example.com", "password")
+    user_cache.clear()
+    user_queries.clear()
+    new_request()
+
+    response = client.get("/user/profile")
+    assert "test@example.com" in response.get_data(as_text=True)
+    assert user_queries == []
+    with client.session_transaction() as session:
+        assert session[CLAIMS_KEY]["role"] == Role.USER.value
+
+
+def test_session_claims_expire(app, client, auth, user_queries):
+    app.config.update(USER_CACHE="session", USER_CACHE_TTL=-1)
+    auth.login("test@example.com", "password")
+    user_queries.clear()
+    new_request()
+
+    client.get("/user/profile")
+    assert len(user_queries) == 1
+
+
+def test_logout_drops_claims(app, client, auth):
+    app.config["USER_CACHE"] = "session"
+    auth.login("test@example.com", "password")
+    client.get("/user/profile")
+    auth.logout()
+
+    with client.session_transaction() as session:
+        assert CLAIMS_KEY not in session
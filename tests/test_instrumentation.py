@@ -0,0 +1,70 @@
+import re
+
+import pytest
+from loguru import logger
+
+from my_web.db.models import Book
+
+
+def timings(response):
+    """Server-Timing metrics as {name: (duration, description)}."""
+    metrics = {}
+    for metric in response.headers["Server-Timing"].split(", "):
+        name, *params = metric.split(";")
+        params = dict(p.split("=", 1) for p in params)
+        metrics[name] = (float(params["dur"]), params.get("desc"))
+    return metrics
+
+
+@pytest.fixture
+def timed_client(app, client):
+    app.config["SERVER_TIMING"] = True
+    return client
+
+
+def test_server_timing_api(timed_client):
+    response = timed_client.get("/api/v1/book/list?size=5")
+    metrics = timings(response)
+
+    assert set(metrics) == {"db", "serialize", "template", "total"}
+    queries = int(re.match(r'"(\d+) queries"', metrics["db"][1]).group(1))
+    assert queries >= 2
+    assert metrics["serialize"][0] > 0
+    assert metrics["template"][0] == 0
+    assert metrics["total"][0] >= metrics["db"][0]
+
+
+def test_server_timing_template(timed_client):
+    metrics = timings(timed_client.get("/book/list"))
+    assert metrics["template"][0] > 0
+
+
+def test_server_timing_disabled(client):
+    assert "Server-Timing" not in client.get("/api/v1/book/list").headers
+
+
+def test_request_log_line(app, client):
+    records = []
+    sink = logger.add(records.append, format="{message}")
+    try:
+        client.get("/api/v1/book/list?size=5")
+    finally:
+        logger.remove(sink)
+
+    extra = records[-1].record["extra"]
+    assert extra["path"] == "/api/v1/book/list"
+    assert extra["status"] == 200
+    assert extra["queries"] >= 2
+    assert {"db_ms", "serialize_ms", "template_ms", "duration_ms"} <= set(extra)
+
+
+def test_query_budget(client, query_budget):
+    url = f"/api/v1/book/{Book.query.filter_by(title='Good Omens').first().id}"
+
+    # version (ETag) + book + associations + authors
+    with query_budget(4):
+        client.get(url)
+
+    with pytest.raises(AssertionError, match="budget 1"):
+        with query_budget(1):
+            client.get(url)
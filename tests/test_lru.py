@@ -0,0 +1,37 @@
+from my_web.lru import LRUCache
+
+
+def test_least_recently_used_evicted():
+    evicted = []
+    cache = LRUCache(maxsize=2, on_evict=lambda k, v: evicted.append((k, v)))
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, 60)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert evicted == [("b", 2)]
+
+
+def test_expired_entries_dropped():
+    evicted = []
+    cache = LRUCache(on_evict=lambda k, v: evicted.append(k))
+    cache.set("a", 1, -1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert evicted == ["a"]
+
+
+def test_pop_where_and_disabled():
+    cache = LRUCache()
+    for key in range(4):
+        cache.set(key, key * 10, 60)
+    cache.pop_where(lambda k, v: v >= 20)
+    assert cache.pop(1) == 10
+    assert len(cache) == 1
+
+    disabled = LRUCache(maxsize=0)
+    disabled.set("a", 1, 60)
+    assert disabled.get("a") is None
@@ -0,0 +1,139 @@
+import json
+import re
+import subprocess
+
+import pytest
+
+from my_web.app import create_app
+from my_web.db.fixtures import initial_library_data
+from my_web.extensions import db
+from my_web.metrics import Registry, pool_gauges, registry
+
+
+@pytest.fixture
+def metrics_app(tmp_path):
+    def make(**config):
+        registry.clear()
+        app = create_app(
+            test_config={
+                "TESTING": True,
+                "WTF_CSRF_ENABLED": False,
+                # A file database: in-memory ones have no QueuePool to report
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'books.db'}",
+                "METRICS": True,
+                **config,
+            }
+        )
+        with app.app_context():
+            db.create_all()
+            initial_library_data(app)
+        apps.append(app)
+        return app
+
+    apps = []
+    yield make
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+
+
+def sample(text, name, **labels):
+    """Value of the sample `name` having (at least) `labels`."""
+    for line in text.splitlines():
+        match = re.fullmatch(r"(\w+)(?:\{(.*)\})? (\S+)", line)
+        if not match or match[1] != name:
+            continue
+        found = dict(re.findall(r'(\w+)="([^"]*)"', match[2] or ""))
+        if labels.items() <= found.items():
+            return float(match[3])
+    return None
+
+
+def test_metrics_disabled_by_default(client):
+    assert client.get("/metrics").status_code == 404
+
+
+def test_request_histogram(metrics_app):
+    client = metrics_app().test_client()
+    for _ in range(3):
+        client.get("/api/v1/book/list?size=5")
+    client.get("/api/v1/book/999999")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+
+    ok = {"endpoint": "api_book.api_list", "method": "GET", "status": "200"}
+    assert sample(text, "http_request_duration_seconds_count", **ok) == 3
+    assert sample(text, "http_request_duration_seconds_bucket", le="+Inf", **ok) == 3
+    assert sample(text, "http_request_duration_seconds_sum", **ok) > 0
+    not_found = {"endpoint": "api_book.api_detail", "status": "404"}
+    assert sample(text, "http_request_duration_seconds_count", **not_found) == 1
+    assert (
+        sample(text, "http_request_db_queries_total", endpoint="api_book.api_list") >= 6
+    )
+    assert sample(text, "db_pool_size") == 5
+    assert sample(text, "db_pool_checked_out") == 0
+
+
+def test_cache_lookups(metrics_app, tmp_path):
+    app = metrics_app(
+        RESPONSE_CACHE_BACKEND="sqlite",
+        RESPONSE_CACHE_PATH=str(tmp_path / "cache.db"),
+    )
+    client = app.test_client()
+    for _ in range(3):
+        client.get("/api/v1/book/list?size=5")
+
+    text = client.get("/metrics").text
+    assert sample(text, "cache_lookups_total", cache="response", result="miss") == 1
+    assert sample(text, "cache_lookups_total", cache="response", result="hit") == 2
+    assert sample(text, "cache_lookups_total", cache="count", result="miss") == 1
+
+
+def test_workers_are_merged(metrics_app, tmp_path):
+    directory = tmp_path / "metrics"
+    client = metrics_app(METRICS_DIR=str(directory)).test_client()
+    client.get("/api/v1/book/list")
+    text = client.get("/metrics").text
+    endpoint = {"endpoint": "api_book.api_list"}
+    assert sample(text, "http_request_duration_seconds_count", **endpoint) == 1
+
+    # Snapshot of a worker that has exited meanwhile
+    worker = subprocess.Popen(["true"])
+    worker.wait()
+    snapshot = json.loads(next(directory.glob("metrics-*.json")).read_text())
+    snapshot["pid"] = worker.pid
+    (directory / f"metrics-{worker.pid}.json").write_text(json.dumps(snapshot))
+
+    text = client.get("/metrics").text
+    assert sample(text, "http_request_duration_seconds_count", **endpoint) == 2
+    # Gauges of exited workers are left out
+    assert sample(text, "db_pool_checked_in") == pool_gauges["checkedin"].samples()[()]
+
+
+def test_render_format():
+    registry = Registry()
+    counter = registry.counter("jobs_total", "Jobs.", ["queue"])
+    histogram = registry.histogram("job_seconds", "Job duration.", buckets=[0.1, 1])
+    counter.inc(queue='a "b"')
+    histogram.observe(0.1)
+    histogram.observe(0.5)
+    histogram.observe(3)
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs.",
+        "# TYPE jobs_total counter",
+        'jobs_total{queue="a \\"b\\""} 1.0',
+        "# HELP job_seconds Job duration.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{le="0.1"} 1.0',
+        'job_seconds_bucket{le="1.0"} 2.0',
+        'job_seconds_bucket{le="+Inf"} 3.0',
+        "job_seconds_sum 3.6",
+        "job_seconds_count 3.0",
+    ]
+    with pytest.raises(ValueError, match="labels"):
+        counter.inc(other="x")
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from my_web.db.models import User
+from my_web.extensions import db
+from my_web.passwords import (
+    HashingBusy,
+    active_hashes,
+    hash_pool,
+    needs_rehash,
+    queue_depth,
+)
+
+
+def stored_hash(email: str) -> str:
+    user = db.session.execute(db.select(User).filter_by(email=email)).scalar_one()
+    return user.hashed_password
+
+
+def wait_for(condition) -> None:
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def blocked_pool(app):
+    """A pool of one worker, busy until the yielded event is set."""
+    hash_pool.configure(1, 1)
+    release = threading.Event()
+    blocker = threading.Thread(target=hash_pool.run, args=(release.wait,))
+    blocker.start()
+    wait_for(lambda: active_hashes.samples() == {(): 1})
+    yield release
+    release.set()
+    blocker.join()
+
+
+def test_hash_in_pool(app):
+    hash_pool.configure(1, 1)
+    assert hash_pool.run(threading.current_thread).name.startswith("password-hash")
+
+
+def test_inline_without_workers(app):
+    hash_pool.configure(0, 0)
+    assert hash_pool.run(threading.current_thread) is threading.current_thread()
+
+
+def test_rehash_on_login(app, auth):
+    old = stored_hash("test@example.com")
+    assert not needs_rehash(old)
+    app.config["BCRYPT_LOG_ROUNDS"] = 5
+
+    assert "User profile" in auth.login("test@example.com", "password").text
+    new = stored_hash("test@example.com")
+    assert new != old and new.startswith("$2b$05$")
+
+    auth.logout()
+    assert "User profile" in auth.login("test@example.com", "password").text
+    assert stored_hash("test@example.com") == new
+
+
+def test_no_rehash_on_failed_login(app, auth):
+    old = stored_hash("test@example.com")
+    app.config["BCRYPT_LOG_ROUNDS"] = 5
+
+    auth.login("test@example.com", "wrongpass")
+    assert stored_hash("test@example.com") == old
+
+
+def test_queue_full(app, client, blocked_pool):
+    waiting = threading.Thread(target=hash_pool.run, args=(lambda: None,))
+    waiting.start()
+    wait_for(lambda: queue_depth.samples() == {(): 1})
+
+    with pytest.raises(HashingBusy):
+        hash_pool.run(lambda: None)
+    response = client.post(
+        "/auth/login", data={"email": "test@example.com", "password": "password"}
+    )
+    assert response.status_code == 503
+    assert "Too many logins" in response.text
+
+    blocked_pool.set()
+    waiting.join()
+    assert queue_depth.samples() == {(): 0}
+
+
+def test_no_queue(app, auth):
+    """Queue size 0: hashes run while a worker is free, no more wait."""
+    hash_pool.configure(1, 0)
+    assert "User profile" in auth.login("test@example.com", "password").text
+
+    release = threading.Event()
+    blocker = threading.Thread(target=hash_pool.run, args=(release.wait,))
+    blocker.start()
+    wait_for(lambda: active_hashes.samples() == {(): 1})
+    with pytest.raises(HashingBusy):
+        hash_pool.run(lambda: None)
+    release.set()
+    blocker.join()
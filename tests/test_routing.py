@@ -0,0 +1,124 @@
+import shutil
+
+import pytest
+
+from my_web.app import create_app
+from my_web.db.fixtures import initial_library_data
+from my_web.db.models import Book
+from my_web.extensions import db
+from my_web.services.book import book_service
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    """
+    App with a primary and replica SQLite files. The replica is a copy with
+    one more book, so that reads show which database served them.
+    """
+    primary = tmp_path / "primary.db"
+    replica = tmp_path / "replica.db"
+
+    def make(*replicas, **config):
+        app = create_app(
+            test_config={
+                "TESTING": True,
+                "WTF_CSRF_ENABLED": False,
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{primary}",
+                "SQLALCHEMY_REPLICA_URIS": list(replicas),
+                "SQLITE_JOURNAL_MODE": None,
+                **config,
+            }
+        )
+        apps.append(app)
+        return app
+
+    apps = []
+    with make().app_context():
+        db.create_all()
+        initial_library_data(apps[0])
+        db.engine.dispose()
+    shutil.copyfile(primary, replica)
+    with make().app_context():
+        db.engine.dispose()
+
+    app = make(f"sqlite:///{replica}")
+    with app.app_context():
+        replica_engine = app.extensions["replicas"].engines[0]
+        with replica_engine.begin() as connection:
+            connection.execute(db.insert(Book).values(id=1000, title="On replica"))
+    yield app, make, replica
+    for app in apps:
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+def test_get_requests_read_from_replica(replicated):
+    app, _, _ = replicated
+    client = app.test_client()
+    assert client.get("/api/v1/book/1000").status_code == 200
+    assert client.head("/api/v1/book/1000").status_code == 200
+
+
+def test_writes_go_to_primary(replicated):
+    app, _, _ = replicated
+    client = app.test_client()
+    client.post(
+        "/auth/login", data={"email": "admin@example.com", "password": "password"}
+    )
+    # Not on the primary: a PATCH request reads there
+    assert client.patch("/api/v1/book/1000", json={"title": "x"}).status_code == 404
+
+    response = client.post("/api/v1/book/", json={"title": "Primary only"})
+    assert response.status_code == 201
+    book_id = response.get_json()["id"]
+    assert client.get(f"/api/v1/book/{book_id}").status_code == 404
+
+
+def test_read_your_writes(replicated):
+    app, _, _ = replicated
+    with app.app_context():
+        assert book_service.get(1000) is not None
+        book_id = book_service.create({"title": "Primary only"}).id
+        db.session.expunge_all()
+        # The session has written: the rest of it reads from the primary
+        assert book_service.get(book_id).title == "Primary only"
+        assert book_service.get(1000) is None
+
+    with app.app_context():
+        assert book_service.get(1000) is not None
+
+
+def test_service_calls_outside_requests(replicated):
+    app, _, _ = replicated
+    with app.app_context():
+        # Plain queries outside of read-only methods use the primary
+        assert db.session.get(Book, 1000) is None
+    with app.app_context():
+        assert book_service.get(1000) is not None
+        assert any(b.id == 1000 for b in book_service.get_books(1, 2000)["data"])
+
+
+def test_round_robin(replicated, tmp_path):
+    _, make, replica = replicated
+    second = tmp_path / "second.db"
+    shutil.copyfile(replica, second)
+    app = make(f"sqlite:///{replica}", f"sqlite:///{second}")
+    replicas = app.extensions["replicas"]
+    with app.app_context():
+        chosen = [replicas.choose() for _ in range(4)]
+    assert chosen == replicas.engines * 2
+
+
+def test_unhealthy_replica_is_skipped(replicated):
+    _, make, replica = replicated
+    missing = "sqlite:///file:/nonexistent/replica.db?mode=ro&uri=true"
+    app = make(missing, f"sqlite:///{replica}")
+    replicas = app.extensions["replicas"]
+    with app.app_context():
+        assert [replicas.choose() for _ in range(2)] == [replicas.engines[1]] * 2
+        assert app.test_client().get("/api/v1/book/1000").status_code == 200
+
+    # Without a healthy replica the primary serves reads
+    app = make(missing)
+    assert app.test_client().get("/api/v1/book/1000").status_code == 404
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from my_web.db.models import Author, Book
+from my_web.extensions import db
+from my_web.services import search as search_index
+from my_web.services.author import author_service
+from my_web.services.book import book_service
+
+
+def search_titles(client, query, extra=""):
+    response = client.get(f"/api/v1/book/list?q={query}{extra}")
+    assert response.status_code == 200
+    return [b["title"] for b in response.get_json()["data"]]
+
+
+def test_search_title(client):
+    assert search_titles(client, "hobbit") == ["The Hobbit"]
+
+
+def test_search_author_prefix(client):
+    titles = search_titles(client, "tolk")
+    assert sorted(titles) == [
+        "The Hobbit",
+        "The Lord of the Rings",
+        "The Silmarillion",
+    ]
+
+
+def test_search_all_words_must_match(client):
+    assert search_titles(client, "gaiman omens") == ["Good Omens"]
+
+
+def test_search_ignores_syntax(client):
+    assert search_titles(client, '"hobbit"^*(') == ["The Hobbit"]
+    # No searchable word: search is not applied
+    assert len(search_titles(client, "%2A%2A")) == 7
+
+
+def test_search_ranked_by_relevance(client):
+    """Title matches are ranked above matches in other columns."""
+    book_service.create({"title": "Gaiman and his worlds"})
+
+    titles = search_titles(client, "gaiman")
+    assert len(titles) == 3
+    assert titles[0] == "Gaiman and his worlds"
+
+
+def test_search_with_explicit_sort(client):
+    sort_data = json.dumps([{"field": "title", "dir": "desc"}])
+    titles = search_titles(client, "tolkien", f"&sort={sort_data}")
+    assert titles == sorted(titles, reverse=True)
+
+
+def test_search_with_cursor(client):
+    titles = search_titles(client, "tolkien", "&cursor=&size=10")
+    assert len(titles) == 3
+
+
+@pytest.mark.usefixtures("app")
+class TestSearchSync:
+    def search(self, query):
+        return [b.title for b in book_service.get_books(1, 50, search=query)["data"]]
+
+    def test_create_and_update(self):
+        book = book_service.create({"title": "Dune"})
+        assert self.search("dune") == ["Dune"]
+
+        book_service.update(book.id, {"title": "Children of Dune"})
+        assert self.search("children") == ["Children of Dune"]
+
+    def test_delete(self):
+        book = book_service.create({"title": "Dune"})
+        book_service.delete(book.id)
+        assert self.search("dune") == []
+
+    def test_add_and_remove_author(self):
+        book = book_service.create({"title": "Dune"})
+        herbert = author_service.create({"name": "Frank Herbert"})
+
+        book_service.add_author(book.id, herbert.id)
+        assert self.search("herbert") == ["Dune"]
+
+        book_service.remove_author(book.id, herbert.id)
+        assert self.search("herbert") == []
+
+    def test_author_rename(self):
+        orwell = Author.query.filter_by(name="George Orwell").first()
+        author_service.update(orwell.id, {"name": "Eric Blair"})
+
+        assert self.search("blair") == ["1984"]
+        assert self.search("orwell") == []
+
+    def test_rebuild(self):
+        db.session.execute(text("DELETE FROM book_search"))
+        assert self.search("hobbit") == []
+
+        search_index.rebuild(db.session.connection(), chunk_size=2)
+        assert self.search("hobbit") == ["The Hobbit"]
+        assert (
+            len(self.search("the"))
+            == Book.query.filter(Book.title.like("The %")).count()
+        )
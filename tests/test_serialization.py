@@ -0,0 +1,56 @@
+import json
+from datetime import datetime
+
+from flask import jsonify
+
+from my_web.db.models import Role
+from my_web.schemas.author import AuthorSchema
+
+
+def test_encodes_datetimes_enums_and_models(app):
+    created = datetime(2024, 5, 6, 7, 8, 9, 123456)
+    author = AuthorSchema(
+        id=1,
+        name="Ann",
+        preferences={"theme": "dark", "n": [1]},
+        created_at=created,
+        updated_at=created,
+    )
+    with app.app_context():
+        response = jsonify({"at": created, "role": Role.ADMIN, "author": author})
+
+    assert response.mimetype == "application/json"
+    assert json.loads(response.data) == {
+        "at": "2024-05-06T07:08:09.123456",
+        "role": Role.ADMIN.value,
+        "author": {
+            "id": 1,
+            "name": "Ann",
+            "preferences": {"theme": "dark", "n": [1]},
+            "created_at": "2024-05-06T07:08:09.123456",
+            "updated_at": "2024-05-06T07:08:09.123456",
+        },
+    }
+
+
+def test_dumps_options_use_stdlib_encoder(app):
+    with app.app_context():
+        assert app.json.dumps({"b": 1, "a": 2}) == '{"b":1,"a":2}'
+        assert app.json.dumps({"b": 1, "a": 2}, sort_keys=True) == '{"a": 2, "b": 1}'
+
+
+def test_api_detail_timestamps_iso(client):
+    book_id = client.get("/api/v1/book/list?size=1").get_json()["data"][0]["id"]
+    data = client.get(f"/api/v1/book/{book_id}").get_json()
+
+    assert datetime.fromisoformat(data["created_at"])
+    assert isinstance(data["authors"], list)
+
+
+def test_validation_error_json(client, auth):
+    auth.register("Editor", "editor@example.com", "password")
+    auth.login("editor@example.com", "password")
+    response = client.post("/api/v1/book/", json={"title": ""})
+
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Validation error"
@@ -0,0 +1,98 @@
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+from loguru import logger
+
+from my_web.app import create_app
+from my_web.cli import show_slow_queries
+from my_web.db.fixtures import initial_library_data
+from my_web.extensions import db
+from my_web.slow_queries import _explain, _sinks, read_log
+
+
+@pytest.fixture
+def slow_log(tmp_path):
+    path = tmp_path / "slow.log"
+    app = create_app(
+        test_config={
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            # Every statement is slow
+            "SLOW_QUERY_MS": 1e-9,
+            "SLOW_QUERY_LOG": str(path),
+        }
+    )
+    with app.app_context():
+        db.create_all()
+        initial_library_data(app)
+        yield app, path
+        db.session.remove()
+        db.engine.dispose()
+    logger.remove(_sinks.pop(str(path)))
+
+
+def test_slow_queries_are_logged(slow_log):
+    app, path = slow_log
+    filters = json.dumps([{"field": "title", "value": "omens"}])
+    app.test_client().get(
+        "/api/v1/book/list", query_string={"filter": filters, "size": 5}
+    )
+
+    entries = [e for e in read_log(str(path)) if e["endpoint"] == "api_book.api_list"]
+    listing = next(e for e in entries if "LIKE" in e["statement"])
+    assert listing["duration_ms"] >= 0
+    assert "%omens%" in listing["parameters"]
+    assert any("SCAN" in line or "SEARCH" in line for line in listing["plan"])
+    # Writes are logged without a plan, outside of requests without endpoint
+    insert = next(e for e in read_log(str(path)) if "INSERT" in e["statement"])
+    assert insert["endpoint"] is None
+    assert insert["plan"] == []
+
+
+def test_disabled_by_default(app):
+    assert app.config["SLOW_QUERY_MS"] == 0
+
+
+def test_cli(slow_log, monkeypatch, capsys):
+    app, path = slow_log
+    app.test_client().get("/api/v1/book/list?size=5")
+    app.test_client().get("/book/list")
+
+    argv = ["slow-queries", "--file", str(path), "--endpoint", "api_book.api_list"]
+    monkeypatch.setattr(sys, "argv", argv + ["--limit", "1"])
+    show_slow_queries()
+    out = capsys.readouterr().out
+    assert out.count(" ms  api_book.api_list") == 1
+    assert "book.list" not in out
+    assert "plan:" in out
+
+
+def test_failed_explain_rolls_back_to_savepoint():
+    """A failed EXPLAIN must not abort the transaction of the request."""
+    executed = []
+
+    class Cursor:
+        def execute(self, statement, parameters=None):
+            executed.append(statement)
+            if statement.startswith("EXPLAIN"):
+                raise RuntimeError("cannot explain")
+
+        def close(self):
+            pass
+
+    conn = SimpleNamespace(
+        dialect=SimpleNamespace(name="postgresql"),
+        connection=SimpleNamespace(cursor=Cursor),
+    )
+
+    plan = _explain(conn, "SELECT 1", {})
+
+    assert plan == ["EXPLAIN failed: cannot explain"]
+    assert executed == [
+        "SAVEPOINT slow_query_explain",
+        "EXPLAIN SELECT 1",
+        "ROLLBACK TO SAVEPOINT slow_query_explain",
+        "RELEASE SAVEPOINT slow_query_explain",
+    ]
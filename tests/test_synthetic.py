@@ -0,0 +1,58 @@
+from sqlalchemy import func, select
+
+from my_web.db.models import Author, Book, BookAuthorAssociation
+from my_web.db.synthetic import _isbn, generate_library
+from my_web.extensions import db
+from my_web.services.book import book_service
+
+
+def snapshot():
+    return db.session.execute(
+        select(Book.id, Book.title, Book.isbn).order_by(Book.id)
+    ).all()
+
+
+def generate(scale, seed):
+    with db.engine.begin() as connection:
+        return generate_library(connection, scale, seed, chunk_size=40)
+
+
+def test_generate_library(app):
+    books_before = Book.query.count()
+    authors_before = Author.query.count()
+
+    counts = generate(100, seed=1)
+
+    assert counts.books == 100 and counts.authors == 20
+    assert Book.query.count() == books_before + 100
+    assert Author.query.count() == authors_before + 20
+    assert BookAuthorAssociation.query.count() >= 7 + counts.links
+
+    authors_per_book = db.session.execute(
+        select(func.count())
+        .select_from(BookAuthorAssociation)
+        .group_by(BookAuthorAssociation.book_id)
+    ).scalars()
+    assert set(authors_per_book) <= {1, 2, 3}
+
+    # New rows are searchable and ORM inserts continue after them
+    generated = Book.query.order_by(Book.id.desc()).first()
+    response = app.test_client().get(f"/api/v1/book/list?size=100&q={generated.title}")
+    assert generated.id in [b["id"] for b in response.get_json()["data"]]
+    assert book_service.create({"title": "Next"}).id > generated.id
+
+
+def test_generate_library_is_deterministic(app):
+    snapshots = []
+    for _ in range(2):
+        db.drop_all()
+        db.create_all()
+        generate(50, seed=7)
+        snapshots.append(snapshot())
+
+    assert snapshots[0] == snapshots[1]
+
+
+def test_isbn_check_digit():
+    assert _isbn(1) == "9798000000014"
+    assert len({_isbn(n) for n in range(1000)}) == 1000
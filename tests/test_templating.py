@@ -0,0 +1,86 @@
+from flask import render_template_string
+
+from my_web.db.models import Author, Book
+from my_web.extensions import db
+from my_web.templating import fragment_cache
+
+TEMPLATE = "{% cache ('greeting', key), ttl %}Hello {{ name }}{% endcache %}"
+
+
+def render(key=1, ttl=60, **context) -> str:
+    return render_template_string(TEMPLATE, key=key, ttl=ttl, **context)
+
+
+def test_fragment_cached_by_key(app):
+    with app.test_request_context():
+        assert render(key=1, name="Ann") == "Hello Ann"
+        # Same key, the cached fragment is rendered
+        assert render(key=1, name="Bob") == "Hello Ann"
+        assert render(key=2, name="Bob") == "Hello Bob"
+
+
+def test_fragment_ttl(app):
+    with app.test_request_context():
+        assert render(ttl=0, name="Ann") == "Hello Ann"
+        assert render(ttl=0, name="Bob") == "Hello Bob"
+
+
+def test_fragment_escaped(app):
+    with app.test_request_context():
+        assert render(name="<b>") == "Hello &lt;b&gt;"
+
+
+def test_commit_keeps_fragments(app):
+    with app.test_request_context():
+        render(name="Ann")
+        db.session.add(Author(name="New Author"))
+        db.session.commit()
+        assert render(name="Bob") == "Hello Ann"
+
+
+def test_book_detail_authors(app, client):
+    with app.app_context():
+        book = db.session.execute(db.select(Book).where(Book.authors.any())).scalar()
+        book_id, author = book.id, book.authors[0]
+        old_name = author.name
+        client.get(f"/book/{book_id}")
+        assert len(fragment_cache) == 1
+
+        author.name = "Renamed Author"
+        db.session.commit()
+
+    html = client.get(f"/book/{book_id}").get_data(as_text=True)
+    assert "Renamed Author" in html
+    assert old_name not in html
+
+
+def test_book_list_authors(app, client):
+    with app.app_context():
+        author = db.session.execute(
+            db.select(Author).where(Author.books.any())
+        ).scalar()
+        old_name = author.name
+        assert old_name in client.get("/book/list?size=100").get_data(as_text=True)
+
+        author.name = "Renamed Author"
+        db.session.commit()
+
+    html = client.get("/book/list?size=100").get_data(as_text=True)
+    assert "Renamed Author" in html
+    assert old_name not in html
+
+
+def test_bytecode_cache(tmp_path):
+    from my_web.app import create_app
+
+    app = create_app(
+        {
+            "TESTING": True,
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
+            "JINJA_BYTECODE_CACHE_DIR": str(tmp_path / "jinja"),
+        }
+    )
+    with app.test_request_context():
+        app.jinja_env.get_template("base.html")
+
+    assert any((tmp_path / "jinja").iterdir())
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import text
+
+from my_web.app import create_app
+from my_web.db.tuning import engine_options
+from my_web.extensions import db
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    def make(**config):
+        app = create_app(
+            test_config={
+                "TESTING": True,
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'tuned.db'}",
+                **config,
+            }
+        )
+        apps.append(app)
+        return app
+
+    apps = []
+    yield make
+    for app in apps:
+        with app.app_context():
+            db.engine.dispose()
+
+
+def pragma(name):
+    return db.session.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_sqlite_pragmas(file_app):
+    with file_app().app_context():
+        assert pragma("journal_mode") == "wal"
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("busy_timeout") == 5000
+        assert pragma("mmap_size") == 256 * 1024 * 1024
+        assert pragma("cache_size") == -64 * 1024
+
+
+def test_sqlite_pragmas_unset(file_app):
+    app = file_app(SQLITE_JOURNAL_MODE=None, SQLITE_SYNCHRONOUS="full")
+    with app.app_context():
+        assert pragma("journal_mode") == "delete"
+        assert pragma("synchronous") == 2  # FULL
+
+
+def test_pool_options(file_app):
+    app = file_app(DB_POOL_SIZE=3, DB_MAX_OVERFLOW=0, DB_POOL_PRE_PING=True)
+    with app.app_context():
+        assert db.engine.pool.size() == 3
+        assert db.engine.pool._max_overflow == 0
+        assert db.engine.pool._pre_ping
+
+
+def test_engine_options():
+    config = {
+        "SQLALCHEMY_DATABASE_URI": "postgresql://localhost/books",
+        "DB_POOL_SIZE": 10,
+        "DB_POOL_RECYCLE": 3600,
+        "DB_POOL_PRE_PING": False,
+    }
+    assert engine_options(config) == {
+        "pool_size": 10,
+        "pool_recycle": 3600,
+        "pool_pre_ping": False,
+    }
+    # The pool of an in-memory database has no size
+    memory = {**config, "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:"}
+    assert engine_options(memory) == {"pool_recycle": 3600, "pool_pre_ping": False}